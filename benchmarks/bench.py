@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Benchmarks of dispatch, help and completion
+
+Synthetic command trees (wide groups, deep trees and long chains) are
+generated and the time and peak memory of invocations, possible command
+names and help formatting are measured.  Repeated invocations of one root
+command are measured with and without a frozen dispatch table.  Memory benchmarks measure
+instances of commands and groups kept alive at once.
+
+Usage::
+
+    python benchmarks/bench.py --output results.json
+    python benchmarks/bench.py --baseline results.json --threshold 1.25
+
+With a baseline, the run fails (exit status 1) when a benchmark is slower,
+or uses more memory, than the baseline multiplied by the threshold.
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import smclip
+
+WIDTHS = (10, 1000, 50000)
+DEPTHS = (10, 50)
+CHAIN_LENGTHS = (10, 1000)
+INSTANCES = 10000
+GROUP_INSTANCES = 100
+REPEATED_INVOCATIONS = 100
+QUICK_LIMIT = 1000
+
+_trees = {}
+
+
+# ==========================================================
+# SYNTHETIC TREES
+# ----------------------------------------------------------
+
+def _leaf_cls(name, base=smclip.Command):
+    def add_arguments(self, parser):
+        parser.add_argument('--opt')
+
+    return type('Leaf_' + name, (base,), {
+        '__doc__': 'Leaf command {}\n\nLeaf command for benchmarks.'.format(name),
+        '__slots__': (),
+        'default_name': name,
+        'add_arguments': add_arguments,
+    })
+
+
+def _group_cls(name, subcommands, base=smclip.CommandGroup, is_default=False):
+    def __init__(self, *args, **kwargs):
+        base.__init__(self, *args, **kwargs)
+        for command_cls in subcommands:
+            self.register(command_cls, is_default=is_default)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groupopt')
+
+    return type('Group_' + name, (base,), {
+        '__doc__': 'Group {}'.format(name),
+        'default_name': name,
+        '__init__': __init__,
+        'add_arguments': add_arguments,
+    })
+
+
+def wide_tree(width):
+    """Root group with `width` subcommands"""
+    key = ('wide', width)
+    if key not in _trees:
+        leaves = [_leaf_cls('cmd{}'.format(index)) for index in range(width)]
+        _trees[key] = _group_cls('app', leaves)
+    return _trees[key]
+
+
+def declared_wide_tree(width):
+    """Root group with `width` subcommands declared by `subcommands`"""
+    key = ('declared_wide', width)
+    if key not in _trees:
+        leaves = [_leaf_cls('cmd{}'.format(index)) for index in range(width)]
+        _trees[key] = type('DeclaredGroup_app', (smclip.CommandGroup,), {
+            '__doc__': 'Group app',
+            '__slots__': (),
+            'default_name': 'app',
+            'subcommands': tuple(smclip.Subcommand(leaf) for leaf in leaves),
+        })
+    return _trees[key]
+
+
+def deep_tree(depth):
+    """Groups nested `depth` levels with a leaf command at the bottom"""
+    key = ('deep', depth)
+    if key not in _trees:
+        command_cls = _leaf_cls('leaf')
+        for level in reversed(range(depth)):
+            command_cls = _group_cls('level{}'.format(level), [command_cls])
+        _trees[key] = _group_cls('app', [command_cls])
+    return _trees[key]
+
+
+def deep_default_tree(depth):
+    """Groups nested `depth` levels, each registered as default
+    subcommand of its parent, with a default leaf command at the bottom"""
+    key = ('deep_default', depth)
+    if key not in _trees:
+        command_cls = _leaf_cls('leaf')
+        for level in reversed(range(depth)):
+            command_cls = _group_cls('level{}'.format(level), [command_cls], is_default=True)
+        _trees[key] = _group_cls('app', [command_cls], is_default=True)
+    return _trees[key]
+
+
+def chain_tree():
+    """Root group with a chained group of two chained commands"""
+    key = ('chain',)
+    if key not in _trees:
+        chained = [_leaf_cls(name, smclip.ChainedCommand) for name in ('change', 'move')]
+        chained_group = _group_cls('items', chained, smclip.ChainedCommandGroup)
+        _trees[key] = _group_cls('app', [chained_group])
+    return _trees[key]
+
+
+def deep_args(depth):
+    return ['level{}'.format(level) for level in range(depth)] + ['leaf', '--opt', 'x']
+
+
+def chain_args(length):
+    args = ['items']
+    for index in range(length):
+        args.extend((('change', 'move')[index % 2], '--opt', str(index)))
+    return args
+
+
+# ==========================================================
+# BENCHMARKS
+# ----------------------------------------------------------
+
+def _invoke(tree_cls, args):
+    return tree_cls, lambda root: root.invoke(list(args))
+
+
+def _invoke_repeated(tree_cls, args, count, freeze=False):
+    def invoke_repeated(root):
+        if freeze:
+            root.freeze()
+        return [root.invoke(list(args)) for _ in range(count)]
+    return tree_cls, invoke_repeated
+
+
+def _possible_command_names(tree_cls, args):
+    return tree_cls, lambda root: root.possible_command_names(list(args))
+
+
+def _instances(tree_cls, count):
+    def instances(root):
+        return [root.__class__() for _ in range(count)]
+    return tree_cls, instances
+
+
+def _format_help(tree_cls):
+    def format_help(root):
+        root._registry.help_cache.clear()
+        return root.parser.format_help()
+    return tree_cls, format_help
+
+
+def benchmarks(quick=False):
+    """Return mapping of benchmark name => (root class factory, function)
+
+    Function is called with a new instance of the root command.
+    Generated classes of trees are cached.
+    """
+    widths = [width for width in WIDTHS if not quick or width <= QUICK_LIMIT]
+    lengths = [length for length in CHAIN_LENGTHS if not quick or length <= QUICK_LIMIT]
+
+    cases = {}
+    for width in widths:
+        last = 'cmd{}'.format(width - 1)
+        cases['invoke_wide_{}'.format(width)] = _invoke(
+            lambda width=width: wide_tree(width), [last, '--opt', 'x'])
+        cases['possible_command_names_wide_{}'.format(width)] = _possible_command_names(
+            lambda width=width: wide_tree(width), [])
+        cases['format_help_wide_{}'.format(width)] = _format_help(
+            lambda width=width: wide_tree(width))
+
+    for depth in DEPTHS:
+        cases['invoke_deep_{}'.format(depth)] = _invoke(
+            lambda depth=depth: deep_tree(depth), deep_args(depth))
+        cases['possible_command_names_deep_{}'.format(depth)] = _possible_command_names(
+            lambda depth=depth: deep_tree(depth), deep_args(depth)[:-2])
+        cases['invoke_deep_default_{}'.format(depth)] = _invoke(
+            lambda depth=depth: deep_default_tree(depth), ['--opt', 'x'])
+        cases['invoke_deep_repeated_{}'.format(depth)] = _invoke_repeated(
+            lambda depth=depth: deep_tree(depth), deep_args(depth), REPEATED_INVOCATIONS)
+        cases['invoke_deep_frozen_{}'.format(depth)] = _invoke_repeated(
+            lambda depth=depth: deep_tree(depth), deep_args(depth), REPEATED_INVOCATIONS,
+            freeze=True)
+
+    for length in lengths:
+        cases['invoke_chain_{}'.format(length)] = _invoke(chain_tree, chain_args(length))
+
+    cases['memory_leaf_instances'] = _instances(lambda: _leaf_cls('leaf'), INSTANCES)
+    for width in widths:
+        cases['memory_group_instances_wide_{}'.format(width)] = _instances(
+            lambda width=width: wide_tree(width), GROUP_INSTANCES)
+        cases['memory_group_instances_declared_wide_{}'.format(width)] = _instances(
+            lambda width=width: declared_wide_tree(width), GROUP_INSTANCES)
+
+    return cases
+
+
+def measure(tree_factory, func, repeat=5):
+    """Measure the best time and the peak memory of `func`
+
+    Creation of the root command (registration of its subcommands)
+    is measured as well.
+
+    Returns:
+        (dict) with ``time`` in seconds and ``peak_memory`` in bytes
+               (None when tracemalloc is not available)
+    """
+    root_cls = tree_factory()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        func(root_cls())
+        times.append(timeit.default_timer() - start)
+
+    peak_memory = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(root_cls())
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {'time': min(times), 'peak_memory': peak_memory}
+
+
+def run(names=None, quick=False, repeat=5, log=None):
+    """Run benchmarks and return results
+
+    Args:
+        names (list): names of benchmarks to run (default: all)
+        quick (bool): skip the largest trees
+        repeat (int): number of timed runs of each benchmark
+        log (callable): called with a line about each result
+    """
+    cases = benchmarks(quick=quick)
+    results = {}
+    for name in sorted(cases):
+        if names and name not in names:
+            continue
+        results[name] = measure(*cases[name], repeat=repeat)
+        if log:
+            log(_format_result(name, results[name]))
+
+    return {
+        'smclip': smclip.__version__,
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold=1.25, memory_threshold=None):
+    """Return list of regressions of report against a baseline report
+
+    Args:
+        threshold (float): allowed ratio of time to the baseline
+        memory_threshold (float): allowed ratio of peak memory to the
+                                  baseline (default: `threshold`)
+    """
+    if memory_threshold is None:
+        memory_threshold = threshold
+
+    regressions = []
+    base_results = baseline.get('results', {})
+    for name, result in sorted(report['results'].items()):
+        base = base_results.get(name)
+        if not base:
+            continue
+        for key, limit in (('time', threshold), ('peak_memory', memory_threshold)):
+            if result.get(key) is None or not base.get(key):
+                continue
+            ratio = float(result[key]) / base[key]
+            if ratio > limit:
+                regressions.append('{} {}: {} -> {} ({:.2f}x)'.format(
+                    name, key, base[key], result[key], ratio))
+    return regressions
+
+
+def _format_result(name, result):
+    peak_memory = result['peak_memory']
+    memory = '{:.1f} KiB'.format(peak_memory / 1024.0) if peak_memory is not None else '-'
+    return '{:<44} {:>12.6f} s {:>14}'.format(name, result['time'], memory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of smclip')
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='skip the largest trees')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs of each benchmark')
+    parser.add_argument('--output', help='write results as JSON to a file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='allowed ratio of time to the baseline (default: 1.25)')
+    parser.add_argument('--memory-threshold', type=float,
+                        help='allowed ratio of peak memory to the baseline '
+                             '(default: same as --threshold)')
+    parser.add_argument('--list', action='store_true', help='list benchmarks and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in sorted(benchmarks(quick=args.quick)):
+            print(name)
+        return 0
+
+    report = run(args.names, quick=args.quick, repeat=args.repeat, log=print)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.memory_threshold)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,5 +6,7 @@
 
 __version__ = '0.3.0'
 
+from .arguments import *
 from .commands import *
 from .exceptions import *
+from .registry import *
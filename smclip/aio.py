@@ -0,0 +1,173 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Asynchronous invocation of commands
+
+Implementation of `ainvoke` methods of commands.  Callbacks
+(`preprocess`, `this_action` and `results_callback`) can be
+either regular functions or coroutine functions.
+
+Requires Python 3.5 or newer.
+"""
+
+import asyncio
+import inspect
+
+from .context import InvocationContext
+from .exceptions import CommandError
+from .instrumentation import phase
+from .stream import as_stream, callback_result, pipeline_output, stream_result
+
+
+async def call_callback(callback, *args, **kwargs):
+    """Call callback and await its result when it is awaitable"""
+    rv = callback(*args, **kwargs)
+    if inspect.isawaitable(rv):
+        rv = await rv
+    return rv
+
+
+async def invoke_callbacks(command, parsed_args, context=None):
+    if context is None:
+        context = InvocationContext(command)
+    context.args = parsed_args
+
+    with phase('preprocess', command):
+        preprocessed_args = await call_callback(command.preprocess,
+                                                *command.context_args(context), **parsed_args)
+    if isinstance(preprocessed_args, dict):
+        action_args = preprocessed_args
+    elif preprocessed_args is None:
+        action_args = parsed_args
+    else:
+        raise AssertionError('Expected preprocess to return dict or None, {} returned instead!'
+                             .format(type(preprocessed_args)))
+
+    with phase('this_action', command):
+        rv = await call_callback(command.this_action,
+                                 *command.context_args(context), **action_args)
+    return stream_result(command, rv)
+
+
+async def command_ainvoke(command, raw_args, context=None):
+    parser = command.parser
+    with phase('parse_args', command):
+        namespace = parser.parse_args(raw_args)
+    parsed_args, _ = command._extract_parsed_args(namespace)
+
+    return await command.ainvoke_callbacks(parsed_args, context)
+
+
+async def group_ainvoke(group, raw_args, context=None):
+    if context is None:
+        context = InvocationContext(group)
+
+    if group.manifest is not None:
+        group.print_manifest_help(raw_args)
+
+    parser = group.parser
+    with phase('parse_args', group):
+        namespace, unknown_args = parser.parse_known_args(raw_args)
+    parsed_args, sub_args = group._extract_parsed_args(namespace)
+
+    try:
+        with phase('parse_and_get_command', group):
+            is_default, command = group.parse_and_get_command(raw_args, namespace, unknown_args)
+    except CommandError as e:
+        e.parser.error(str(e))
+
+    group.invoked_subcommand = command
+    if not command:
+        # no subcommand was issues, call current one
+        return await group.ainvoke_callbacks(parsed_args, context)
+
+    context.invoked_subcommand = command
+    if is_default:
+        return await command.ainvoke(raw_args, context.child(command))
+
+    context.args = parsed_args
+    with phase('preprocess', group):
+        await call_callback(group.preprocess, *group.context_args(context), **parsed_args)
+    rv = await command.ainvoke(sub_args, context.child(command))  # Subcommand invocation
+    with phase('results_callback', group):
+        return callback_result(rv, await call_callback(group.results_callback,
+                                                       *group.context_args(context, rv)))
+
+
+async def chained_group_ainvoke(group, raw_args, context=None):
+    if context is None:
+        context = InvocationContext(group)
+
+    if group.manifest is not None:
+        group.print_manifest_help(raw_args)
+
+    parser = group.parser
+    with phase('parse_args', group):
+        namespace = parser.parse_args(raw_args)
+    parsed_args, remaining = group._extract_parsed_args(namespace)
+
+    context.invoked_subcommands = []
+    try:
+        with phase('parse_and_get_chain', group):
+            chained_cmd_args = group.parse_and_get_chain(remaining, context.invoked_subcommands)
+    except CommandError as e:
+        e.parser.error(str(e))
+    finally:
+        group.set_invoked_subcommands(context.invoked_subcommands)
+    if not chained_cmd_args:
+        return await group.ainvoke_callbacks(parsed_args, context)
+
+    context.args = parsed_args
+    with phase('preprocess', group):
+        await call_callback(group.preprocess, *group.context_args(context), **parsed_args)
+    rv = await group.ainvoke_chain(chained_cmd_args, context)
+    with phase('results_callback', group):
+        return callback_result(rv, await call_callback(group.results_callback,
+                                                       *group.context_args(context, rv)))
+
+
+async def invoke_chain(group, chained_cmd_args, context=None):
+    """Invoke chained commands concurrently
+
+    Commands marked by `chain_serial` are awaited alone, after all
+    preceding commands are done.  Results are in command order.
+    In pipeline mode commands are awaited one by one.
+    """
+    from .commands import ChainedOutputResults
+
+    chained_cmd_args = group.chain_contexts(chained_cmd_args, context)
+    if group.pipeline:
+        return await invoke_pipeline(chained_cmd_args)
+
+    results = ChainedOutputResults()
+    pending = []
+
+    async def collect():
+        if pending:
+            rvs = await asyncio.gather(*(task for _, task in pending))
+            for (subcmd, _), subrv in zip(pending, rvs):
+                results.add_result(subcmd, subrv)
+            del pending[:]
+
+    for subcmd, sub_args, subcontext in chained_cmd_args:
+        if subcmd.chain_serial:
+            await collect()
+            results.add_result(subcmd, await subcmd.ainvoke_callbacks(sub_args, subcontext))
+        else:
+            pending.append((subcmd, subcmd.ainvoke_callbacks(sub_args, subcontext)))
+
+    await collect()
+    return results
+
+
+async def invoke_pipeline(chained_cmd_args):
+    upstreams = []
+    rv = producer = None
+    for subcmd, sub_args, subcontext in chained_cmd_args:
+        subcmd.upstream = subcontext.upstream = as_stream(rv, producer)
+        upstreams.append(subcmd.upstream)
+        rv = await subcmd.ainvoke_callbacks(sub_args, subcontext)
+        producer = subcmd
+
+    return pipeline_output(rv, upstreams, producer)
@@ -0,0 +1,176 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Declarative specification of command arguments
+
+Arguments declared by `Command.arguments` are added to the parser
+before `add_arguments` is called.  Unlike `add_arguments`, the
+specification can be read without creating a parser or running any
+code of the command.
+"""
+
+__all__ = ['Argument']
+
+# actions storing a value without consuming any argument
+_ZERO_ARITY_ACTIONS = ('store_true', 'store_false', 'store_const', 'append_const',
+                       'count', 'help', 'version')
+# actions consuming one argument by default
+_ONE_ARITY_ACTIONS = (None, 'store', 'append')
+
+
+class Argument(object):
+    """Specification of one argument of a parser
+
+    Arguments are the same as of ``ArgumentParser.add_argument``::
+
+        class ListCommand(Command):
+            arguments = (
+                Argument('--state', choices=['open', 'closed']),
+                Argument('-v', '--verbose', action='count', default=0),
+            )
+
+    Attributes:
+        flags (tuple): option strings or a name of positional argument
+        kwargs (dict): keyword arguments of ``add_argument``
+    """
+
+    def __init__(self, *flags, **kwargs):
+        self.flags = flags
+        self.kwargs = kwargs
+
+    def add_to(self, parser):
+        """Add argument to parser
+
+        Returns:
+            argparse action
+        """
+        return parser.add_argument(*self.flags, **self.kwargs)
+
+    @property
+    def option_strings(self):
+        """Option strings, empty for positional argument"""
+        return tuple(flag for flag in self.flags if flag.startswith('-'))
+
+    @property
+    def arity(self):
+        """Number of values consumed by the argument, None when it varies
+        or cannot be determined statically"""
+        action = self.kwargs.get('action')
+        nargs = self.kwargs.get('nargs')
+        if action in _ZERO_ARITY_ACTIONS:
+            return 0
+        if action in _ONE_ARITY_ACTIONS:
+            if nargs is None:
+                return 1
+            if isinstance(nargs, int):
+                return nargs
+        return None
+
+    def __repr__(self):
+        args = [repr(flag) for flag in self.flags]
+        args.extend('{}={!r}'.format(key, value) for key, value in sorted(self.kwargs.items()))
+        return '{}({})'.format(self.__class__.__name__, ', '.join(args))
+
+
+def declared_options(arguments):
+    """Return mapping of option strings of declared arguments to arities
+
+    Returns:
+        dict: option string => number of values (None when it varies),
+              None when there are positional arguments
+    """
+    options = {}
+    for argument in arguments:
+        option_strings = argument.option_strings
+        if not option_strings:
+            return None
+        options.update(dict.fromkeys(option_strings, argument.arity))
+    return options
+
+
+class ScanMiss(LookupError):
+    """Arguments cannot be split without the parser"""
+
+
+class ScanError(Exception):
+    """Arguments would be refused by the parser"""
+
+
+def scan_options(options, args, start=0, help_options=(), skipped=None, abbrev=False):
+    """Walk options at the beginning of arguments of one command level
+
+    Mimics option matching of argparse for common cases; anything
+    unusual (``--``, short option clusters, attached values, values
+    starting with ``-``, options with a variable number of values)
+    is reported as a miss.
+
+    Args:
+        options (dict): option string => number of values (None when it varies)
+        args (list): arguments
+        start (int): position of the first argument of the level
+        help_options (iterable): options requesting help, the scan stops
+                                 at the first one
+        skipped (iterable): when given, unknown long options and these
+                            options are skipped instead of ending the scan
+        abbrev (bool): whether long options can be abbreviated
+
+    Returns:
+        tuple: (position of first positional argument (length of arguments
+                when there is none), skipped options, whether help was requested)
+
+    Raises:
+        ScanMiss: when arguments cannot be split statically
+        ScanError: when arguments would be refused by the parser
+    """
+    unknown = []
+
+    position = start
+    while position < len(args):
+        arg = args[position]
+        if not arg or arg[0] != '-' or arg == '-':
+            break
+        if arg == '--':
+            raise ScanMiss(arg)
+
+        option, explicit, _ = arg.partition('=')
+        if option in help_options:
+            return position, unknown, True
+
+        if option not in options and option.startswith('--') and abbrev:
+            matches = [o for o in list(options) + list(help_options) if o.startswith(option)]
+            if len(matches) > 1:
+                raise ScanError(arg)
+            elif matches:
+                option = matches[0]
+                if option in help_options:
+                    return position, unknown, True
+
+        if option not in options:
+            if skipped is not None and (option.startswith('--') or option in skipped):
+                unknown.append(arg)
+                position += 1
+                continue
+            # short option clusters, attached values and negative numbers
+            raise ScanMiss(arg)
+
+        arity = options[option]
+        if arity is None:
+            raise ScanMiss(arg)
+        if explicit:
+            if arity == 0:
+                raise ScanError(arg)
+            if arity != 1:
+                raise ScanMiss(arg)
+            position += 1
+            continue
+
+        values = args[position + 1:position + 1 + arity]
+        if len(values) < arity:
+            raise ScanError(arg)
+        for value in values:
+            if value.startswith('-') and value != '-':
+                raise ScanMiss(value)
+        position += 1 + arity
+
+    return position, unknown, False
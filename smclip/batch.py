@@ -0,0 +1,146 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+import shlex
+
+from .helpers import exit_status
+from .lazy import string_types
+
+
+class BatchResult(object):
+    """Result of one invocation in a batch
+
+    Attributes:
+        index (int): position of the record in the batch
+        argv (list): arguments of the invocation (the line of a record
+                     which cannot be split)
+        rv: return value of the invocation
+        exit_status (int): 0 on success, exit code otherwise
+        error (BaseException): raised exception or None
+    """
+
+    def __init__(self, index, argv, rv=None, exit_status=0, error=None):
+        self.index = index
+        self.argv = argv
+        self.rv = rv
+        self.exit_status = exit_status
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.exit_status == 0
+
+    def __repr__(self):
+        return '<{} #{} {!r} exit_status={}>'.format(
+            self.__class__.__name__, self.index, self.argv, self.exit_status)
+
+
+def read_records(stream, null_separated=False, chunk_size=65536):
+    """Read argv records from a stream
+
+    A record is a line, split into arguments by shell-like syntax
+    (see `split_record`) when it is invoked.  Empty lines and lines
+    starting with ``#`` are skipped.
+
+    With `null_separated`, arguments are taken literally, so they can
+    be empty or contain newlines.  Every field is terminated by NUL and
+    a record is the number of its arguments followed by the arguments,
+    e.g. ``3\0task\0create\0A B\0`` (or ``1\0\0`` for one empty argument).
+
+    Args:
+        stream: file object opened in text mode
+        null_separated (bool): records are NUL separated arguments
+                               (default: False)
+
+    Yields:
+        (str) a line, or (list) arguments of a NUL separated record
+
+    Raises:
+        ValueError: a NUL separated record has a bad number of arguments
+                    or it is truncated
+    """
+    if null_separated:
+        fields = _split_stream(stream, '\0', chunk_size)
+        for count in fields:
+            if not count.isdigit():
+                raise ValueError('Bad number of arguments {!r}'.format(count))
+            argv = [arg for _, arg in zip(range(int(count)), fields)]
+            if len(argv) < int(count):
+                raise ValueError('Truncated record, expected {} arguments'.format(count))
+            yield argv
+        return
+
+    for line in stream:
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            yield line
+
+
+def split_record(record):
+    """Return arguments of a record, a line is split by shell-like
+    syntax and a list of arguments is returned as it is
+
+    Raises:
+        ValueError: the line cannot be split (e.g. unbalanced quotes)
+    """
+    if isinstance(record, string_types):
+        return shlex.split(record)
+    return list(record)
+
+
+def _split_stream(stream, separator, chunk_size):
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        records = (pending + chunk).split(separator)
+        pending = records.pop()
+        for record in records:
+            yield record
+    if pending:
+        yield pending
+
+
+def invoke_batch(command, records, stop_on_error=False):
+    """Invoke command for each argv record in the same process
+
+    Parser of the command is built once and reused for all records.
+    Errors (including argument errors) are collected per record.
+
+    Args:
+        command (Command): root command
+        records: iterable of argument lists or lines, see `read_records`
+        stop_on_error (bool): stop on the first failed record
+                              (default: False)
+
+    Returns:
+        (list) of BatchResult
+    """
+    results = []
+    for index, record in enumerate(records):
+        result = _invoke_record(command, index, record)
+        results.append(result)
+        if stop_on_error and not result.ok:
+            break
+
+    return results
+
+
+def _invoke_record(command, index, record):
+    try:
+        argv = split_record(record)
+    except ValueError as e:
+        # same exit status as of other argument errors
+        return BatchResult(index, record, exit_status=2, error=e)
+
+    try:
+        rv = command.invoke(argv)
+    except SystemExit as e:
+        return BatchResult(index, argv, exit_status=exit_status(e.code), error=e)
+    except Exception as e:
+        return BatchResult(index, argv, exit_status=1, error=e)
+    return BatchResult(index, argv, rv)
+
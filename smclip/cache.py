@@ -0,0 +1,173 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+import argparse
+import hashlib
+import io
+import os
+import pickle
+import stat
+
+from .helpers import source_files, write_atomic
+
+
+class ParserCache(object):
+    """Cache of built parsers keyed by command class
+
+    Parser is built once per command class, parser class, usage prefix
+    and custom parser options, and the same parser is then handed to all
+    instances of the class.  Cached parsers are templates and must be
+    treated as immutable, so commands whose arguments differ per instance
+    (or groups registering subcommands after the parser is created)
+    should not use the cache.
+
+    Optionally, parsers are persisted as pickled snapshots in a directory,
+    so later runs skip `add_arguments` completely.  Snapshot is dropped
+    whenever a source file of the command class (or of any of its base
+    classes) is modified.
+
+    Snapshots are unpickled, so anyone able to write into the directory
+    can run code in the application.  The directory must be private to
+    the user running it; it is created with mode 0700 and snapshots are
+    ignored unless both the directory and the snapshot are owned by the
+    current user and writable by nobody else.
+
+    Usage::
+
+        class MyCommand(smclip.Command):
+            parser_cache = ParserCache(os.path.expanduser('~/.cache/myapp/parsers'))
+
+    Args:
+        directory (str): optional directory for parser snapshots
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._parsers = {}
+        self._source_stamps = {}
+
+    def clear(self):
+        """Forget all parsers held in memory"""
+        self._parsers.clear()
+        self._source_stamps.clear()
+
+    def get_parser(self, command, custom_opts=None):
+        """Return cached parser for command, build it when it is missing
+
+        Args:
+            command (Command): command instance
+            custom_opts (dict): custom options for parser creation
+        """
+        custom_opts = custom_opts or {}
+        key = (command.__class__, command.parser_cls,
+               command._generate_usage_prefix(),
+               tuple(sorted(custom_opts.items())))
+
+        parser = self._parsers.get(key)
+        if parser is None:
+            parser = self._load_snapshot(key)
+            if parser is None:
+                parser = command.create_parser(**custom_opts)
+                self._save_snapshot(key, parser)
+            self._parsers[key] = parser
+        return parser
+
+    def _snapshot_filename(self, key):
+        command_cls, parser_cls, prog, custom_opts = key
+        ident = repr((_class_path(command_cls), _class_path(parser_cls), prog, custom_opts))
+        digest = hashlib.sha1(ident.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, '{}.parser'.format(digest))
+
+    def _source_stamp(self, command_cls):
+        stamp = self._source_stamps.get(command_cls)
+        if stamp is None:
+            stamp = self._source_stamps[command_cls] = _source_stamp(command_cls)
+        return stamp
+
+    def _load_snapshot(self, key):
+        if not self.directory:
+            return
+
+        try:
+            if not _is_private(os.stat(self.directory)):
+                return
+            with open(self._snapshot_filename(key), 'rb') as f:
+                if not _is_private(os.fstat(f.fileno())):
+                    return
+                stamp, parser = _ParserUnpickler(f).load()
+        except Exception:
+            return
+
+        if stamp == self._source_stamp(key[0]):
+            return parser
+
+    def _save_snapshot(self, key, parser):
+        if not self.directory:
+            return
+
+        stream = io.BytesIO()
+        try:
+            _ParserPickler(stream, pickle.HIGHEST_PROTOCOL).dump((self._source_stamp(key[0]), parser))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # parser holds unpicklable objects (e.g. lambdas as types)
+            return
+
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, 0o700)
+            write_atomic(self._snapshot_filename(key), lambda f: f.write(stream.getvalue()), 0o600)
+        except (IOError, OSError):
+            pass
+
+
+def _is_private(stat_result):
+    """Return whether a file is owned by the current user
+    and not writable by anyone else"""
+    if not hasattr(os, 'getuid'):
+        return True
+    return stat_result.st_uid == os.getuid() and \
+        not stat_result.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _identity(string):
+    return string
+
+
+class _ParserPickler(pickle.Pickler):
+    """Pickler aware of argparse singletons"""
+
+    def persistent_id(self, obj):
+        if obj is argparse.SUPPRESS:
+            return 'suppress'
+        if getattr(obj, '__name__', None) == 'identity' and \
+                getattr(obj, '__module__', None) == 'argparse':
+            # default type conversion is a local function of ArgumentParser
+            return 'identity'
+
+
+class _ParserUnpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid):
+        if pid == 'suppress':
+            return argparse.SUPPRESS
+        if pid == 'identity':
+            return _identity
+        raise pickle.UnpicklingError('Unknown persistent id {}'.format(pid))
+
+
+def _class_path(cls):
+    return '{}.{}'.format(cls.__module__, getattr(cls, '__qualname__', cls.__name__))
+
+
+def _source_stamp(command_cls):
+    """Return modification times of source files of the class and its bases"""
+    from . import __version__
+
+    stamp = [__version__]
+    for filename in source_files(command_cls):
+        try:
+            stamp.append((filename, os.stat(filename).st_mtime))
+        except OSError:
+            stamp.append((filename, None))
+    return tuple(stamp)
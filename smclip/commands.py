@@ -2,15 +2,50 @@
 # Author: Viliam Krizan
 # License: LGPLv3+
 
-import argparse
+import sys
 
+from .context import InvocationContext
 from .exceptions import *
-from .parsers import ArgparserSub, split_docstring
+from .helpers import REMAINING_ARGS, class_docstring
+from .index import AmbiguousPrefix
+from .instrumentation import phase
+from .lazy import LazyCommand, import_object, string_types
+from .registry import Registry, intern_name
+from .stream import ResultStream, as_stream, callback_result, pipeline_output, stream_result
 
 __all__ = ['Command', 'CommandGroup', 'ChainedCommand', 'ChainedCommandGroup',
            'ChainedOutputResults']
 
 
+class _DocstringPart(object):
+    """Part of class docstring shared by all instances of the class
+
+    Docstring is parsed on first access only.  Value can be overridden
+    per instance by an assignment, it is kept in the slot `attribute`.
+    """
+
+    def __init__(self, index, attribute):
+        self.index = index
+        self.attribute = attribute
+
+    def __get__(self, instance, owner):
+        if instance is not None:
+            value = getattr(instance, self.attribute, _DOCSTRING)
+            if value is not _DOCSTRING:
+                return value
+        return class_docstring(owner)[self.index]
+
+    def __set__(self, instance, value):
+        setattr(instance, self.attribute, value)
+
+    def __delete__(self, instance):
+        setattr(instance, self.attribute, _DOCSTRING)
+
+
+# value of title and description not overridden per instance
+_DOCSTRING = object()
+
+
 class Command(object):
     """Command with action
 
@@ -22,7 +57,7 @@ class Command(object):
     Alias is filled with name from which it was invoked with.
 
     Title and description are filled based on current class
-    docstring.
+    docstring.  Docstring is parsed once per class.
 
     To create a custom command, extend these methods:
         * `add_arguments`
@@ -30,9 +65,26 @@ class Command(object):
         * `preprocess`
         * `results_callback`
 
+    Arguments can be also declared by `arguments` class attribute,
+    which can be read without creating a parser.
+
+    Argparse and parser classes are imported only when a parser
+    is being created.
+
+    Base classes define `__slots__`.  Subclasses get `__dict__` as usual,
+    unless they declare ``__slots__`` too (e.g. ``__slots__ = ()``),
+    which is worth it for large trees of commands.
+
     Class Attributes:
         default_name (str): default real command name
         default_aliases (list): default command aliases
+        default_parser_cls (str): import path of parser class used
+                                  when no `parser_cls` is given
+        arguments (tuple): declared arguments (`smclip.Argument`) added
+                           to parser before `add_arguments` is called
+        pass_context (bool): pass `smclip.context.InvocationContext`
+                             as the first argument of callbacks
+                             (default: False)
 
     Attributes:
         name (str): real command name
@@ -43,41 +95,79 @@ class Command(object):
         description (str): body of current class docstring
         parser_cls (object): argument parser's class (default: ArgumentParser)
         parser (object): lazy loaded parser instance
+        parser_cache (ParserCache): optional cache of parsers shared
+                                    by instances of the same class
     """
 
     default_name = None
     default_aliases = None
+    default_parser_cls = 'argparse:ArgumentParser'
+    parser_cache = None
+    arguments = ()
+    pass_context = False
+
+    title = _DocstringPart(0, '_title')
+    description = _DocstringPart(1, '_description')
+
+    __slots__ = ('name', 'alias', '_parser', 'parent', 'app', '_parser_cls',
+                 '_title', '_description')
 
     def __init__(self, name=None, alias=None, parser_cls=None, app=None):
-        self.name = name or self.default_name
+        name = name or self.default_name
+        self.name = intern_name(name)
         self.alias = alias
         self._parser = None
         self.parent = None
         self.app = app
+        self._parser_cls = parser_cls
 
-        title, description = split_docstring(self.__class__.__doc__)
-        self.title = title
-        self.description = description
-
-        if not parser_cls:
-            parser_cls = argparse.ArgumentParser
+    @property
+    def parser_cls(self):
+        if not self._parser_cls:
+            self._parser_cls = import_object(self.default_parser_cls)
+        return self._parser_cls
 
-        self.parser_cls = parser_cls
+    @parser_cls.setter
+    def parser_cls(self, parser_cls):
+        self._parser_cls = parser_cls
 
     @property
     def parser(self):
         if not self._parser:
-            self._parser = self.create_parser()
+            with phase('create_parser', self):
+                self._parser = self.get_parser()
         return self._parser
 
+    def get_parser(self, **custom_opts):
+        """Return parser from `parser_cache` or create a new one"""
+        if self.parser_cache is None:
+            return self.create_parser(**custom_opts)
+        return self.parser_cache.get_parser(self, custom_opts)
+
     def create_parser(self, **custom_opts):
         """Creates parser and adds all defined arguments"""
         parser_opts = self.get_parser_options()
         parser_opts.update(custom_opts)
         parser = self.parser_cls(**parser_opts)
+        for argument in self.arguments:
+            argument.add_to(parser)
         self.add_arguments(parser)
         return parser
 
+    @classmethod
+    def declared_arguments(cls):
+        """Return declared `arguments` when they are the only arguments
+        of the command class
+
+        Returns:
+            (tuple) of Argument, None when parser of the command
+            is customized by code (e.g. `add_arguments` is extended)
+        """
+        for method in ('add_arguments', 'create_parser', 'get_parser_options'):
+            if getattr(cls, method).__module__ != __name__:
+                return None
+        return tuple(cls.arguments)
+
     def get_parser_options(self):
         """Returns dictionary of options for parser creation"""
         opts = {
@@ -85,7 +175,9 @@ class Command(object):
             'description': self.title,
             'epilog': self.description,
         }
+        from .parsers import ArgparserSub
         if not issubclass(self.parser_cls, ArgparserSub):
+            import argparse
             opts['formatter_class'] = argparse.RawDescriptionHelpFormatter
         return opts
 
@@ -128,36 +220,81 @@ class Command(object):
         """
         pass
 
-    def invoke(self, raw_args):
+    def invoke(self, raw_args, context=None):
         """Command invocation method.
 
+        State of the invocation is kept in the context, so a command
+        (tree) can be invoked concurrently.
+
         Args:
             raw_args (list): list of raw command arguments
+            context (InvocationContext): context of the invocation
+                                         (default: a new one)
         """
-        namespace = self.parser.parse_args(raw_args)
+        if context is None:
+            context = InvocationContext(self)
+
+        parser = self.parser
+        with phase('parse_args', self):
+            namespace = parser.parse_args(raw_args)
         parsed_args, _ = self._extract_parsed_args(namespace)
 
-        return self.invoke_callbacks(parsed_args)
+        return self.invoke_callbacks(parsed_args, context)
 
-    def invoke_callbacks(self, parsed_args):
+    def invoke_callbacks(self, parsed_args, context=None):
         """Invoke preprocess and this_action callback and
-        return value from this_action callback"""
+        return value from this_action callback
 
-        preprocessed_args = self.preprocess(**dict(parsed_args))
+        An iterator returned by this_action is wrapped
+        in `smclip.stream.ResultStream`.
+        """
+        if context is None:
+            context = InvocationContext(self)
+        context.args = parsed_args
+
+        with phase('preprocess', self):
+            preprocessed_args = self.preprocess(*self.context_args(context), **parsed_args)
         if isinstance(preprocessed_args, dict):
-            action_args = dict(preprocessed_args)
+            action_args = preprocessed_args
         elif preprocessed_args is None:
-            action_args = dict(parsed_args)
+            action_args = parsed_args
         else:
             raise AssertionError('Expected preprocess to return dict or None, {} returned instead!'
                                  .format(type(preprocessed_args)))
 
-        rv = self.this_action(**action_args)
-        return rv
+        with phase('this_action', self):
+            rv = self.this_action(*self.context_args(context), **action_args)
+        return stream_result(self, rv)
+
+    def context_args(self, context, *args):
+        """Return positional arguments of a callback, prefixed
+        by the context when the command has `pass_context`"""
+        if self.pass_context:
+            return (context,) + args
+        return args
+
+    def ainvoke(self, raw_args, context=None):
+        """Awaitable counterpart of `invoke`
+
+        Callbacks may be coroutine functions, they are awaited.
+        Requires Python 3.5 or newer.
+
+        Args:
+            raw_args (list): list of raw command arguments
+            context (InvocationContext): context of the invocation
+                                         (default: a new one)
+        """
+        from .aio import command_ainvoke
+        return command_ainvoke(self, raw_args, context)
+
+    def ainvoke_callbacks(self, parsed_args, context=None):
+        """Awaitable counterpart of `invoke_callbacks`"""
+        from .aio import invoke_callbacks
+        return invoke_callbacks(self, parsed_args, context)
 
     def _extract_parsed_args(self, namespace):
         args = dict(vars(namespace))
-        remaining = args.pop(ArgparserSub.REMAINING_ARGS, None)
+        remaining = args.pop(REMAINING_ARGS, None)
         return args, remaining
 
     def commands_for_args(self, raw_args):
@@ -168,7 +305,7 @@ class Command(object):
         """
         return [self]
 
-    def preprocess(self, **args):
+    def preprocess(self, *context, **args):
         """Callback invoked before action callback
 
         This callback is only called when there is no error
@@ -177,22 +314,38 @@ class Command(object):
         arguments that will be passed to ``this_action``
         callback.
 
+        With `pass_context`, the invocation context is passed
+        as the first argument.
+
         Args:
+            *context: invocation context with `pass_context`
             **args: parsed arguments
         """
         pass
 
-    def this_action(self, **args):
+    def this_action(self, *context, **args):
         """Action process for this command.
 
         This callback is only called when there is no error
         from argument parsing.
 
+        With `pass_context`, the invocation context is passed
+        as the first argument.
+
         Args:
+            *context: invocation context with `pass_context`
             **args: parsed or preprocessed arguments
         """
         pass
 
+    def reset(self):
+        """Reset state of the last invocation before the instance
+        is reused by `smclip.pool.CommandPool`
+
+        Extend it when a command keeps its own per-invocation state.
+        """
+        self.alias = None
+
 
 class CommandGroup(Command):
     """Command with subcommands
@@ -200,7 +353,10 @@ class CommandGroup(Command):
     It behaves identically to simple Command on certain conditions
     and above that it supports a subcommad.
 
-    Each subcommands can be registered with `register` method.
+    Each subcommands can be registered with `register` method,
+    or declared by `subcommands` class attribute.  Declared subcommands
+    are registered once per class and all instances share them, until
+    `register` is called on an instance.
     When no subcommand is provided then action for this command
     is invoked.  `preprocess` and `results_callback` are invoked
     every time (when no argument errors are present).
@@ -222,9 +378,28 @@ class CommandGroup(Command):
     when no fallback or default commands are registered.  If only a default
     command is register then it is its responsiblity to resolved this situation.
 
+    With `abbreviate_subcommands`, a subcommand can be also invoked by
+    a unique prefix of its name or aliases (e.g. ``ta li`` for
+    ``task list``).  A prefix of several subcommands raises
+    CommandAmbiguous, unless a fallback command is registered.
+
     Command Group contains a attribute `invoked_subcommand` which holds
     an instance to a command that is being invoked. This attribute is
-    filled in before calling a `preprocess` method.
+    filled in before calling a `preprocess` method and it is replaced
+    by the next invocation.  It is kept for compatibility only and never
+    read by the group itself; when a group is invoked concurrently,
+    use `invoked_subcommand` of the invocation context
+    (see `pass_context`) instead.
+
+    With `pool_subcommands`, subcommand instances of the last invocation
+    are returned to `subcommand_pool` when the next invocation starts
+    and reused, with their parsers, by later invocations.  Pooled groups
+    must not be invoked concurrently.
+
+    A root group can be frozen by `freeze`, then `invoke` looks up
+    the whole path of subcommands in a flat dispatch table and each
+    group parses only its own slice of arguments.  Subcommands cannot
+    be registered to a frozen group.
 
     `results_callback` is called after a subcommand or current command
     action is done and it is filled with an argument containing a result
@@ -236,108 +411,352 @@ class CommandGroup(Command):
         * `this_action`
         * `preprocess`
 
+    Class Attributes:
+        subcommands (tuple): declared subcommands (`smclip.Subcommand`)
+        abbreviate_subcommands (bool): accept unique prefixes of subcommand
+                                       names and aliases (default: False)
+        pool_subcommands (bool): reuse subcommand instances across
+                                 invocations (default: False)
+
     Attributes:
-        subcmds_cls (dict): mapping of commands [name] => [command class]
-        subcmd_aliases (dict): mapping of commands based on aliases
+        subcmds_cls (mapping): read-only mapping of commands
                                [name] => [command class]
+        subcmd_aliases (mapping): read-only mapping of commands based
+                                  on aliases [name] => [command class]
         invoked_subcommand (Command): a command instance that is being
                                       invoked as subcommand
+        manifest (Manifest): optional manifest of the command tree used
+                             for help and possible command names
+        subcommand_pool (CommandPool): pool of subcommand instances,
+                                       None unless `pool_subcommands` is set
 
     Keyword Args:
         parser_cls (class): argument parser class (default: ArgparseSub)
     """
 
-    def __init__(self, *args, **kwargs):
-        kwargs.setdefault('parser_cls', ArgparserSub)
-        super(CommandGroup, self).__init__(*args, **kwargs)
-        self.subcmds_cls = {}
-        self.subcmd_aliases = {}
-        self._subcmd_names = {}
+    default_parser_cls = 'smclip.parsers:ArgparserSub'
+    manifest = None
+    subcommands = ()
+    abbreviate_subcommands = False
+    pool_subcommands = False
 
-        self._fallback_subcmd_cls = None
-        self._default_subcmd_cls = None
+    __slots__ = ('_registry', 'invoked_subcommand', '_completion_resolver', 'subcommand_pool',
+                 '_pooled_subcommands', '_frozen')
 
+    def __init__(self, *args, **kwargs):
+        super(CommandGroup, self).__init__(*args, **kwargs)
+        self._registry = self.class_registry()
         self.invoked_subcommand = None
-
-    def register(self, command_cls, name=None, aliases=None, is_default=False, is_fallback=False):
+        self._completion_resolver = None
+        self.subcommand_pool = None
+        self._pooled_subcommands = []
+        self._frozen = None
+        if self.pool_subcommands:
+            from .pool import CommandPool
+            self.subcommand_pool = CommandPool()
+
+    def register(self, command_cls, name=None, aliases=None, is_default=False, is_fallback=False,
+                 title=None):
         """Register a new subcommand with its class
 
         Name and aliases are optional, and defaults to the class
         `default_name` and `default_aliases`.
 
+        Command class can be given as an import path
+        (``package.module:CommandClass``).  Such command is imported
+        only when it is being invoked, therefore its name has to be
+        specified.  Title is then used as its one-line summary in help.
+
         Args:
-            command_cls (class): a subcommand class
+            command_cls (class): a subcommand class or its import path
             name (str): optional name of command (default: None)
             aliases: optional aliases (default: None)
             is_default: make this command as default (default: False)
             is_fallback: make this command as fallback (default: False)
+            title (str): summary of lazily imported command (default: None)
+
+        Raises:
+            RuntimeError: the group is frozen
         """
-        name = name or command_cls.default_name
-        aliases = aliases or command_cls.default_aliases or tuple()
+        self._own_registry().add(command_cls, name=name, aliases=aliases, is_default=is_default,
+                                 is_fallback=is_fallback, title=title)
+
+    def _own_registry(self):
+        """Return registry of the instance for a change, the registry
+        shared by instances of the class is copied on first change"""
+        if self._frozen is not None:
+            raise RuntimeError('Command group {} is frozen, its subcommands cannot be changed'
+                               .format(self.name))
+
+        registry = self._registry
+        if registry is self.class_registry():
+            # copy on write, the registry is shared by instances
+            registry = self._registry = registry.copy()
+            self._parser = None
+        return registry
+
+    def _instance_registry(self):
+        """Return registry of the instance, a frozen one refuses changes"""
+        if self._frozen is not None:
+            return self._registry
+        return self._own_registry()
+
+    @classmethod
+    def class_registry(cls):
+        """Return registry of subcommands declared by `subcommands`
+        shared by instances of the class"""
+        registry = cls.__dict__.get('_class_registry')
+        if registry is None:
+            registry = Registry()
+            for subcommand in cls.subcommands:
+                registry.add(subcommand.command_cls, **subcommand.options)
+            cls._class_registry = registry
+        return registry
 
-        if not name and not command_cls.default_name:
-            raise RuntimeError('No name specified for command class {}'.format(command_cls.__name__))
+    @property
+    def subcmds_cls(self):
+        """Mapping of subcommand names to classes of this instance
 
-        if name in self.subcmds_cls:
-            raise RuntimeError('Command with name {} is already registered!'.format(name))
+        The instance gets its own copy of the registry shared by the class
+        on first access, so changes of the mapping (or an assigned mapping)
+        affect subcommands of this instance only.
+        """
+        return self._instance_registry().subcmds_cls
 
-        self.subcmds_cls[name] = command_cls
-        self._subcmd_names[command_cls] = name
+    @subcmds_cls.setter
+    def subcmds_cls(self, subcmds_cls):
+        self._own_registry().replace(subcmds_cls=subcmds_cls)
+        self._parser = None
 
-        for alias in aliases:
-            if alias in self.subcmds_cls:
-                raise RuntimeError('Alias {} is already registered as command!'.format(name))
-            if alias in self.subcmd_aliases:
-                raise RuntimeError('Alias with name {} is already registered!'.format(name))
+    @property
+    def subcmd_aliases(self):
+        """Mapping of subcommand aliases to classes of this instance,
+        see `subcmds_cls`"""
+        return self._instance_registry().subcmd_aliases
+
+    @subcmd_aliases.setter
+    def subcmd_aliases(self, subcmd_aliases):
+        self._own_registry().replace(subcmd_aliases=subcmd_aliases)
+        self._parser = None
 
-            self.subcmd_aliases[alias] = command_cls
+    @property
+    def _subcmd_names(self):
+        return self._registry.names
 
-        if is_fallback:
-            self._fallback_subcmd_cls = command_cls
+    @property
+    def _subcmds_order(self):
+        return self._registry.order
 
-        if is_default:
-            self._default_subcmd_cls = command_cls
+    @property
+    def _default_subcmd_cls(self):
+        return self._registry.default
+
+    @property
+    def _fallback_subcmd_cls(self):
+        return self._registry.fallback
+
+    def use_manifest(self, manifest):
+        """Register subcommands from manifest of the command tree
+
+        Subcommands are registered by their import paths and the manifest
+        is then used to answer help and possible command names without
+        importing any command class.
+
+        Args:
+            manifest (Manifest): manifest loaded by `smclip.manifest.load_manifest`
+        """
+        manifest.register_subcommands(self)
+        self.manifest = manifest
+
+    def register_plugins(self, entry_point_group, index=None):
+        """Register subcommands provided by installed packages
+        as entry points, they are imported only when invoked
+
+        Args:
+            entry_point_group (str): name of the entry point group
+            index (PluginIndex): optional cached index of entry points,
+                                 see `smclip.plugins.PluginIndex`
+
+        Returns:
+            (list) of names of registered subcommands
+        """
+        from .plugins import register_plugins
+        return register_plugins(self, entry_point_group, index)
+
+    def freeze(self):
+        """Compile the command tree into a flat dispatch table
+
+        Every path of names and aliases is looked up at once and
+        each group gets only its own slice of arguments, see
+        `smclip.frozen`.  All command classes of the tree are imported.
+        Registration of subcommands of a frozen group is rejected,
+        the tree is expected not to change (e.g. by registrations
+        depending on arguments) after freezing.
+
+        Groups of the tree are instantiated once, when the tree is frozen.
+        A subgroup whose instance later maps a routed name to another
+        class than the frozen one (e.g. registering conditionally
+        in ``__init__``) dispatches its arguments itself, but changes
+        of its arguments are not detected.  Groups overriding `invoke`
+        or `parse_and_get_command` are never routed through, the route
+        ends at them and they dispatch their subcommands themselves.
+
+        Returns:
+            (FrozenTable) dispatch table of the tree
+        """
+        if self._frozen is None:
+            from .frozen import FrozenTable
+            registry = self._own_registry()
+            table = FrozenTable(self)
+            registry.frozen = True
+            self._frozen = table
+        return self._frozen
+
+    @property
+    def frozen(self):
+        """True when the group has been frozen by `freeze`"""
+        return self._frozen is not None
+
+    def print_manifest_help(self, raw_args):
+        """Print help from manifest and exit when arguments request it"""
+        from .manifest import ManifestMiss
+
+        try:
+            help_text = self.manifest.format_help(raw_args)
+        except ManifestMiss:
+            return
+
+        if help_text is not None:
+            sys.stdout.write(help_text)
+            sys.exit(0)
 
     def get_parser_options(self):
         opts = super(CommandGroup, self).get_parser_options()
 
         # pass subcommands to parser for showing help
-        opts['subcommands'] = self.subcmds_cls
+        opts['subcommands'] = self._registry.subcmds_cls
+        opts['subcommands_order'] = self._subcmds_order
+        opts['help_cache'] = self._registry.help_cache
         return opts
 
     def create_parser(self, **custom_opts):
+        from argparse import REMAINDER
         parser = super(CommandGroup, self).create_parser(**custom_opts)
-        parser.add_argument(ArgparserSub.REMAINING_ARGS, nargs=argparse.REMAINDER)
+        parser.add_argument(REMAINING_ARGS, nargs=REMAINDER)
         return parser
 
-    def invoke(self, raw_args):
-        namespace, unknown_args = self.parser.parse_known_args(raw_args)
+    def invoke(self, raw_args, context=None):
+        if context is None:
+            context = InvocationContext(self)
+
+        if self._frozen is not None:
+            with phase('route', self):
+                steps, target_start = self._frozen.route(raw_args)
+            if steps:
+                return self.invoke_route(raw_args, steps, target_start, context)
+
+        if self.manifest is not None:
+            self.print_manifest_help(raw_args)
+
+        parser = self.parser
+        with phase('parse_args', self):
+            namespace, unknown_args = parser.parse_known_args(raw_args)
         parsed_args, sub_args = self._extract_parsed_args(namespace)
 
         try:
-            is_default, command = self.parse_and_get_command(raw_args, namespace, unknown_args)
+            with phase('parse_and_get_command', self):
+                is_default, command = self.parse_and_get_command(raw_args, namespace,
+                                                                 unknown_args)
         except CommandError as e:
             e.parser.error(str(e))
 
+        self.invoked_subcommand = command
         if not command:
             # no subcommand was issues, call current one
-            return self.invoke_callbacks(parsed_args)
+            return self.invoke_callbacks(parsed_args, context)
 
+        context.invoked_subcommand = command
         if is_default:
-            return self.invoke_default(raw_args)
+            return self.invoke_default(raw_args, command, context)
+        else:
+            context.args = parsed_args
+            with phase('preprocess', self):
+                self.preprocess(*self.context_args(context), **parsed_args)
+            rv = command.invoke(sub_args, context.child(command))  # Subcommand invocation
+            with phase('results_callback', self):
+                return callback_result(rv, self.results_callback(*self.context_args(context, rv)))
+
+    def invoke_route(self, raw_args, steps, target_start, context=None):
+        """Invoke subcommands along a route of the frozen tree
+
+        Each group parses only its own slice of arguments (groups with
+        no arguments use defaults recorded by `freeze`), the last
+        subcommand is invoked with the rest of arguments.
+
+        Args:
+            raw_args (list): arguments of this group
+            steps (list): steps of the route from this group,
+                          see `smclip.frozen.FrozenTable.route`
+            target_start (int): position of arguments of the last subcommand
+            context (InvocationContext): context of the group invocation
+        """
+        if context is None:
+            context = InvocationContext(self)
+
+        level, start, end, sublevel = steps[0]
+        if self._frozen is None and not self._routes_to(raw_args[end], sublevel):
+            # subcommands registered by the instance differ from the frozen tree
+            return self.invoke(raw_args[start:], context)
+
+        if start == end and level.defaults is not None:
+            parsed_args = dict(level.defaults)
         else:
-            self.preprocess(**dict(parsed_args))
-            rv = command.invoke(sub_args)  # Subcommand invocation
-            self.results_callback(rv)
-            return rv
+            parser = self.parser
+            with phase('parse_args', self):
+                namespace = parser.parse_args(raw_args[start:end])
+            parsed_args, _ = self._extract_parsed_args(namespace)
+
+        if self.subcommand_pool is not None:
+            self.release_subcommands()
+        with phase('new_subcommand', self):
+            subcmd = self.get_subcommand(sublevel.command_cls, sublevel.name, raw_args[end])
+        subcmd.parent = self
+        self.invoked_subcommand = subcmd
+
+        context.invoked_subcommand = subcmd
+        context.args = parsed_args
+        with phase('preprocess', self):
+            self.preprocess(*self.context_args(context), **parsed_args)
+        subcontext = context.child(subcmd)
+        if len(steps) > 1:
+            rv = subcmd.invoke_route(raw_args, steps[1:], target_start, subcontext)
+        else:
+            rv = subcmd.invoke(raw_args[target_start:], subcontext)  # Subcommand invocation
+        with phase('results_callback', self):
+            return callback_result(rv, self.results_callback(*self.context_args(context, rv)))
+
+    def _routes_to(self, token, sublevel):
+        """Return whether subcommand named by token is the one of the frozen level"""
+        registry = self._registry
+        subcmd_cls = registry.subcmds_cls.get(token) or registry.subcmd_aliases.get(token)
+        return subcmd_cls is not None and self.load_subcmd_cls(subcmd_cls) is sublevel.command_cls
+
+    def ainvoke(self, raw_args, context=None):
+        from .aio import group_ainvoke
+        return group_ainvoke(self, raw_args, context)
 
     def parse_and_get_command(self, raw_args, namespace, unknown_args):
         """Parse raw arguments and return subcommand object
 
+        Default subcommand is returned already instantiated,
+        `invoke_default` then only parses its arguments.
+
         Returns:
             tuple: (is_default, command)
         """
-        parsed_args, sub_args = self._extract_parsed_args(namespace)
+        if self.subcommand_pool is not None:
+            self.release_subcommands()
+        sub_args = getattr(namespace, REMAINING_ARGS, None)
 
         if unknown_args:
             if self._default_subcmd_cls:
@@ -351,8 +770,12 @@ class CommandGroup(Command):
 
         if sub_args:
             subcmd_name = sub_args.pop(0)
-            subcmd_cls = (self.subcmds_cls.get(subcmd_name)
-                          or self.subcmd_aliases.get(subcmd_name))
+            try:
+                subcmd_name, subcmd_cls = self.find_subcmd_cls(subcmd_name)
+            except CommandAmbiguous:
+                if not self._fallback_subcmd_cls:
+                    raise
+                subcmd_cls = None
 
             if not subcmd_cls:
                 if self._fallback_subcmd_cls:
@@ -360,12 +783,14 @@ class CommandGroup(Command):
                 else:
                     raise CommandNotFound(subcmd_name,
                                           parent=self,
-                                          parser=self.parser)
+                                          parser=self.parser,
+                                          suggestions=self.similar_command_names(subcmd_name))
 
             real_name = self.get_subcmd_real_name(subcmd_cls)
-            subcmd = self.new_subcommand(subcmd_cls, real_name, subcmd_name)
+            with phase('new_subcommand', self):
+                subcmd_cls = self.load_subcmd_cls(subcmd_cls)
+                subcmd = self.get_subcommand(subcmd_cls, real_name, subcmd_name)
 
-            self.invoked_subcommand = subcmd
             subcmd.parent = self
 
             return False, subcmd
@@ -379,26 +804,116 @@ class CommandGroup(Command):
         kwargs['app'] = self.app
         return subcmd_cls(real_name, aliased_name, **kwargs)
 
+    def get_subcommand(self, subcmd_cls, real_name, aliased_name=None):
+        """Return subcommand instance for an invocation, taken from
+        `subcommand_pool` when possible, created by `new_subcommand` otherwise"""
+        if self.subcommand_pool is None:
+            return self.new_subcommand(subcmd_cls, real_name, aliased_name)
+
+        subcmd = self.subcommand_pool.checkout(subcmd_cls, real_name, aliased_name)
+        if subcmd is None:
+            subcmd = self.new_subcommand(subcmd_cls, real_name, aliased_name)
+        self._pooled_subcommands.append(subcmd)
+        return subcmd
+
+    def release_subcommands(self):
+        """Forget subcommands of the last invocation and return them
+        to `subcommand_pool`
+
+        It is called when the next invocation of a group with
+        `subcommand_pool` starts.  Results of the last invocation
+        (e.g. result streams) must not be used afterwards.
+        """
+        self.invoked_subcommand = None
+        pooled, self._pooled_subcommands = self._pooled_subcommands, []
+        for subcmd in pooled:
+            self.subcommand_pool.checkin(subcmd)
+
+    def reset(self):
+        super(CommandGroup, self).reset()
+        self.release_subcommands()
+
     def _new_default_subcommand(self, raw_args):
         subcmd_cls = self._default_subcmd_cls
         real_name = self.get_subcmd_real_name(subcmd_cls)
+        with phase('new_subcommand', self):
+            subcmd_cls = self.load_subcmd_cls(subcmd_cls)
+            subcmd = self.get_subcommand(subcmd_cls, real_name)
 
-        subcmd = self.new_subcommand(subcmd_cls, real_name)
         subcmd.parent = self
-        self.invoked_subcommand = subcmd
         return subcmd
 
-    def invoke_default(self, raw_args):
-        """Invoke subcommand that was registered as default"""
-        subcmd = self._new_default_subcommand(raw_args)
-        return subcmd.invoke(raw_args)
+    def invoke_default(self, raw_args, command=None, context=None):
+        """Invoke subcommand that was registered as default
+
+        Args:
+            raw_args (list): arguments of the group, parsed by the subcommand
+            command (Command): default subcommand returned by
+                               `parse_and_get_command` (default: a new one)
+            context (InvocationContext): context of the group invocation
+        """
+        if command is None:
+            command = self._new_default_subcommand(raw_args)
+            self.invoked_subcommand = command
+        if context is None:
+            context = InvocationContext(self)
+        context.invoked_subcommand = command
+        return command.invoke(raw_args, context.child(command))
+
+    def find_subcmd_cls(self, name):
+        """Return subcommand class registered by name or alias
+
+        With `abbreviate_subcommands`, a unique prefix of names
+        and aliases is accepted as well.
+
+        Returns:
+            tuple: (matched name or alias, command class), class is None
+                   when no subcommand is matched
+
+        Raises:
+            CommandAmbiguous: prefix matches several subcommands
+        """
+        registry = self._registry
+        subcmd_cls = registry.subcmds_cls.get(name) or registry.subcmd_aliases.get(name)
+        if subcmd_cls or not self.abbreviate_subcommands:
+            return name, subcmd_cls
+
+        try:
+            matched_name, subcmd_cls = self.prefix_trie.lookup(name)
+        except AmbiguousPrefix as e:
+            raise CommandAmbiguous(name, parent=self, parser=self.parser, candidates=e.keys)
+        return matched_name or name, subcmd_cls
+
+    @property
+    def prefix_trie(self):
+        """Trie of names and aliases of subcommands, built on first use
+        and then kept up to date by `register`"""
+        return self._registry.prefix_trie
+
+    def similar_command_names(self, name, limit=3):
+        """Return names and aliases of subcommands similar to the name
+
+        Names are looked up in an index built on first use
+        and then kept up to date by `register`.
+
+        Returns:
+            (list) of names, the most similar first
+        """
+        return self._registry.similarity_index.similar(name, limit=limit)
 
     def get_subcmd_real_name(self, subcmd_cls):
         return self._subcmd_names.get(subcmd_cls)
 
+    def load_subcmd_cls(self, subcmd_cls):
+        """Return registered subcommand class, import it when it was
+        registered by its import path"""
+        if isinstance(subcmd_cls, LazyCommand):
+            return subcmd_cls.load()
+        return subcmd_cls
+
     def commands_for_args(self, raw_args):
-        self._parser = self.create_parser(add_help=False)
-        namespace, unknown_args = self.parser.parse_known_args(raw_args)
+        parser = self.get_parser(add_help=False)
+        namespace, unknown_args = parser.parse_known_args(raw_args)
         parsed_args, sub_args = self._extract_parsed_args(namespace)
 
         is_default, command = self.parse_and_get_command(raw_args, namespace, unknown_args)
@@ -406,57 +921,112 @@ class CommandGroup(Command):
             return command.commands_for_args(sub_args)
         else:
             commands = [self]
-            subcommand_cls = self.subcmds_cls.values()
+            subcommand_cls = self._registry.subcmds_cls.values()
             commands.extend(cls() for cls in subcommand_cls)
             return commands
 
+    @property
+    def completion_resolver(self):
+        """Lazy loaded resolver of possible subcommand names"""
+        if self._completion_resolver is None:
+            from .completion import CompletionResolver
+            self._completion_resolver = CompletionResolver(self)
+        return self._completion_resolver
+
     def possible_command_names(self, raw_args):
         """Return possible subcommand names for a set of arguments
 
+        Names are resolved by `completion_resolver`, which neither
+        rebuilds parsers nor instantiates final commands.
+
         Returns:
             (list) of strings of command names,
             None on failure in case of bad arguments.
         """
-        try:
-            commands = self.commands_for_args(raw_args)
-        except CommandError:
-            return
-        except SystemExit as e:
-            # handle bad arguments
-            if e.code == 2:
-                return
-            raise
+        if self.manifest is not None:
+            from .manifest import ManifestMiss
+            try:
+                return self.manifest.possible_command_names(raw_args)
+            except ManifestMiss:
+                pass
+
+        return self.completion_resolver.possible_command_names(raw_args)
 
-        command_names = [cmd.name for cmd in commands]
-        if not command_names:
-            return []
+    def invoke_batch(self, records, stop_on_error=False):
+        """Invoke this command for many argument records in one process
 
-        command_names.pop(0)  # remove command that is currently in effect
-        command_names.sort()
-        return command_names
+        See `smclip.batch.invoke_batch`.
 
-    def results_callback(self, rv):
+        Args:
+            records: iterable of argument lists or lines
+                     (e.g. from `smclip.batch.read_records`)
+            stop_on_error (bool): stop on the first failed record
+
+        Returns:
+            (list) of BatchResult
+        """
+        from .batch import invoke_batch
+        return invoke_batch(self, records, stop_on_error=stop_on_error)
+
+    def serve(self, address, **kwargs):
+        """Serve invocations of this command over a Unix socket
+
+        See `smclip.server.CommandServer` for keyword arguments.
+        """
+        from .server import CommandServer
+        CommandServer(self, address, **kwargs).serve_forever()
+
+    def results_callback(self, *rv):
         """Callback for collecting results from subcommands.
 
         This callback is only called when a subcommand is in effect.
 
+        Result value of an action returning an iterator is
+        a `smclip.stream.ResultStream`, which can be consumed here
+        while results are being produced.  A stream returned from this
+        callback replaces the result value passed to parent groups.
+
         Args:
-            rv: result value
+            *rv: result value, preceded by invocation context
+                 with `pass_context`
         """
         pass
 
 
 class ChainedCommand(Command):
+    """Command invoked in a chain of `ChainedCommandGroup`
+
+    Class Attributes:
+        chain_serial (bool): command must not run concurrently with other
+                             chained commands (default: False)
+
+    Attributes:
+        upstream (ResultStream): output of the previous chained command
+                                 when the group is a pipeline
+    """
+
+    chain_serial = False
+
+    __slots__ = ('upstream',)
+
+    def __init__(self, *args, **kwargs):
+        super(ChainedCommand, self).__init__(*args, **kwargs)
+        self.upstream = None
+
+    def reset(self):
+        super(ChainedCommand, self).reset()
+        self.upstream = None
 
     def create_parser(self, **custom_opts):
+        from argparse import REMAINDER
         parser = super(ChainedCommand, self).create_parser(**custom_opts)
-        parser.add_argument(ArgparserSub.REMAINING_ARGS, nargs=argparse.REMAINDER)
+        parser.add_argument(REMAINING_ARGS, nargs=REMAINDER)
         return parser
 
     def commands_for_args(self, raw_args):
         if self.parent:
             commands = [self]
-            chained_cls = self.parent.subcmds_cls.values()
+            chained_cls = self.parent._registry.subcmds_cls.values()
             commands.extend(cls() for cls in chained_cls)
             return commands
         else:
@@ -473,18 +1043,50 @@ class ChainedCommandGroup(CommandGroup):
     Invoked subcommands have to be final, cannot be groups for
     holding other subcommands.
 
+    Chained commands can be run concurrently by an executor from
+    `concurrent.futures`.  In a `ProcessPoolExecutor`, a chained command
+    is rebuilt in the worker from its class (which must be importable),
+    name, alias and parsed arguments, without its parent and `app`;
+    its result value must be picklable.  Chained command marked by `chain_serial`
+    waits for all preceding commands and it is finished before any
+    following command is started.  Results are always in command order.
+
+    In pipeline mode chained commands are stages of a pipeline (as with
+    Unix pipes).  Each command gets the output of the previous one
+    as its `upstream` stream and the output of the last command is
+    the result value.  Stages written as generators are chained lazily,
+    so a stage can stop its upstream early.  Chained commands are not
+    run concurrently in this mode.
+
+    Class Attributes:
+        chain_workers (int): number of workers for running chained commands
+                             concurrently (default: None, commands run
+                             one by one)
+        chain_executor_cls (class): executor class created with
+                                    `chain_workers` (default: ThreadPoolExecutor)
+        pipeline (bool): chained commands form a pipeline (default: False)
+
     Attributes:
         invoked_subcommand: is set to True when any subcommand is being invoked
         invoked_subcommands (list): list of commands instances being invoked
+        chain_executor (Executor): optional executor shared by invocations,
+                                   it is not shut down after use
     """
 
+    chain_workers = None
+    chain_executor_cls = None
+    pipeline = False
+
+    __slots__ = ('invoked_subcommands', 'chain_executor')
+
     def __init__(self, *args, **kwargs):
         super(ChainedCommandGroup, self).__init__(*args, **kwargs)
         self.invoked_subcommands = None
+        self.chain_executor = None
 
     def register(self, command_cls, **kwargs):
-        assert issubclass(command_cls, ChainedCommand), \
-            'Only Commands type of ChainedCommand can be registered!'
+        if not isinstance(command_cls, (LazyCommand,) + string_types):
+            self._check_chained_cls(command_cls)
         assert not kwargs.get('is_default'), \
             '{} does not support default commands'.format(self.__class__.__name__)
         assert not kwargs.get('is_fallback'), \
@@ -492,62 +1094,236 @@ class ChainedCommandGroup(CommandGroup):
 
         super(ChainedCommandGroup, self).register(command_cls, **kwargs)
 
+    def load_subcmd_cls(self, subcmd_cls):
+        subcmd_cls = super(ChainedCommandGroup, self).load_subcmd_cls(subcmd_cls)
+        self._check_chained_cls(subcmd_cls)
+        return subcmd_cls
+
+    @staticmethod
+    def _check_chained_cls(command_cls):
+        assert issubclass(command_cls, ChainedCommand), \
+            'Only Commands type of ChainedCommand can be registered!'
+
     def get_parser_options(self):
         opts = super(ChainedCommandGroup, self).get_parser_options()
         opts['subcmds_help_title'] = 'chained subcommands'
         return opts
 
-    def invoke(self, raw_args):
-        namespace = self.parser.parse_args(raw_args)
+    def invoke(self, raw_args, context=None):
+        if context is None:
+            context = InvocationContext(self)
+
+        if self.manifest is not None:
+            self.print_manifest_help(raw_args)
+
+        parser = self.parser
+        with phase('parse_args', self):
+            namespace = parser.parse_args(raw_args)
         parsed_args, remaining = self._extract_parsed_args(namespace)
 
+        context.invoked_subcommands = []
         try:
-            chained_cmd_args = self.parse_and_get_chain(remaining)
+            with phase('parse_and_get_chain', self):
+                chained_cmd_args = self.parse_and_get_chain(remaining,
+                                                            context.invoked_subcommands)
         except CommandError as e:
             e.parser.error(str(e))
+        finally:
+            self.set_invoked_subcommands(context.invoked_subcommands)
 
         if chained_cmd_args:
-            self.preprocess(**dict(parsed_args))
-            results = ChainedOutputResults()
+            context.args = parsed_args
+            with phase('preprocess', self):
+                self.preprocess(*self.context_args(context), **parsed_args)
+            rv = self.invoke_chain(chained_cmd_args, context)
+            with phase('results_callback', self):
+                rv = callback_result(rv, self.results_callback(*self.context_args(context, rv)))
+
+        else:
+            # Callback
+            rv = self.invoke_callbacks(parsed_args, context)
+
+        return rv
+
+    def ainvoke(self, raw_args, context=None):
+        from .aio import chained_group_ainvoke
+        return chained_group_ainvoke(self, raw_args, context)
+
+    def ainvoke_chain(self, chained_cmd_args, context=None):
+        """Awaitable counterpart of `invoke_chain`, chained commands are
+        awaited concurrently"""
+        from .aio import invoke_chain
+        return invoke_chain(self, chained_cmd_args, context)
+
+    def chain_contexts(self, chained_cmd_args, context=None):
+        """Return triples of (command, parsed args, context)
+        of chained commands
+
+        Args:
+            chained_cmd_args (list): pairs of (command, parsed args)
+            context (InvocationContext): context of the group invocation
+        """
+        if context is None:
+            context = InvocationContext(self)
+        context.invoked_subcommands = [subcmd for subcmd, _ in chained_cmd_args]
+        return [(subcmd, sub_args, context.child(subcmd))
+                for subcmd, sub_args in chained_cmd_args]
+
+    def invoke_chain(self, chained_cmd_args, context=None):
+        """Invoke callbacks of chained commands
+
+        Args:
+            chained_cmd_args (list): pairs of (command, parsed args)
+            context (InvocationContext): context of the group invocation
+
+        Returns:
+            ChainedOutputResults, or ResultStream in pipeline mode
+        """
+        chained_cmd_args = self.chain_contexts(chained_cmd_args, context)
+        if self.pipeline:
+            return self.invoke_pipeline(chained_cmd_args)
+
+        results = ChainedOutputResults()
+
+        executor = self.chain_executor
+        owned_executor = False
+        if executor is None and self.chain_workers and self.chain_workers > 1:
+            executor = self.create_chain_executor()
+            owned_executor = True
 
-            for subcmd, sub_args in chained_cmd_args:
+        if executor is None:
+            for subcmd, sub_args, subcontext in chained_cmd_args:
                 # Our Chained command invocation
-                subrv = subcmd.invoke_callbacks(sub_args)
+                subrv = subcmd.invoke_callbacks(sub_args, subcontext)
                 results.add_result(subcmd, subrv)
+            return results
+
+        try:
+            pending = []
+            for subcmd, sub_args, subcontext in chained_cmd_args:
+                if subcmd.chain_serial:
+                    self._collect_chain_results(pending, results)
+                    results.add_result(subcmd, subcmd.invoke_callbacks(sub_args, subcontext))
+                else:
+                    pending.append((subcmd, self._submit_chained(executor, subcmd, sub_args,
+                                                                 subcontext)))
 
-            rv = results
-            self.results_callback(rv)
+            self._collect_chain_results(pending, results)
+        finally:
+            if owned_executor:
+                executor.shutdown(wait=True)
 
+        return results
+
+    def invoke_pipeline(self, chained_cmd_args):
+        """Invoke chained commands as stages of a pipeline
+
+        Args:
+            chained_cmd_args (list): triples of (command, parsed args, context)
+                                     from `chain_contexts`
+
+        Returns:
+            ResultStream of the last chained command
+        """
+        upstreams = []
+        rv = producer = None
+        for subcmd, sub_args, subcontext in chained_cmd_args:
+            subcmd.upstream = subcontext.upstream = as_stream(rv, producer)
+            upstreams.append(subcmd.upstream)
+            rv = subcmd.invoke_callbacks(sub_args, subcontext)
+            producer = subcmd
+
+        return pipeline_output(rv, upstreams, producer)
+
+    def create_chain_executor(self):
+        """Create executor for concurrent chained commands
+
+        Raises:
+            RuntimeError: `concurrent.futures` is not available (Python 2
+                          without the ``futures`` backport)
+        """
+        executor_cls = self.chain_executor_cls
+        if executor_cls is None:
+            try:
+                from concurrent.futures import ThreadPoolExecutor
+            except ImportError:
+                raise RuntimeError('Concurrent chained commands require concurrent.futures, '
+                                   'install the futures backport on Python 2')
+            executor_cls = ThreadPoolExecutor
+        return executor_cls(max_workers=self.chain_workers)
+
+    @staticmethod
+    def _submit_chained(executor, subcmd, sub_args, subcontext):
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+        except ImportError:
+            # a custom executor, it cannot be a process pool
+            ProcessPoolExecutor = ()
+
+        if isinstance(executor, ProcessPoolExecutor):
+            # command instances (parent, parser) cannot be pickled,
+            # the command is rebuilt in the worker from its class
+            subcontext.args = sub_args
+            return executor.submit(_invoke_chained_in_process, subcmd.__class__,
+                                   subcmd.name, subcmd.alias, sub_args)
+        return executor.submit(subcmd.invoke_callbacks, sub_args, subcontext)
+
+    @staticmethod
+    def _collect_chain_results(pending, results):
+        for subcmd, future in pending:
+            results.add_result(subcmd, future.result())
+        del pending[:]
+
+    def set_invoked_subcommands(self, subcmds):
+        """Set `invoked_subcommand` and `invoked_subcommands` kept
+        for compatibility, they are never read by the group itself"""
+        if subcmds:
+            self.invoked_subcommands = list(subcmds)
+            self.invoked_subcommand = True
         else:
-            # Callback
-            rv = self.invoke_callbacks(parsed_args)
+            self.invoked_subcommands = None
+            self.invoked_subcommand = None
 
-        return rv
+    def release_subcommands(self):
+        super(ChainedCommandGroup, self).release_subcommands()
+        self.invoked_subcommands = None
+
+    def parse_and_get_chain(self, remaining, invoked=None):
+        """Parse arguments of chained commands
 
-    def parse_and_get_chain(self, remaining):
+        Args:
+            remaining (list): arguments of chained commands
+            invoked (list): optional list where chained commands are appended
+                            as soon as they are created
+
+        Returns:
+            (list) of pairs (command, parsed args), None when there
+            are no chained commands
+        """
+        if self.subcommand_pool is not None:
+            self.release_subcommands()
         if not remaining:
             return
 
         chained_cmd_args = []
-        self.invoked_subcommand = True
-        self.invoked_subcommands = []
-
         while remaining:
 
-            subcmd_name = remaining.pop(0)
-            subcmd_cls = (self.subcmds_cls.get(subcmd_name)
-                          or self.subcmd_aliases.get(subcmd_name))
+            subcmd_name, subcmd_cls = self.find_subcmd_cls(remaining.pop(0))
             if not subcmd_cls:
                 raise CommandNotFound(subcmd_name,
                                       parent=self,
-                                      parser=self.parser)
+                                      parser=self.parser,
+                                      suggestions=self.similar_command_names(subcmd_name))
 
             real_name = self.get_subcmd_real_name(subcmd_cls)
-            subcmd = self.new_subcommand(subcmd_cls, real_name, subcmd_name)
+            with phase('new_subcommand', self):
+                subcmd_cls = self.load_subcmd_cls(subcmd_cls)
+                subcmd = self.get_subcommand(subcmd_cls, real_name, subcmd_name)
 
             # set references
             subcmd.parent = self
-            self.invoked_subcommands.append(subcmd)
+            if invoked is not None:
+                invoked.append(subcmd)
 
             sub_namespace, unknown_args = subcmd.parser.parse_known_args(remaining)
             if unknown_args:
@@ -562,6 +1338,15 @@ class ChainedCommandGroup(CommandGroup):
         return chained_cmd_args
 
 
+def _invoke_chained_in_process(command_cls, name, alias, parsed_args):
+    """Invoke callbacks of a chained command in a worker process,
+    streamed results are collected into a list"""
+    rv = command_cls(name, alias).invoke_callbacks(parsed_args)
+    if isinstance(rv, ResultStream):
+        rv = list(rv)
+    return rv
+
+
 class ChainedOutputResults(object):
     """Holder of result from chained commands
 
@@ -0,0 +1,159 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+from .arguments import ScanError, ScanMiss, declared_options, scan_options
+from .commands import CommandGroup, ChainedCommandGroup
+from .exceptions import CommandAmbiguous, CommandError
+from .helpers import REMAINING_ARGS
+
+
+class CompletionResolver(object):
+    """Resolver of possible subcommand names for shell completion
+
+    Only groups on the path of given arguments are instantiated,
+    candidates are taken from registries of the groups.  Final commands
+    are never instantiated.  Options of groups with only declared
+    arguments are matched without creating their parsers.
+
+    Parse state is cached per prefix of arguments ending with a name
+    of a subcommand group, therefore completing one more word parses
+    only arguments after the last group on the path.
+
+    Args:
+        command (CommandGroup): root command
+        max_states (int): maximum number of cached states
+    """
+
+    def __init__(self, command, max_states=256):
+        self.command = command
+        self.max_states = max_states
+        self._states = {}
+        self._root_state = _GroupState(command)
+
+    def clear(self):
+        """Forget all cached parse states"""
+        self._states.clear()
+
+    def possible_command_names(self, raw_args):
+        """Return possible subcommand names for a set of arguments
+
+        Returns:
+            (list) of strings of command names,
+            None on failure in case of bad arguments.
+        """
+        try:
+            return self._resolve(list(raw_args))
+        except CommandError:
+            return
+        except SystemExit as e:
+            # handle bad arguments
+            if e.code == 2:
+                return
+            raise
+
+    def _resolve(self, args):
+        position, state = self._cached_state(args)
+
+        while True:
+            group = state.command
+            unknown_args, sub_args = state.split_args(args[position:])
+
+            if unknown_args:
+                if group._default_subcmd_cls:
+                    return _names(group)
+                raise CommandError(group.name)
+
+            if not sub_args:
+                return _names(group)
+
+            try:
+                subcmd_name, subcmd_cls = group.find_subcmd_cls(sub_args[0])
+            except CommandAmbiguous:
+                if not group._fallback_subcmd_cls:
+                    raise
+                subcmd_name, subcmd_cls = sub_args[0], None
+
+            subcmd_cls = subcmd_cls or group._fallback_subcmd_cls
+            if not subcmd_cls:
+                raise CommandError(subcmd_name)
+
+            if state.is_chained:
+                # chained command offers its siblings
+                return _names(group)
+
+            subcmd_cls = group.load_subcmd_cls(subcmd_cls)
+            if not _is_group(subcmd_cls):
+                return []
+
+            position = len(args) - len(sub_args) + 1
+            state = self._new_state(args[:position], group, subcmd_cls, subcmd_name)
+
+    def _cached_state(self, args):
+        for position in range(len(args), 0, -1):
+            state = self._states.get(tuple(args[:position]))
+            if state:
+                return position, state
+        return 0, self._root_state
+
+    def _new_state(self, prefix, group, subcmd_cls, subcmd_name):
+        real_name = group.get_subcmd_real_name(subcmd_cls)
+        subcmd = group.new_subcommand(subcmd_cls, real_name, subcmd_name)
+        subcmd.parent = group
+
+        if len(self._states) >= self.max_states:
+            self._states.clear()
+
+        state = self._states[tuple(prefix)] = _GroupState(subcmd)
+        return state
+
+
+class _GroupState(object):
+
+    def __init__(self, command):
+        self.command = command
+        self.is_chained = isinstance(command, ChainedCommandGroup)
+        self._parser = None
+
+        arguments = command.declared_arguments()
+        self._static_options = None
+        if arguments is not None:
+            options = declared_options(arguments)
+            if options is not None:
+                # only options with no or one value are matched statically
+                self._static_options = dict((option, arity if arity in (0, 1) else None)
+                                            for option, arity in options.items())
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            self._parser = self.command.get_parser(add_help=False)
+        return self._parser
+
+    def split_args(self, args):
+        """Split arguments of the group
+
+        Returns:
+            tuple: (unknown arguments, arguments of subcommand)
+        """
+        if self._static_options is not None:
+            try:
+                position, unknown_args, _ = scan_options(self._static_options, args,
+                                                         skipped=(), abbrev=True)
+            except ScanMiss:
+                pass
+            except ScanError:
+                raise CommandError(self.command.name)
+            else:
+                return unknown_args, args[position:]
+
+        namespace, unknown_args = self.parser.parse_known_args(args)
+        return unknown_args, getattr(namespace, REMAINING_ARGS)
+
+
+def _names(group):
+    return sorted(group._registry.subcmds_cls)
+
+
+def _is_group(command_cls):
+    return isinstance(command_cls, type) and issubclass(command_cls, CommandGroup)
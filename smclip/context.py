@@ -0,0 +1,74 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Per-invocation state of commands
+
+Each invocation of a command creates its own `InvocationContext`,
+groups create child contexts for their subcommands.  State of
+an invocation is kept in contexts instead of command instances,
+so one command tree can be invoked concurrently from several threads.
+"""
+
+
+class InvocationContext(object):
+    """State of one invocation of a command
+
+    Context is passed as the first argument to `preprocess`,
+    `this_action` and `results_callback` of commands with `pass_context`.
+
+    Args:
+        command (Command): invoked command
+        parent (InvocationContext): context of the parent group
+        obj (object): user object shared by the invocation
+                      (default: object of the parent context)
+
+    Attributes:
+        args (dict): parsed arguments of the command
+        invoked_subcommand (Command): subcommand invoked by a group
+        invoked_subcommands (list): commands invoked by a chained group
+        upstream (ResultStream): output of the previous chained command
+                                 when the group is a pipeline
+        children (list): contexts of invoked subcommands
+    """
+
+    def __init__(self, command, parent=None, obj=None):
+        self.command = command
+        self.parent = parent
+        if obj is None and parent is not None:
+            obj = parent.obj
+        self.obj = obj
+        self.args = None
+        self.invoked_subcommand = None
+        self.invoked_subcommands = None
+        self.upstream = None
+        self.children = []
+
+    def child(self, command):
+        """Create context of a subcommand"""
+        context = self.__class__(command, self)
+        self.children.append(context)
+        return context
+
+    @property
+    def root(self):
+        """Context of the root command of the invocation"""
+        context = self
+        while context.parent is not None:
+            context = context.parent
+        return context
+
+    @property
+    def path(self):
+        """Names of invoked commands from the root of the invocation"""
+        names = []
+        context = self
+        while context is not None:
+            names.append(context.command.name)
+            context = context.parent
+        names.reverse()
+        return tuple(names)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__,
+                                ' '.join(str(name) for name in self.path))
@@ -13,8 +13,28 @@ class CommandError(Exception):
 
 
 class CommandNotFound(CommandError):
+    def __init__(self, command_name, parent=None, parser=None, suggestions=()):
+        super(CommandNotFound, self).__init__(command_name, parent, parser)
+        self.suggestions = suggestions
+
+    def __str__(self):
+        message = "unknown command `{0}'".format(self.command_name)
+        if len(self.suggestions) == 1:
+            message += ", did you mean `{0}'?".format(self.suggestions[0])
+        elif self.suggestions:
+            message += ', did you mean one of {0}?'.format(
+                ', '.join("`{0}'".format(name) for name in self.suggestions))
+        return message
+
+
+class CommandAmbiguous(CommandError):
+    def __init__(self, command_name, parent=None, parser=None, candidates=()):
+        super(CommandAmbiguous, self).__init__(command_name, parent, parser)
+        self.candidates = candidates
+
     def __str__(self):
-        return "unknown command `{0}'".format(self.command_name)
+        return "ambiguous command `{0}', could be {1}".format(
+            self.command_name, ', '.join("`{0}'".format(name) for name in self.candidates))
 
 
 class CommandUnrecognizedArgs(CommandError):
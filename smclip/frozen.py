@@ -0,0 +1,187 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Frozen dispatch table of a command tree
+
+`CommandGroup.freeze` compiles every path of the command tree, with
+aliases, into one flat mapping keyed by sequences of subcommand names.
+Options of each group are recorded with the number of values they take,
+so arguments can be split into slices of the groups and the arguments
+of the invoked command in a single pass, without parsing them level
+by level::
+
+    app --appopt x task --taskopt y list --state open
+        [ app     ]     [ task     ]     [ list      ]
+
+Groups with empty slices get their default arguments recorded at freeze
+time, their parsers are not even built.  Anything the table cannot split
+statically (unknown or abbreviated options, options with a variable
+number of values, ``--``, values starting with ``-``, unknown names or
+prefixes) ends the route and the rest of the arguments is dispatched
+by the last matched command as usual.  Groups overriding `invoke` or
+`parse_and_get_command` always end the route, so they dispatch their
+subcommands themselves.
+"""
+
+from .arguments import ScanError, ScanMiss, scan_options
+from .commands import ChainedCommandGroup, CommandGroup
+from .helpers import REMAINING_ARGS
+from .lazy import string_types
+
+
+class FrozenLevel(object):
+    """Command of a frozen tree
+
+    Attributes:
+        command_cls (class): command class (lazy commands are loaded)
+        name (str): registered name of the command
+        options (dict): option string => number of values of a group
+                        whose arguments can be split, None otherwise
+        defaults (dict): parsed arguments of the group when it gets
+                         no arguments, None when they have to be parsed
+    """
+
+    __slots__ = ('command_cls', 'name', 'options', 'defaults')
+
+    def __init__(self, command_cls, name, options=None, defaults=None):
+        self.command_cls = command_cls
+        self.name = name
+        self.options = options
+        self.defaults = defaults
+
+    def __repr__(self):
+        return '<{} {} ({})>'.format(self.__class__.__name__, self.name,
+                                     self.command_cls.__name__)
+
+
+class FrozenTable(object):
+    """Flat dispatch table of a command tree
+
+    Args:
+        command (CommandGroup): root group, all command classes of its tree
+                                are imported
+
+    Attributes:
+        root (FrozenLevel): level of the root group
+        paths (dict): tuple of names and aliases => FrozenLevel
+    """
+
+    def __init__(self, command):
+        self.root, self.paths = _freeze(command, frozenset())
+
+    def route(self, raw_args):
+        """Split arguments along the frozen tree
+
+        Returns:
+            tuple: (steps, target_start), a step is a tuple
+                   ``(group level, start, end, subcommand level)``, the group
+                   gets ``raw_args[start:end]`` and its subcommand is named
+                   by ``raw_args[end]``; the last subcommand is invoked
+                   with ``raw_args[target_start:]``
+        """
+        steps = []
+        level = self.root
+        path = ()
+        start = 0
+        while level.options is not None:
+            try:
+                end, _, _ = scan_options(level.options, raw_args, start)
+            except (ScanMiss, ScanError):
+                break
+            if end == len(raw_args):
+                break
+            path += (raw_args[end],)
+            sublevel = self.paths.get(path)
+            if sublevel is None:
+                break
+            steps.append((level, start, end, sublevel))
+            level = sublevel
+            start = end + 1
+        return steps, start
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __repr__(self):
+        return '<{} {} paths={}>'.format(self.__class__.__name__, self.root.name, len(self))
+
+
+def _freeze(command, classes):
+    """Return level of the command and paths of its subtree
+    relative to the command"""
+    command_cls = command.__class__
+    level = FrozenLevel(command_cls, command.name)
+    paths = {}
+    if not isinstance(command, CommandGroup) or isinstance(command, ChainedCommandGroup) \
+            or command_cls in classes or _dispatches_itself(command_cls):
+        return level, paths
+
+    parser = command.parser
+    level.options = _options(parser)
+    if level.options is None:
+        return level, paths
+    level.defaults = _defaults(command, parser)
+
+    aliases = {}
+    for alias, subcmd_cls in command._registry.subcmd_aliases.items():
+        aliases.setdefault(subcmd_cls, []).append(alias)
+
+    classes = classes | frozenset([command_cls])
+    for name, subcmd_cls in command._registry.subcmds_cls.items():
+        loaded_cls = command.load_subcmd_cls(subcmd_cls)
+        subcmd = command.new_subcommand(loaded_cls, name)
+        subcmd.parent = command
+        sublevel, subpaths = _freeze(subcmd, classes)
+        for token in [name] + aliases.get(subcmd_cls, []):
+            paths[(token,)] = sublevel
+            for key, path_level in subpaths.items():
+                paths[(token,) + key] = path_level
+    return level, paths
+
+
+def _dispatches_itself(command_cls):
+    """Return whether group class overrides dispatch the route would bypass"""
+    return any(getattr(command_cls, name) != getattr(CommandGroup, name)
+               for name in ('invoke', 'parse_and_get_command'))
+
+
+def _options(parser):
+    """Return option strings of a group parser with numbers of values,
+    None when its arguments cannot be split statically"""
+    if parser.fromfile_prefix_chars or parser.prefix_chars != '-':
+        return None
+
+    options = {}
+    for action in parser._actions:
+        if not action.option_strings:
+            if action.dest != REMAINING_ARGS:
+                return None
+            continue
+        nargs = action.nargs
+        if nargs is None:
+            arity = 1
+        elif isinstance(nargs, int):
+            arity = nargs
+        else:
+            # number of values varies
+            arity = None
+        options.update(dict.fromkeys(action.option_strings, arity))
+    return options
+
+
+def _defaults(command, parser):
+    """Return parsed arguments of a group with no arguments,
+    None when parsing could fail or convert a default value"""
+    if any(group.required for group in parser._mutually_exclusive_groups):
+        return None
+    for action in parser._actions:
+        if action.required and action.dest != REMAINING_ARGS:
+            return None
+        if isinstance(action.default, string_types) and action.type is not None:
+            return None
+
+    namespace, _ = parser.parse_known_args([])
+    parsed_args, _ = command._extract_parsed_args(namespace)
+    return parsed_args
+
@@ -0,0 +1,167 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Helpers of commands which do not need argparse
+
+Kept apart from `smclip.parsers`, so command classes can be defined
+without importing argparse.
+"""
+
+import bisect
+import os
+import sys
+
+# name of the parser argument holding arguments of subcommands
+REMAINING_ARGS = '_subcommand'
+
+
+class SubcommandsOrder(object):
+    """Names of subcommands kept in order for help
+
+    Names are inserted into their place on registration, so they
+    don't need to be sorted on each help rendering.
+    """
+
+    def __init__(self):
+        self._keys = []
+
+    def add(self, name):
+        bisect.insort(self._keys, (name.lower(), name))
+
+    def copy(self):
+        order = self.__class__()
+        order._keys = list(self._keys)
+        return order
+
+    def __iter__(self):
+        return (name for _, name in self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def split_docstring(string):
+    """Split docstring to header and description
+
+    Separator between header and description is one blank line.
+    When no separator is found, then description is None.
+
+    Args:
+        string (str): docstring
+
+    Returns:
+        title, description
+    """
+
+    if not string:
+        return None, None
+
+    import inspect
+    import re
+
+    cleaned_docstring = inspect.cleandoc(string)
+    parts = re.split(r'(?:\n|\r|\r\n)[ \t]*(?:\n|\r|\r\n)', cleaned_docstring, 1)
+    if len(parts) == 1:
+        # header is considered also as description
+        title = parts[0].strip()
+        return title, None
+
+    title, description = (p.strip() for p in parts)
+    return title, description
+
+
+def class_docstring(cls):
+    """Return title and description of class docstring
+
+    Docstring is split only once per class, the result is kept
+    in the class itself.
+
+    Args:
+        cls (class): class with docstring
+
+    Returns:
+        title, description
+    """
+    parts = cls.__dict__.get('_docstring_parts')
+    if parts is None:
+        parts = split_docstring(cls.__doc__)
+        try:
+            cls._docstring_parts = parts
+        except TypeError:
+            # built-in and extension types
+            pass
+    return parts
+
+
+def subcommand_title(subcmd):
+    """Return title of subcommand class, instance or lazy command"""
+    if isinstance(subcmd, type):
+        return class_docstring(subcmd)[0]
+    try:
+        return subcmd.title
+    except AttributeError:
+        return split_docstring(subcmd.__doc__)[0]
+
+
+def exit_status(code, stderr=None):
+    """Return exit status of `SystemExit` code the way the interpreter
+    sets it, a message code is written to `stderr` when given"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    if stderr is not None:
+        stderr.write('{}\n'.format(code))
+    return 1
+
+
+def source_files(cls):
+    """Return source files of modules of the class and its bases
+
+    Returns:
+        (list) of absolute file names in order of the class MRO
+    """
+    filenames = []
+    for base in cls.__mro__:
+        module = sys.modules.get(base.__module__)
+        filename = getattr(module, '__file__', None)
+        if not filename:
+            continue
+        if filename.endswith(('.pyc', '.pyo')):
+            filename = filename[:-1]
+        filename = os.path.abspath(filename)
+        if filename not in filenames:
+            filenames.append(filename)
+    return filenames
+
+
+def temporary_filename(filename):
+    """Return name of a temporary file next to the file, unique per process"""
+    return '{}.{}.tmp'.format(filename, os.getpid())
+
+
+def write_atomic(filename, write, mode=0o666):
+    """Write a file through a temporary file renamed into its place,
+    so readers see either the previous or the complete new content
+
+    The temporary file is removed when writing fails.
+
+    Args:
+        filename (str): name of the file
+        write (callable): called with the temporary file opened
+                          for writing bytes
+        mode (int): permissions of the file (modified by umask)
+    """
+    tmp_filename = temporary_filename(filename)
+    fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.rename(tmp_filename, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_filename)
+        except OSError:
+            pass
+        raise
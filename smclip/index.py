@@ -0,0 +1,190 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Indexes of command names"""
+
+
+class SimilarityIndex(object):
+    """N-gram index of names for lookup of similar names
+
+    Each name is split into n-grams (with padding on both ends) and
+    names are indexed by their n-grams.  Only names sharing n-grams
+    with a looked up name are compared to it, rather than all indexed
+    names.
+
+    Args:
+        n (int): length of n-grams (default: 2)
+    """
+
+    def __init__(self, n=2):
+        self.n = n
+        self._postings = {}
+        self._gram_counts = {}
+
+    def _grams(self, name):
+        padded = ' ' + name.lower() + ' '
+        return set(padded[index:index + self.n] for index in range(len(padded) - self.n + 1))
+
+    def add(self, name):
+        """Add name to the index"""
+        if name in self._gram_counts:
+            return
+        grams = self._grams(name)
+        self._gram_counts[name] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(name)
+
+    def __contains__(self, name):
+        return name in self._gram_counts
+
+    def __len__(self):
+        return len(self._gram_counts)
+
+    def similar(self, name, limit=3, max_distance=None, candidates=50):
+        """Return names similar to the name, the most similar first
+
+        Names sharing the most n-grams with the name are taken
+        as candidates, which are then ranked by their edit distance
+        (with transpositions) to the name.
+
+        Args:
+            name (str): looked up name
+            limit (int): maximum number of returned names
+            max_distance (int): maximum edit distance of returned names
+                                (default: third of the name length, at least 1)
+            candidates (int): maximum number of ranked candidates
+
+        Returns:
+            (list) of names
+        """
+        if max_distance is None:
+            max_distance = max(1, len(name) // 3)
+
+        shared = {}
+        for gram in self._grams(name):
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        ranked = sorted(shared, key=lambda candidate: (-shared[candidate], candidate))
+        scored = []
+        for candidate in ranked[:candidates]:
+            if candidate == name:
+                continue
+            distance = edit_distance(name.lower(), candidate.lower())
+            if distance <= max_distance:
+                scored.append((distance, candidate))
+
+        scored.sort()
+        return [candidate for _, candidate in scored[:limit]]
+
+
+def edit_distance(first, second):
+    """Return edit distance of two strings
+
+    Insertions, deletions, substitutions and transpositions of adjacent
+    characters are counted (optimal string alignment distance).
+    """
+    previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        previous_row, prior_row = row, previous_row
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = 0 if first[i - 1] == second[j - 1] else 1
+            row[j] = min(previous_row[j] + 1,
+                         row[j - 1] + 1,
+                         previous_row[j - 1] + cost)
+            if (i > 1 and j > 1 and first[i - 1] == second[j - 2]
+                    and first[i - 2] == second[j - 1]):
+                row[j] = min(row[j], prior_row[j - 2] + 1)
+    return row[len(second)]
+
+
+class PrefixTrie(object):
+    """Trie of keys for lookup of values by unique prefixes of keys
+
+    Each node keeps values of all keys under it, so a lookup costs
+    the length of the looked up prefix, regardless of the number
+    of keys.  Several keys (e.g. a name and aliases) can have
+    the same value.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+
+    def add(self, key, value):
+        """Add key with its value"""
+        node = self._root
+        node.values.setdefault(value, key)
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            node.values.setdefault(value, key)
+        node.key = key
+        node.value = value
+
+    def lookup(self, prefix):
+        """Return key and value matched by a prefix
+
+        A key equal to the prefix is matched first, otherwise
+        the prefix has to match keys of one value only.
+
+        Returns:
+            tuple: (key, value), or (None, None) when nothing is matched
+                   (an empty prefix matches nothing)
+
+        Raises:
+            AmbiguousPrefix: when prefix matches keys of several values
+        """
+        if not prefix:
+            return None, None
+
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None, None
+
+        if node.key is not None:
+            return node.key, node.value
+
+        if len(node.values) == 1:
+            value, key = next(iter(node.values.items()))
+            return key, value
+
+        raise AmbiguousPrefix(prefix, sorted(node.keys()))
+
+
+class AmbiguousPrefix(LookupError):
+    """Prefix matches keys of several values
+
+    Attributes:
+        prefix (str): looked up prefix
+        keys (list): all keys matched by the prefix
+    """
+
+    def __init__(self, prefix, keys):
+        super(AmbiguousPrefix, self).__init__(prefix)
+        self.prefix = prefix
+        self.keys = keys
+
+
+class _TrieNode(object):
+
+    __slots__ = ('children', 'values', 'key', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.values = {}
+        self.key = None
+        self.value = None
+
+    def keys(self):
+        keys = []
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            if node.key is not None:
+                keys.append(node.key)
+            nodes.extend(node.children.values())
+        return keys
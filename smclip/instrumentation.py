@@ -0,0 +1,169 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Instrumentation of invocation phases
+
+Commands report start and end of each phase of an invocation
+(parsing of arguments, lookup and creation of subcommands, callbacks)
+to registered hooks.  Without a registered hook, a phase costs only
+a check of an empty list.
+
+Phases:
+    * ``create_parser``
+    * ``parse_args``
+    * ``parse_and_get_command`` (``parse_and_get_chain`` for chained groups)
+    * ``route`` (frozen groups)
+    * ``new_subcommand``
+    * ``preprocess``
+    * ``this_action``
+    * ``results_callback``
+
+Phases can be nested (e.g. ``new_subcommand`` in ``parse_and_get_command``).
+"""
+
+import time
+
+try:
+    _clock = time.perf_counter
+except AttributeError:
+    _clock = time.time
+
+hooks = []
+
+
+def add_hook(hook):
+    """Register a hook called for every phase
+
+    Args:
+        hook (Hook): object with `phase_start` and `phase_end` methods
+    """
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Unregister a hook registered by `add_hook`"""
+    hooks.remove(hook)
+
+
+class Hook(object):
+    """Base of instrumentation hooks"""
+
+    def phase_start(self, event):
+        """Called when a phase starts
+
+        Args:
+            event (PhaseEvent): event of the phase
+        """
+        pass
+
+    def phase_end(self, event):
+        """Called when a phase ends, even by an exception
+
+        Args:
+            event (PhaseEvent): event of the phase with end time
+        """
+        pass
+
+
+class PhaseEvent(object):
+    """Event of a phase of a command invocation
+
+    Attributes:
+        phase (str): name of the phase
+        command (Command): command in which the phase happens
+        path (tuple): names of the command and its parents, root first
+        alias (str): name from which the command was invoked
+        start (float): start time of the phase
+        end (float): end time of the phase (None while running)
+        error (BaseException): exception which ended the phase
+    """
+
+    def __init__(self, phase, command):
+        self.phase = phase
+        self.command = command
+        parent_names = command.get_parent_names()
+        parent_names.reverse()
+        parent_names.append(command.name)
+        self.path = tuple(parent_names)
+        self.alias = command.alias
+        self.start = None
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self):
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def __repr__(self):
+        return '<{} {} of {}>'.format(self.__class__.__name__, self.phase,
+                                      ' '.join(str(name) for name in self.path))
+
+
+class _Phase(object):
+
+    def __init__(self, event):
+        self.event = event
+
+    def __enter__(self):
+        event = self.event
+        for hook in hooks:
+            hook.phase_start(event)
+        event.start = _clock()
+        return event
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event = self.event
+        event.end = _clock()
+        event.error = exc_value
+        for hook in reversed(hooks):
+            hook.phase_end(event)
+
+
+class _NoPhase(object):
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name, command):
+    """Return context manager of a phase reported to hooks
+
+    Args:
+        name (str): name of the phase
+        command (Command): command in which the phase happens
+    """
+    if not hooks:
+        return _NO_PHASE
+    return _Phase(PhaseEvent(name, command))
+
+
+class TimingHook(Hook):
+    """Hook summing durations of phases
+
+    Attributes:
+        timings (dict): mapping of (path, phase) => [count, total time]
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    def phase_end(self, event):
+        timing = self.timings.setdefault((event.path, event.phase), [0, 0.0])
+        timing[0] += 1
+        timing[1] += event.duration
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_hook(self)
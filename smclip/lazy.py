@@ -0,0 +1,81 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+import importlib
+
+try:
+    string_types = (basestring,)
+except NameError:
+    string_types = (str,)
+
+
+def import_object(import_path):
+    """Import an object by its import path
+
+    Import path is in form of ``package.module:Object``.  A dotted
+    form ``package.module.Object`` is accepted as well.
+
+    Args:
+        import_path (str): path to the object
+
+    Returns:
+        imported object
+    """
+    if ':' in import_path:
+        module_name, obj_name = import_path.split(':', 1)
+    else:
+        module_name, _, obj_name = import_path.rpartition('.')
+
+    if not module_name or not obj_name:
+        raise ImportError('Invalid import path {}'.format(import_path))
+
+    obj = importlib.import_module(module_name)
+    for attr in obj_name.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class LazyCommand(object):
+    """Placeholder of a command class referenced by its import path
+
+    Command class is not imported until it is needed for an invocation.
+    Name, aliases and title has to be given up front, so the placeholder
+    can be used for routing and help without importing the class.
+
+    Attributes:
+        import_path (str): import path of the command class
+        default_name (str): command name
+        default_aliases (list): command aliases
+        title (str): one-line summary shown in help
+    """
+
+    __slots__ = ('import_path', 'default_name', 'default_aliases', 'title', '_command_cls')
+
+    def __init__(self, import_path, name=None, aliases=None, title=None):
+        self.import_path = import_path
+        self.default_name = name
+        self.default_aliases = aliases
+        self.title = title
+        self._command_cls = None
+
+    @property
+    def __name__(self):
+        return self.import_path
+
+    @property
+    def is_loaded(self):
+        return self._command_cls is not None
+
+    def load(self):
+        """Import and return the command class"""
+        if self._command_cls is None:
+            self._command_cls = import_object(self.import_path)
+        return self._command_cls
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, self.import_path)
+
@@ -0,0 +1,406 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Command tree manifest
+
+Manifest is a snapshot of a fully registered command tree (names,
+aliases, default and fallback commands, titles, options and formatted
+help).  It is written once, e.g. during a build of an application,
+and loaded at runtime to answer routing, possible command names and
+help without importing command classes or building parsers.
+
+File format::
+
+    SMCLIP-MANIFEST <format version>\\n
+    <header JSON>\\n
+    <node record><node record>...
+
+Header holds versions, modification times of source files and offsets
+of node records.  Node records are decoded one by one only when they
+are needed, therefore the file is memory mapped rather than read.
+"""
+
+import json
+import mmap
+import os
+
+from .arguments import ScanError, ScanMiss, scan_options
+from .helpers import source_files, write_atomic
+
+MANIFEST_VERSION = 2
+MANIFEST_MAGIC = 'SMCLIP-MANIFEST'
+
+KIND_COMMAND = 'command'
+KIND_GROUP = 'group'
+KIND_CHAINED = 'chained'
+
+PATH_SEPARATOR = ' '
+
+
+class ManifestMiss(LookupError):
+    """Arguments cannot be resolved from the manifest alone"""
+
+
+def build_manifest(command, package_version=None):
+    """Walk command tree and return its manifest data
+
+    Every group in the tree is instantiated and every parser is
+    created in order to collect arguments and help.
+
+    Args:
+        command (CommandGroup): root command with registered subcommands
+        package_version (str): version of the application package
+
+    Returns:
+        dict with manifest data, nodes are keyed by path of real names
+    """
+    from . import __version__
+
+    nodes = {}
+    sources = {}
+    _walk_command(command, (), nodes, sources, frozenset())
+    nodes['']['all_help_options'] = sorted(set(
+        option for node in nodes.values() for option in node['help_options']))
+    return {
+        'smclip': __version__,
+        'package': package_version,
+        'sources': sources,
+        'nodes': nodes,
+    }
+
+
+def write_manifest(command, filename, package_version=None):
+    """Build manifest of the command tree and write it into a file"""
+    data = build_manifest(command, package_version=package_version)
+    nodes = data.pop('nodes')
+
+    records = []
+    offsets = {}
+    position = 0
+    for key in sorted(nodes):
+        record = _dump_json(nodes[key]).encode('utf-8')
+        offsets[key] = (position, len(record))
+        position += len(record)
+        records.append(record)
+
+    data['nodes'] = offsets
+    header = '{} {}\n{}\n'.format(MANIFEST_MAGIC, MANIFEST_VERSION, _dump_json(data))
+
+    def write(f):
+        f.write(header.encode('utf-8'))
+        for record in records:
+            f.write(record)
+
+    write_atomic(filename, write)
+
+
+def load_manifest(filename, package_version=None):
+    """Load manifest from a file
+
+    Manifest is considered stale when it was written by other version
+    of smclip or of the application package, or when any of the source
+    files of commands has been modified since.
+
+    Returns:
+        Manifest instance, None when manifest is missing or stale
+    """
+    from . import __version__
+
+    try:
+        manifest = Manifest.open(filename)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if manifest.smclip_version != __version__ or manifest.package_version != package_version:
+        manifest.close()
+        return None
+
+    for source, mtime in manifest.sources.items():
+        try:
+            stale = os.stat(source).st_mtime != mtime
+        except OSError:
+            stale = True
+        if stale:
+            manifest.close()
+            return None
+
+    return manifest
+
+
+class Manifest(object):
+    """Loaded manifest of a command tree
+
+    The file stays mapped until the manifest is closed, it can be used
+    as a context manager.
+
+    Attributes:
+        smclip_version (str): smclip version the manifest was built with
+        package_version (str): application version the manifest was built with
+        sources (dict): mapping of source files to their modification times
+    """
+
+    def __init__(self, header, data, data_offset=0):
+        self.smclip_version = header['smclip']
+        self.package_version = header['package']
+        self.sources = header['sources']
+        self._offsets = header['nodes']
+        self._data = data
+        self._data_offset = data_offset
+        self._nodes = {}
+        self._help_options = None
+
+    @classmethod
+    def open(cls, filename):
+        with open(filename, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic_end = data.find(b'\n')
+            header_end = data.find(b'\n', magic_end + 1)
+            if magic_end < 0 or header_end < 0:
+                raise ValueError('Not a manifest file')
+
+            magic = data[:magic_end].decode('utf-8')
+            if magic != '{} {}'.format(MANIFEST_MAGIC, MANIFEST_VERSION):
+                raise ValueError('Unsupported manifest {}'.format(magic))
+
+            header = json.loads(data[magic_end + 1:header_end].decode('utf-8'))
+        except Exception:
+            data.close()
+            raise
+        return cls(header, data, header_end + 1)
+
+    def close(self):
+        """Unmap the manifest file, nodes not decoded yet are not available"""
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def node(self, path):
+        """Return node data for path of real names"""
+        key = PATH_SEPARATOR.join(path)
+        node = self._nodes.get(key)
+        if node is None:
+            try:
+                offset, length = self._offsets[key]
+            except KeyError:
+                raise ManifestMiss(key)
+            start = self._data_offset + offset
+            node = json.loads(self._data[start:start + length].decode('utf-8'))
+            self._nodes[key] = node
+        return node
+
+    def register_subcommands(self, group):
+        """Register subcommands of the root node to the group by their
+        import paths, without importing them"""
+        node = self.node(())
+        aliases = {}
+        for alias, name in node['aliases'].items():
+            aliases.setdefault(name, []).append(alias)
+
+        for name in sorted(node['subcommands']):
+            import_path, title = node['subcommands'][name]
+            group.register(import_path, name=name, aliases=sorted(aliases.get(name, ())),
+                           is_default=name == node['default'],
+                           is_fallback=name == node['fallback'],
+                           title=title)
+
+    def possible_command_names(self, raw_args):
+        """Return possible subcommand names for a set of arguments
+
+        Counterpart of `CommandGroup.possible_command_names`.
+
+        Returns:
+            (list) of strings of command names,
+            None on failure in case of bad arguments.
+
+        Raises:
+            ManifestMiss: when arguments cannot be resolved statically
+        """
+        path = ()
+        node = self.node(path)
+        args = list(raw_args)
+
+        while node['kind'] != KIND_COMMAND:
+            try:
+                position, unknown, _ = _scan_options(node, args)
+            except ScanError:
+                return
+
+            if unknown:
+                if node['default']:
+                    return sorted(node['subcommands'])
+                return
+
+            if position == len(args):
+                return sorted(node['subcommands'])
+
+            name = _subcmd_real_name(node, args[position])
+            if not name:
+                return
+
+            if node['kind'] == KIND_CHAINED:
+                # chained command offers its siblings
+                return sorted(node['subcommands'])
+
+            path += (name,)
+            node = self.node(path)
+            args = args[position + 1:]
+
+        return []
+
+    def format_help(self, raw_args):
+        """Return help of a command when arguments request it
+
+        Returns:
+            (str) formatted help, None when help is not requested
+
+        Raises:
+            ManifestMiss: when arguments cannot be resolved statically
+        """
+        if self._help_options is None:
+            self._help_options = set(self.node(())['all_help_options'])
+        if not self._help_options.intersection(raw_args):
+            return
+
+        path = ()
+        node = self.node(path)
+        args = list(raw_args)
+
+        while True:
+            try:
+                position, unknown, help_requested = _scan_options(node, args, with_help=True)
+            except ScanError:
+                raise ManifestMiss(raw_args)
+
+            if help_requested:
+                return node['help']
+
+            if unknown or position == len(args) or node['kind'] == KIND_COMMAND:
+                raise ManifestMiss(raw_args)
+
+            name = _subcmd_real_name(node, args[position])
+            if not name:
+                raise ManifestMiss(raw_args)
+
+            path += (name,)
+            node = self.node(path)
+            args = args[position + 1:]
+
+
+def _scan_options(node, args, with_help=False):
+    """Walk options at the beginning of arguments of one command level,
+    see `smclip.arguments.scan_options`"""
+    if node['prefix_chars'] != '-':
+        raise ManifestMiss(args)
+
+    help_options = node['help_options']
+    try:
+        return scan_options(node['options'], args, help_options=help_options if with_help else (),
+                            skipped=help_options, abbrev=node['abbrev'])
+    except ScanMiss as e:
+        raise ManifestMiss(*e.args)
+
+
+def _subcmd_real_name(node, name):
+    if name in node['subcommands']:
+        return name
+    real_name = node['aliases'].get(name)
+    if real_name:
+        return real_name
+    if node['abbreviate']:
+        # prefixes of names are resolved by the command tree
+        raise ManifestMiss(name)
+    return node['fallback']
+
+
+def _walk_command(command, path, nodes, sources, classes):
+    from .commands import CommandGroup, ChainedCommandGroup
+    from .parsers import ArgparserSub
+
+    command_cls = command.__class__
+    _add_source(command_cls, sources)
+    if command_cls in classes:
+        # group registering its ancestor, the node is left
+        # for the command tree to resolve at runtime
+        return
+
+    parser = command.create_parser()
+    options = {}
+    help_options = []
+    positionals = []
+    for action in parser._actions:
+        if not action.option_strings:
+            if action.dest != ArgparserSub.REMAINING_ARGS:
+                positionals.append(action.nargs)
+        elif action.__class__.__name__ == '_HelpAction':
+            help_options.extend(action.option_strings)
+        else:
+            # number of values taken by the option, None when it varies
+            arity = {0: 0, None: 1}.get(action.nargs)
+            options.update(dict.fromkeys(action.option_strings, arity))
+
+    if isinstance(command, ChainedCommandGroup):
+        kind = KIND_CHAINED
+    elif isinstance(command, CommandGroup):
+        kind = KIND_GROUP
+    else:
+        kind = KIND_COMMAND
+
+    node = {
+        'name': command.name,
+        'class': _import_path(command_cls),
+        'title': command.title,
+        'kind': kind,
+        'help': parser.format_help(),
+        'options': options,
+        'help_options': help_options,
+        'positionals': positionals,
+        'abbrev': getattr(parser, 'allow_abbrev', True),
+        'prefix_chars': parser.prefix_chars,
+    }
+    nodes[PATH_SEPARATOR.join(path)] = node
+
+    if kind == KIND_COMMAND:
+        return
+
+    node['aliases'] = dict((alias, command.get_subcmd_real_name(subcmd_cls))
+                           for alias, subcmd_cls in command._registry.subcmd_aliases.items())
+    node['default'] = _real_name(command, command._default_subcmd_cls)
+    node['fallback'] = _real_name(command, command._fallback_subcmd_cls)
+    node['abbreviate'] = command.abbreviate_subcommands
+    node['subcommands'] = subcommands = {}
+
+    classes = classes | frozenset([command_cls])
+    for name, subcmd_cls in command._registry.subcmds_cls.items():
+        loaded_cls = command.load_subcmd_cls(subcmd_cls)
+        subcmd = command.new_subcommand(loaded_cls, name)
+        subcmd.parent = command
+        subcommands[name] = (_import_path(loaded_cls), subcmd.title)
+        _walk_command(subcmd, path + (name,), nodes, sources, classes)
+
+
+def _real_name(group, subcmd_cls):
+    if subcmd_cls is None:
+        return None
+    return group.get_subcmd_real_name(subcmd_cls)
+
+
+def _import_path(cls):
+    return '{}:{}'.format(cls.__module__, getattr(cls, '__qualname__', cls.__name__))
+
+
+def _add_source(command_cls, sources):
+    """Record modification times of source files of the class and its bases"""
+    for filename in source_files(command_cls):
+        if filename not in sources:
+            sources[filename] = os.stat(filename).st_mtime
+
+
+def _dump_json(data):
+    return json.dumps(data, separators=(',', ':'), sort_keys=True)
@@ -2,9 +2,14 @@
 # Author: Viliam Krizan
 # License: LGPLv3+
 
-import re
-import inspect
 import argparse
+import sys
+
+from .helpers import REMAINING_ARGS, SubcommandsOrder, split_docstring, subcommand_title
+from .lazy import string_types
+
+# maximum number of formatted helps kept per cache
+HELP_CACHE_SIZE = 16
 
 
 class ArgparserSub(argparse.ArgumentParser):
@@ -12,22 +17,56 @@ class ArgparserSub(argparse.ArgumentParser):
 
     Subcommands should be defined as remainder argument (defined by
     ArgparseSub.REMAINING_ARGS).
+
+    When `help_cache` is given (a dict owned by the registry of
+    subcommands, see `smclip.registry.Registry`), formatted help is kept
+    there per program name, terminal width and state of arguments, and
+    shared by all parsers of groups with the same registry.  The owner
+    clears the cache when subcommands change.
     """
 
-    REMAINING_ARGS = '_subcommand'
+    REMAINING_ARGS = REMAINING_ARGS
 
-    def __init__(self, subcommands=None, subcmds_help_title=None, **kwargs):
+    def __init__(self, subcommands=None, subcmds_help_title=None,
+                 subcommands_order=None, help_cache=None, **kwargs):
         if subcommands is None:
             subcommands = {}
         self._subcommands = subcommands
+        self._subcommands_order = subcommands_order
         self._subcmds_help_title = subcmds_help_title or 'subcommands'
+        self._help_cache = help_cache
 
         kwargs.setdefault('formatter_class', GroupHelpFormatter)
         super(ArgparserSub, self).__init__(**kwargs)
 
     def format_help(self):
-
         formatter = self._get_formatter()
+        if self._help_cache is None:
+            return self._format_help(formatter)
+
+        key = (self.__class__, self.prog, formatter._width, self._help_state())
+        formatted_help = self._help_cache.get(key)
+        if formatted_help is None:
+            if len(self._help_cache) >= HELP_CACHE_SIZE:
+                self._help_cache.clear()
+            formatted_help = self._help_cache[key] = self._format_help(formatter)
+        return formatted_help
+
+    def _help_state(self):
+        """Return hashable state of arguments and texts shown in help"""
+        actions = tuple((action.__class__, tuple(action.option_strings), action.dest,
+                         repr(action.nargs), repr(action.metavar), action.help, action.required,
+                         repr(action.default), repr(action.choices))
+                        for action in self._actions)
+        groups = tuple((group.title, group.description,
+                        tuple(action.dest for action in group._group_actions))
+                       for group in self._action_groups)
+        exclusive = tuple(tuple(action.dest for action in group._group_actions)
+                          for group in self._mutually_exclusive_groups)
+        return (self.usage, self.description, self.epilog, self._subcmds_help_title,
+                actions, groups, exclusive)
+
+    def _format_help(self, formatter):
 
         # usage
         formatter.add_usage(self.usage, self._actions,
@@ -53,10 +92,196 @@ class ArgparserSub(argparse.ArgumentParser):
     def format_custom_sections(self, formatter):
         # Subcommands section
         formatter.start_section(self._subcmds_help_title)
-        formatter.add_subcommands(self._subcommands)
+        formatter.add_subcommands(self._subcommands, self._subcommands_order)
         formatter.end_section()
 
 
+class _FallBack(Exception):
+    """Arguments are not supported by the fast path"""
+
+
+class _FastParseTable(object):
+    """Lookup tables of parser actions for the fast path
+
+    Attributes:
+        options (dict): option string => (action, takes value)
+        positionals (list): positional actions in order
+        supported (bool): parser can be parsed by the fast path at all
+    """
+
+    # actions which print and exit, left to argparse
+    _exiting_actions = (argparse._HelpAction, argparse._VersionAction)
+
+    def __init__(self, parser):
+        self.actions_count = len(parser._actions)
+        self.options = {}
+        self.positionals = []
+        self.supported = self._compile(parser)
+
+    def _compile(self, parser):
+        if (parser.fromfile_prefix_chars or parser.prefix_chars != '-'
+                or parser._mutually_exclusive_groups):
+            return False
+
+        for action in parser._actions:
+            if action.option_strings:
+                if isinstance(action, self._exiting_actions):
+                    entry = None
+                elif action.nargs == 0:
+                    entry = (action, False)
+                elif action.nargs is None:
+                    entry = (action, True)
+                else:
+                    return False
+                for option_string in action.option_strings:
+                    self.options[option_string] = entry
+
+            elif action.nargs is None or action.nargs == argparse.REMAINDER:
+                if self.positionals and self.positionals[-1].nargs == argparse.REMAINDER:
+                    return False
+                self.positionals.append(action)
+
+            else:
+                return False
+
+        return True
+
+
+class FastParserMixin(object):
+    """Mixin of argument parser with a fast path of parsing
+
+    Options of the parser are compiled into lookup tables once and
+    arguments are parsed by a single linear pass.  The fast path covers
+    the common subset of arguments: options with no or one value
+    (flags, store, append, count, choices), positionals with one value
+    and a final remainder positional.  Everything else (help, errors,
+    abbreviations, ``--``, ``--opt=value``, other numbers of values,
+    mutually exclusive groups, ...) is left to argparse, so results and
+    output are identical.
+    """
+
+    _fast_table = None
+
+    def parse_known_args(self, args=None, namespace=None):
+        if namespace is None:
+            if args is None:
+                args = sys.argv[1:]
+            try:
+                return self._fast_parse_known_args(list(args))
+            except _FallBack:
+                pass
+        return super(FastParserMixin, self).parse_known_args(args, namespace)
+
+    def _get_fast_table(self):
+        table = self._fast_table
+        if table is None or table.actions_count != len(self._actions):
+            table = self._fast_table = _FastParseTable(self)
+        return table
+
+    def _fast_parse_known_args(self, args):
+        table = self._get_fast_table()
+        if not table.supported or '--' in args:
+            # argparse handling of '--' differs between versions
+            raise _FallBack()
+
+        options = table.options
+        positionals = table.positionals
+        positional_index = 0
+        taken = []
+        extras = []
+
+        index = 0
+        count = len(args)
+        while index < count:
+            arg = args[index]
+            if arg[:1] == '-' and len(arg) > 1:
+                # an option, only exactly matching ones are handled here
+                entry = options.get(arg)
+                if entry is None:
+                    raise _FallBack()
+                action, takes_value = entry
+                if takes_value:
+                    index += 1
+                    if index == count:
+                        raise _FallBack()
+                    value = args[index]
+                    if value[:1] == '-' and len(value) > 1:
+                        raise _FallBack()
+                    taken.append((action, [value], arg))
+                else:
+                    taken.append((action, [], arg))
+                index += 1
+
+            elif positional_index < len(positionals):
+                action = positionals[positional_index]
+                positional_index += 1
+                if action.nargs == argparse.REMAINDER:
+                    taken.append((action, args[index:], None))
+                    index = count
+                    continue
+
+                taken.append((action, [arg], None))
+                index += 1
+                # remainder is matched along with preceding positionals
+                if (positional_index < len(positionals)
+                        and positionals[positional_index].nargs == argparse.REMAINDER):
+                    taken.append((positionals[positional_index], args[index:], None))
+                    positional_index += 1
+                    index = count
+
+            else:
+                extras.append(arg)
+                index += 1
+
+        if positional_index < len(positionals):
+            if positionals[positional_index].nargs != argparse.REMAINDER:
+                # missing positional
+                raise _FallBack()
+            taken.append((positionals[positional_index], [], None))
+
+        return self._fast_apply(taken), extras
+
+    def _fast_apply(self, taken):
+        namespace = argparse.Namespace()
+        for action in self._actions:
+            if (action.dest is not argparse.SUPPRESS and not hasattr(namespace, action.dest)
+                    and action.default is not argparse.SUPPRESS):
+                setattr(namespace, action.dest, action.default)
+        for dest in self._defaults:
+            if not hasattr(namespace, dest):
+                setattr(namespace, dest, self._defaults[dest])
+
+        seen_actions = set()
+        try:
+            for action, arg_strings, option_string in taken:
+                seen_actions.add(action)
+                values = self._get_values(action, arg_strings)
+                if values is not argparse.SUPPRESS:
+                    action(self, namespace, values, option_string)
+
+            for action in self._actions:
+                if action in seen_actions:
+                    continue
+                if action.required:
+                    raise _FallBack()
+                if (isinstance(action.default, string_types)
+                        and getattr(namespace, action.dest, None) is action.default):
+                    setattr(namespace, action.dest, self._get_value(action, action.default))
+        except argparse.ArgumentError:
+            # error is reported by argparse
+            raise _FallBack()
+
+        return namespace
+
+
+class FastArgumentParser(FastParserMixin, argparse.ArgumentParser):
+    """ArgumentParser with fast path of parsing, see `FastParserMixin`"""
+
+
+class FastArgparserSub(FastParserMixin, ArgparserSub):
+    """ArgparserSub with fast path of parsing, see `FastParserMixin`"""
+
+
 class GroupHelpFormatter(argparse.RawDescriptionHelpFormatter):
     """HelpFormatter with support for subcommands"""
 
@@ -68,7 +293,7 @@ class GroupHelpFormatter(argparse.RawDescriptionHelpFormatter):
         subcmd_width = help_position - self._current_indent - 2
         subcmd_header = subcmd_name
 
-        help_line = split_docstring(subcmd.__doc__)[0]
+        help_line = subcommand_title(subcmd)
 
         if not help_line:
             tup = self._current_indent, '', subcmd_header
@@ -113,34 +338,9 @@ class GroupHelpFormatter(argparse.RawDescriptionHelpFormatter):
         # add the item to the list
         self._add_item(self._format_subcommand, [subcmd_name, subcmd])
 
-    def add_subcommands(self, subcommands):
-        for subcmd_name in sorted(subcommands, key=str.lower):
+    def add_subcommands(self, subcommands, order=None):
+        if order is None:
+            order = sorted(subcommands, key=str.lower)
+        for subcmd_name in order:
             subcmd = subcommands[subcmd_name]
             self.add_subcommand(subcmd_name, subcmd)
-
-
-def split_docstring(string):
-    """Split docstring to header and description
-
-    Separator between header and description is one blank line.
-    When no separator is found, then description is None.
-
-    Args:
-        string (str): docstring
-
-    Returns:
-        title, description
-    """
-
-    if not string:
-        return None, None
-
-    cleaned_docstring = inspect.cleandoc(string)
-    parts = re.split(r'(?:\n|\r|\r\n)[ \t]*(?:\n|\r|\r\n)', cleaned_docstring, 1)
-    if len(parts) == 1:
-        # header is considered also as description
-        title = parts[0].strip()
-        return title, None
-
-    title, description = (p.strip() for p in parts)
-    return title, description
@@ -0,0 +1,179 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Discovery of subcommands from entry points of installed packages
+
+Packages provide subcommands as entry points of a named group, name of
+an entry point is the name of the subcommand::
+
+    # setup.py of a plugin package
+    entry_points={
+        'myapp.commands': ['report = myapp_report.commands:ReportCommand'],
+    }
+
+Discovered subcommands are registered by their import paths, so plugin
+modules are imported only when their subcommands are invoked.
+
+Scanning metadata of installed packages is slow, therefore the discovered
+entry points can be kept in an index file.  The index is dropped whenever
+the set of installed distributions (may have) changed, which is detected
+by modification times of `sys.path` directories.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import warnings
+
+from .helpers import write_atomic
+
+INDEX_VERSION = 1
+
+
+def register_plugins(group, entry_point_group, index=None):
+    """Register subcommands of an entry point group to the command group
+
+    Subcommands already registered under the same name are kept
+    and the plugin is skipped with a warning.
+
+    Args:
+        group (CommandGroup): command group
+        entry_point_group (str): name of the entry point group
+        index (PluginIndex): optional index of entry points
+
+    Returns:
+        (list) of names of registered subcommands
+    """
+    if index is None:
+        entry_points = scan_entry_points(entry_point_group)
+    else:
+        entry_points = index.entry_points(entry_point_group)
+
+    registered = []
+    for name, import_path in entry_points:
+        if name in group._registry.subcmds_cls or name in group._registry.subcmd_aliases:
+            warnings.warn('Plugin command {} ({}) is already registered, skipped'
+                          .format(name, import_path), RuntimeWarning)
+            continue
+        group.register(import_path, name=name)
+        registered.append(name)
+    return registered
+
+
+class PluginIndex(object):
+    """Index of entry points cached in a file
+
+    Usage::
+
+        index = PluginIndex(os.path.expanduser('~/.cache/myapp/plugins.json'))
+        app.register_plugins('myapp.commands', index=index)
+
+    Args:
+        filename (str): path to the index file
+        path (list): directories and archives searched for distributions
+                     (default: sys.path)
+    """
+
+    def __init__(self, filename, path=None):
+        self.filename = filename
+        self.path = path
+        self._data = None
+
+    def entry_points(self, entry_point_group):
+        """Return pairs of (name, import path) of the entry point group
+
+        Entry points are taken from the index file when it is valid,
+        otherwise they are scanned and the index file is updated.
+        """
+        data = self._load()
+        groups = data['groups']
+        if entry_point_group not in groups:
+            groups[entry_point_group] = scan_entry_points(entry_point_group)
+            self._save(data)
+        return [tuple(entry_point) for entry_point in groups[entry_point_group]]
+
+    def refresh(self):
+        """Drop the index, entry points are scanned again on next use"""
+        self._data = None
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+    def _load(self):
+        stamp = fingerprint(self.path)
+        if self._data is not None and self._data['fingerprint'] == stamp:
+            return self._data
+
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            data = None
+
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION \
+                or data.get('fingerprint') != stamp or not isinstance(data.get('groups'), dict):
+            data = {'version': INDEX_VERSION, 'fingerprint': stamp, 'groups': {}}
+
+        self._data = data
+        return data
+
+    def _save(self, data):
+        directory = os.path.dirname(self.filename)
+        payload = json.dumps(data, sort_keys=True).encode('utf-8')
+        try:
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            write_atomic(self.filename, lambda f: f.write(payload))
+        except (IOError, OSError):
+            pass
+
+
+def fingerprint(path=None):
+    """Return fingerprint of installed distributions
+
+    Installing or removing a distribution adds or removes its metadata
+    in a directory of the search path, which changes the modification
+    time of the directory.
+
+    Args:
+        path (list): search path (default: sys.path)
+    """
+    from . import __version__
+
+    stamp = [__version__, sys.version]
+    for entry in (sys.path if path is None else path):
+        if not entry:
+            # current working directory
+            continue
+        try:
+            stamp.append((entry, os.stat(entry).st_mtime))
+        except OSError:
+            stamp.append((entry, None))
+    return hashlib.sha1(repr(stamp).encode('utf-8')).hexdigest()
+
+
+def scan_entry_points(entry_point_group):
+    """Return sorted pairs of (name, import path) of entry points
+    from metadata of installed distributions"""
+    try:
+        from importlib import metadata
+    except ImportError:
+        metadata = None
+
+    if metadata is not None:
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, 'select'):
+            entry_points = entry_points.select(group=entry_point_group)
+        else:
+            entry_points = entry_points.get(entry_point_group, ())
+        # strip extras (``module:Class [extra]``)
+        pairs = ((ep.name, ep.value.partition('[')[0].strip()) for ep in entry_points)
+    else:
+        import pkg_resources
+        pairs = ((ep.name, '{}:{}'.format(ep.module_name, '.'.join(ep.attrs)))
+                 for ep in pkg_resources.iter_entry_points(entry_point_group))
+
+    return sorted(set(pairs))
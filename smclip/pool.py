@@ -0,0 +1,68 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+
+class CommandPool(object):
+    """Pool of subcommand instances reused by invocations of a group
+
+    A subcommand instance is checked in when the group releases
+    the subcommands of its last invocation (at the start of the next
+    invocation, or by `CommandGroup.release_subcommands`).  Its state
+    of the invocation is reset by `Command.reset` and the instance,
+    together with its already built parser, is handed out again
+    to the next invocation of the same subcommand.
+
+    Pool belongs to one group instance, so pooled subcommands keep
+    their parent, application object and parser.
+
+    Args:
+        max_idle (int): maximum number of idle instances kept
+                        per subcommand (default: 16)
+
+    Attributes:
+        hits (int): number of instances handed out from the pool
+        misses (int): number of checkouts with no idle instance
+    """
+
+    def __init__(self, max_idle=16):
+        self.max_idle = max_idle
+        self.hits = 0
+        self.misses = 0
+        self._idle = {}
+
+    def checkout(self, command_cls, name, alias=None):
+        """Return an idle instance of command class registered by name
+
+        Returns:
+            (Command) with `alias` set, None when there is no idle instance
+        """
+        idle = self._idle.get((command_cls, name))
+        if not idle:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        command = idle.pop()
+        command.alias = alias
+        return command
+
+    def checkin(self, command):
+        """Reset command and keep it for a later checkout"""
+        command.reset()
+        idle = self._idle.setdefault((command.__class__, command.name), [])
+        if len(idle) < self.max_idle:
+            idle.append(command)
+
+    def clear(self):
+        """Drop all idle instances and reset counters"""
+        self._idle.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(len(idle) for idle in self._idle.values())
+
+    def __repr__(self):
+        return '<{} idle={} hits={} misses={}>'.format(self.__class__.__name__, len(self),
+                                                       self.hits, self.misses)
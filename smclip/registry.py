@@ -0,0 +1,242 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Registry of subcommands of command groups
+
+Subcommands declared by `CommandGroup.subcommands` are registered once
+per group class and the registry is shared by all instances of the class.
+An instance gets its own copy on the first `CommandGroup.register`
+or on the first access to its mappings of subcommands.
+"""
+
+import sys
+
+from .helpers import SubcommandsOrder
+from .index import PrefixTrie, SimilarityIndex
+from .lazy import LazyCommand, string_types
+
+try:
+    intern = sys.intern
+except AttributeError:
+    intern = intern
+
+__all__ = ['Subcommand']
+
+
+def intern_name(name):
+    """Return interned name, names of other types than `str`
+    (e.g. unicode on Python 2) are returned as they are"""
+    return intern(name) if type(name) is str else name
+
+
+class Subcommand(object):
+    """Declaration of a subcommand of a group class
+
+    Arguments are the same as of `CommandGroup.register`::
+
+        class TaskGroup(CommandGroup):
+            subcommands = (
+                Subcommand(ListCommand, aliases=['ls'], is_default=True),
+                Subcommand('myapp.tasks:CreateCommand', name='create'),
+            )
+    """
+
+    __slots__ = ('command_cls', 'options')
+
+    def __init__(self, command_cls, **options):
+        self.command_cls = command_cls
+        self.options = options
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.command_cls)
+
+
+class _RegistryDict(dict):
+    """Mapping of names of a registry, direct changes update the registry"""
+
+    __slots__ = ('_changed',)
+
+    def __init__(self, changed):
+        super(_RegistryDict, self).__init__()
+        self._changed = changed
+
+    def __setitem__(self, key, value):
+        self._changed(dict.__setitem__, self, key, value)
+
+    def __delitem__(self, key):
+        self._changed(dict.__delitem__, self, key)
+
+    def clear(self):
+        self._changed(dict.clear, self)
+
+    def pop(self, *args):
+        return self._changed(dict.pop, self, *args)
+
+    def popitem(self):
+        return self._changed(dict.popitem, self)
+
+    def setdefault(self, *args):
+        return self._changed(dict.setdefault, self, *args)
+
+    def update(self, *args, **kwargs):
+        self._changed(dict.update, self, *args, **kwargs)
+
+
+class Registry(object):
+    """Subcommand classes of a group by their names and aliases
+
+    Indexes for abbreviations and similar names are built on first use.
+    Changes made directly to `subcmds_cls` and `subcmd_aliases` are
+    reflected in the indexes, the order and the help cache.
+
+    Attributes:
+        subcmds_cls (dict): name => command class
+        subcmd_aliases (dict): alias => command class
+        names (dict): command class => name
+        order (SubcommandsOrder): names in order for help
+        default (class): default command class
+        fallback (class): fallback command class
+        help_cache (dict): formatted help of groups with this registry,
+                           cleared when subcommands change
+        frozen (bool): changes are refused, see `CommandGroup.freeze`
+    """
+
+    __slots__ = ('subcmds_cls', 'subcmd_aliases', 'names', 'order', 'default', 'fallback',
+                 'help_cache', 'frozen', '_similarity_index', '_prefix_trie')
+
+    def __init__(self):
+        self.subcmds_cls = _RegistryDict(self._names_changed)
+        self.subcmd_aliases = _RegistryDict(self._aliases_changed)
+        self.frozen = False
+        self.names = {}
+        self.order = SubcommandsOrder()
+        self.default = None
+        self.fallback = None
+        self.help_cache = {}
+        self._similarity_index = None
+        self._prefix_trie = None
+
+    def add(self, command_cls, name=None, aliases=None, is_default=False, is_fallback=False,
+            title=None):
+        """Add subcommand, see `CommandGroup.register`"""
+        if isinstance(command_cls, string_types):
+            command_cls = LazyCommand(command_cls, name=name, aliases=aliases, title=title)
+
+        name = name or command_cls.default_name
+        aliases = aliases or command_cls.default_aliases or tuple()
+
+        if not name and not command_cls.default_name:
+            raise RuntimeError('No name specified for command class {}'.format(command_cls.__name__))
+
+        if name in self.subcmds_cls:
+            raise RuntimeError('Command with name {} is already registered!'.format(name))
+
+        self._check_frozen()
+        name = intern_name(name)
+        dict.__setitem__(self.subcmds_cls, name, command_cls)
+        self.names[command_cls] = name
+        self.order.add(name)
+        self.help_cache.clear()
+        self._index(name, command_cls)
+
+        for alias in aliases:
+            if alias in self.subcmds_cls:
+                raise RuntimeError('Alias {} is already registered as command!'.format(name))
+            if alias in self.subcmd_aliases:
+                raise RuntimeError('Alias with name {} is already registered!'.format(name))
+
+            alias = intern_name(alias)
+            dict.__setitem__(self.subcmd_aliases, alias, command_cls)
+            self._index(alias, command_cls)
+
+        if is_fallback:
+            self.fallback = command_cls
+
+        if is_default:
+            self.default = command_cls
+
+    def _check_frozen(self):
+        if self.frozen:
+            raise RuntimeError('Registry is frozen, subcommands cannot be changed')
+
+    def _names_changed(self, method, mapping, *args, **kwargs):
+        """Apply direct change of names and rebuild names and order"""
+        self._check_frozen()
+        rv = method(mapping, *args, **kwargs)
+        self.names = dict((command_cls, name) for name, command_cls in mapping.items())
+        self.order = SubcommandsOrder()
+        for name in mapping:
+            self.order.add(name)
+        self._reset_indexes()
+        return rv
+
+    def _aliases_changed(self, method, mapping, *args, **kwargs):
+        """Apply direct change of aliases"""
+        self._check_frozen()
+        rv = method(mapping, *args, **kwargs)
+        self._reset_indexes()
+        return rv
+
+    def _reset_indexes(self):
+        self.help_cache.clear()
+        self._similarity_index = None
+        self._prefix_trie = None
+
+    def _index(self, name, command_cls):
+        if self._similarity_index is not None:
+            self._similarity_index.add(name)
+        if self._prefix_trie is not None:
+            self._prefix_trie.add(name, command_cls)
+
+    def _all_names(self):
+        for registry in (self.subcmds_cls, self.subcmd_aliases):
+            for item in registry.items():
+                yield item
+
+    @property
+    def similarity_index(self):
+        """Index of names and aliases for lookup of similar names"""
+        if self._similarity_index is None:
+            index = SimilarityIndex()
+            for name, _ in self._all_names():
+                index.add(name)
+            self._similarity_index = index
+        return self._similarity_index
+
+    @property
+    def prefix_trie(self):
+        """Trie of names and aliases for lookup of unique prefixes"""
+        if self._prefix_trie is None:
+            trie = PrefixTrie()
+            for name, command_cls in self._all_names():
+                trie.add(name, command_cls)
+            self._prefix_trie = trie
+        return self._prefix_trie
+
+    def replace(self, subcmds_cls=None, subcmd_aliases=None):
+        """Replace all names or aliases of subcommands,
+        indexes are rebuilt on first use"""
+        if subcmds_cls is not None:
+            names = [(intern_name(name), command_cls) for name, command_cls in subcmds_cls.items()]
+            self._names_changed(_replace, self.subcmds_cls, names)
+        if subcmd_aliases is not None:
+            aliases = [(intern_name(alias), command_cls)
+                       for alias, command_cls in subcmd_aliases.items()]
+            self._aliases_changed(_replace, self.subcmd_aliases, aliases)
+
+    def copy(self):
+        """Return a copy, indexes are rebuilt on first use"""
+        registry = self.__class__()
+        dict.update(registry.subcmds_cls, self.subcmds_cls)
+        dict.update(registry.subcmd_aliases, self.subcmd_aliases)
+        registry.names.update(self.names)
+        registry.order = self.order.copy()
+        registry.default = self.default
+        registry.fallback = self.fallback
+        return registry
+
+
+def _replace(mapping, items):
+    dict.clear(mapping)
+    dict.update(mapping, items)
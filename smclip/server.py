@@ -0,0 +1,306 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Resident command server
+
+Command server keeps a root command (with imported modules and built
+parsers) resident and serves invocations over a local Unix socket.
+A client sends its arguments, environment, working directory and
+standard file descriptors, and receives an exit status back.
+
+Protocol (one request per connection)::
+
+    client -> server: <4 bytes length><JSON request>
+                      with stdin, stdout and stderr passed as SCM_RIGHTS
+    server -> client: <4 bytes signed exit status>
+
+Request is a JSON object with keys ``argv``, ``env`` and ``cwd``.
+
+Passing file descriptors requires ``socket.sendmsg`` and ``recvmsg``,
+the server and the client are available on Python 3.3+ only.
+"""
+
+import array
+import json
+import os
+import socket
+import struct
+import sys
+import traceback
+
+from .helpers import exit_status, temporary_filename
+from .lazy import string_types
+
+_LENGTH = struct.Struct('!I')
+_STATUS = struct.Struct('!i')
+_STDIO_FDS = (0, 1, 2)
+# Unix sockets with ancillary data (Python 3.3+)
+SUPPORTED = hasattr(socket, 'AF_UNIX') and hasattr(socket.socket, 'sendmsg')
+
+
+def _check_supported():
+    if not SUPPORTED:
+        raise RuntimeError('Command server requires Python 3.3+ with Unix sockets')
+
+
+class CommandServer(object):
+    """Server of invocations of a resident root command
+
+    Only the user running the server may connect: the socket is created
+    with mode 0600 and, where the platform reports credentials of peers,
+    connections of other users are refused.
+
+    Each request is by default run in a forked child, so it is isolated
+    from other requests (environment, working directory, state of command
+    instances), while modules and parsers warmed up in the server are
+    shared.  Without forking, requests are served one by one in the
+    server process.
+
+    Args:
+        command (CommandGroup): root command
+        address (str): path of the Unix socket
+        fork (bool): run each request in a forked child (default: True)
+        warm_up (bool): build parser of the root command in advance
+
+    Raises:
+        RuntimeError: the interpreter cannot pass file descriptors over Unix sockets
+    """
+
+    def __init__(self, command, address, fork=True, warm_up=True):
+        _check_supported()
+        self.command = command
+        self.address = address
+        self.fork = fork
+        self._socket = None
+        self._running = False
+
+        if warm_up:
+            command.parser
+
+    def serve_forever(self):
+        """Accept and serve requests until `shutdown` is called"""
+        # socket appears at its address only when it is listening
+        tmp_address = temporary_filename(self.address)
+        if os.path.exists(tmp_address):
+            os.unlink(tmp_address)
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(tmp_address)
+        # requests run arbitrary arguments as the server user
+        os.chmod(tmp_address, 0o600)
+        self._socket.listen(128)
+        os.rename(tmp_address, self.address)
+        self._running = True
+
+        try:
+            while self._running:
+                try:
+                    conn, _ = self._socket.accept()
+                except (OSError, socket.error):
+                    if not self._running:
+                        break
+                    raise
+
+                try:
+                    self.handle_connection(conn)
+                except Exception:
+                    # a bad request must not stop the server
+                    traceback.print_exc()
+                finally:
+                    conn.close()
+                self._reap_children()
+        finally:
+            self._running = False
+            self._socket.close()
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def shutdown(self):
+        """Stop serving requests"""
+        self._running = False
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except (OSError, socket.error):
+                pass
+
+    def handle_connection(self, conn):
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            raise IOError('Connection of user {} refused'.format(uid))
+
+        request, fds = recv_request(conn)
+
+        if not self.fork:
+            try:
+                status = self.run_request(request, fds)
+            finally:
+                _close_fds(fds)
+            conn.sendall(_STATUS.pack(status))
+            return
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            _close_fds(fds)
+            return
+
+        # child
+        status = 1
+        try:
+            self._socket.close()
+            status = self.run_request(request, fds)
+            conn.sendall(_STATUS.pack(status))
+        finally:
+            os._exit(status)
+
+    def run_request(self, request, fds):
+        """Invoke root command with stdio, environment and working
+        directory of the request and return exit status"""
+        saved_fds = [os.dup(fd) for fd in _STDIO_FDS]
+        saved_env = dict(os.environ)
+        saved_cwd = os.getcwd()
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            for fd, stdio_fd in zip(fds, _STDIO_FDS):
+                os.dup2(fd, stdio_fd)
+            os.environ.clear()
+            os.environ.update(request['env'])
+            os.chdir(request['cwd'])
+
+            return self.invoke(request['argv'])
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, stdio_fd in zip(saved_fds, _STDIO_FDS):
+                os.dup2(fd, stdio_fd)
+            _close_fds(saved_fds)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            os.chdir(saved_cwd)
+
+    def invoke(self, argv):
+        """Invoke root command and return exit status"""
+        try:
+            self.command.invoke(argv)
+        except SystemExit as e:
+            return exit_status(e.code, sys.stderr)
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+    def _reap_children(self):
+        if not self.fork:
+            return
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except OSError:
+                return
+            if not pid:
+                return
+
+
+def call(address, argv, env=None, cwd=None, fds=_STDIO_FDS):
+    """Invoke command on a command server and return its exit status
+
+    Args:
+        address (str): path of the Unix socket of the server
+        argv (list): command arguments
+        env (dict): environment (default: current environment)
+        cwd (str): working directory (default: current directory)
+        fds (tuple): stdin, stdout and stderr file descriptors
+
+    Raises:
+        RuntimeError: the interpreter cannot pass file descriptors over Unix sockets
+    """
+    _check_supported()
+    request = {
+        'argv': list(argv),
+        'env': dict(os.environ) if env is None else env,
+        'cwd': os.getcwd() if cwd is None else cwd,
+    }
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+        send_request(sock, request, fds)
+        return _STATUS.unpack(_recv_exactly(sock, _STATUS.size))[0]
+    finally:
+        sock.close()
+
+
+def client_main(address, argv=None):
+    """Entry point of a client shim forwarding its invocation to a server"""
+    if argv is None:
+        argv = sys.argv[1:]
+    sys.exit(call(address, argv))
+
+
+def send_request(sock, request, fds):
+    payload = json.dumps(request).encode('utf-8')
+    header = _LENGTH.pack(len(payload))
+    ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds).tobytes())]
+    sock.sendmsg([header], ancillary)
+    sock.sendall(payload)
+
+
+def recv_request(sock):
+    fds = array.array('i')
+    header, ancillary, _, _ = sock.recvmsg(_LENGTH.size,
+                                           socket.CMSG_LEN(len(_STDIO_FDS) * fds.itemsize))
+    for level, kind, data in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+
+    try:
+        if len(header) < _LENGTH.size:
+            header += _recv_exactly(sock, _LENGTH.size - len(header))
+        length = _LENGTH.unpack(header)[0]
+        request = json.loads(_recv_exactly(sock, length).decode('utf-8'))
+
+        if len(fds) != len(_STDIO_FDS):
+            raise IOError('Expected {} file descriptors, got {}'.format(len(_STDIO_FDS), len(fds)))
+        _check_request(request)
+    except Exception:
+        _close_fds(fds)
+        raise
+    return request, list(fds)
+
+
+def peer_uid(sock):
+    """Return user id of the peer of a connected Unix socket,
+    None when the platform does not report it"""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = struct.Struct('3i')
+    _, uid, _ = creds.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, creds.size))
+    return uid
+
+
+def _check_request(request):
+    if not isinstance(request, dict) or not isinstance(request.get('argv'), list) \
+            or not isinstance(request.get('env'), dict) or not isinstance(request.get('cwd'), string_types):
+        raise ValueError('Malformed request')
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise IOError('Connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _close_fds(fds):
+    for fd in fds:
+        os.close(fd)
+
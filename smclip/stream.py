@@ -0,0 +1,135 @@
+# Copyright (c) 2016 Red Hat, Inc.
+# Author: Viliam Krizan
+# License: LGPLv3+
+
+"""Streaming of results
+
+An action written as a generator produces its results lazily.  Such
+result value is wrapped in `ResultStream` and passed as it is to
+`results_callback` of parent groups, so results can be processed
+(printed) while the rest is still being produced.  Other iterators
+(files, cursors, ``map`` objects) are returned as they are.
+"""
+
+import types
+
+try:
+    # loaded on interpreter startup, unlike collections.abc
+    from _collections_abc import Iterator
+except ImportError:
+    from collections import Iterator
+
+
+class ResultStream(object):
+    """Lazy stream of results of a command action
+
+    Stream can be iterated only once.  Nothing is stored, so memory use
+    does not depend on the number of results.
+
+    `results_callback` of a group can return a new stream
+    (e.g. by `map` or `each`), which then replaces the result value
+    passed to upper groups.
+
+    Attributes:
+        command (Command): command which produced the stream
+        count (int): number of results taken from the stream so far
+    """
+
+    def __init__(self, iterable, command=None):
+        self.command = command
+        self.count = 0
+        self._iterator = iter(iterable)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+    next = __next__
+
+    def map(self, func):
+        """Return a new stream of results transformed by `func`"""
+        return ResultStream((func(item) for item in self), self.command)
+
+    def each(self, callback):
+        """Return a new stream calling `callback` for each result
+        as it passes through"""
+        def passing():
+            for item in self:
+                callback(item)
+                yield item
+        return ResultStream(passing(), self.command)
+
+    def drain(self, callback=None):
+        """Consume the stream, optionally calling `callback` for each result
+
+        Returns:
+            (int) number of consumed results
+        """
+        for item in self:
+            if callback is not None:
+                callback(item)
+        return self.count
+
+    def close(self):
+        """Stop the stream, underlying generator is closed"""
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+
+    def __repr__(self):
+        return '<{} of {!r} count={}>'.format(self.__class__.__name__, self.command, self.count)
+
+
+def stream_result(command, rv):
+    """Wrap generator result value of command in `ResultStream`
+
+    Other result values (including containers and other iterators,
+    which keep their own API, e.g. files) are returned as they are.
+    """
+    if isinstance(rv, types.GeneratorType):
+        return ResultStream(rv, command)
+    return rv
+
+
+def as_stream(rv, command=None):
+    """Return result value as a stream
+
+    None is an empty stream, a list, a tuple or an iterator is a stream
+    of its items and any other value is a stream of the single value.
+    """
+    if isinstance(rv, ResultStream):
+        return rv
+    if rv is None:
+        rv = ()
+    elif not isinstance(rv, (list, tuple, Iterator)):
+        rv = (rv,)
+    return ResultStream(rv, command)
+
+
+def pipeline_output(rv, upstreams, command=None):
+    """Return stream of the last stage of a pipeline
+
+    Streams between stages are closed as soon as the output stream
+    is exhausted or closed, so stages which stopped early
+    (e.g. ``head``) stop their upstream stages as well.
+    """
+    def output():
+        try:
+            for item in as_stream(rv):
+                yield item
+        finally:
+            for upstream in reversed(upstreams):
+                upstream.close()
+    return ResultStream(output(), command)
+
+
+def callback_result(rv, callback_rv):
+    """Return result value replaced by a stream returned from
+    `results_callback`"""
+    if isinstance(callback_rv, ResultStream):
+        return callback_rv
+    return rv
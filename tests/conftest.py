@@ -6,6 +6,10 @@ sys.path.append(os.path.dirname(__file__))
 
 from integration_classes import MyApplication, _split_cmd_args
 
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append('test_aio.py')
+
 
 @pytest.fixture(scope='function')
 def myapp():
@@ -0,0 +1,150 @@
+import pytest
+
+import smclip
+from smclip import CommandAmbiguous
+from smclip.index import AmbiguousPrefix, PrefixTrie
+
+from integration_classes import _split_cmd_args
+
+
+def test_trie():
+    trie = PrefixTrie()
+    trie.add('list', 'L')
+    trie.add('ls', 'L')
+    trie.add('lock', 'K')
+    trie.add('log', 'G')
+    trie.add('logs', 'S')
+
+    assert trie.lookup('li') == ('list', 'L')
+    assert trie.lookup('ls') == ('ls', 'L')
+    assert trie.lookup('loc') == ('lock', 'K')
+    assert trie.lookup('log') == ('log', 'G')
+    assert trie.lookup('x') == (None, None)
+    assert trie.lookup('lists') == (None, None)
+    assert trie.lookup('') == (None, None)
+
+    with pytest.raises(AmbiguousPrefix) as excinfo:
+        trie.lookup('lo')
+    assert excinfo.value.keys == ['lock', 'log', 'logs']
+
+
+class Leaf(smclip.Command):
+
+    def this_action(self):
+        return self.name, self.alias
+
+
+class ChainedLeaf(smclip.ChainedCommand):
+
+    def this_action(self):
+        return self.name
+
+
+class Items(smclip.ChainedCommandGroup):
+    abbreviate_subcommands = True
+
+    def __init__(self, *args, **kwargs):
+        super(Items, self).__init__(*args, **kwargs)
+        for name in ('change', 'move', 'mark'):
+            self.register(type(name.title(), (ChainedLeaf,), {}), name=name)
+
+
+class Task(smclip.CommandGroup):
+    abbreviate_subcommands = True
+
+    def __init__(self, *args, **kwargs):
+        super(Task, self).__init__(*args, **kwargs)
+        self.register(Leaf, name='list', aliases=['ls'])
+        self.register(type('Create', (Leaf,), {}), name='create')
+        self.register(Items, name='items')
+
+
+class App(smclip.CommandGroup):
+    abbreviate_subcommands = True
+
+    def __init__(self):
+        super(App, self).__init__('app')
+        self.register(Task, name='task', aliases=['todo'])
+        self.register(type('Test', (Leaf,), {}), name='test')
+
+
+@pytest.mark.parametrize('cmdargs,expected', [
+    ('ta li', ('list', 'list')),
+    ('to ls', ('list', 'ls')),
+    ('tas l', ('list', 'list')),
+    ('task cr', ('create', 'create')),
+    ('te', ('test', 'test')),
+])
+def test_abbreviated(cmdargs, expected):
+    assert App().invoke(_split_cmd_args(cmdargs)) == expected
+
+
+def test_abbreviated_alias():
+    app = App()
+    app.invoke(_split_cmd_args('to l'))
+    assert app.invoked_subcommand.name == 'task'
+    assert app.invoked_subcommand.alias == 'todo'
+
+
+def test_abbreviated_chain():
+    rv = App().invoke(_split_cmd_args('ta i ch mo ma'))
+    assert [subrv for _, subrv in rv] == ['change', 'move', 'mark']
+
+
+@pytest.mark.parametrize('cmdargs,message', [
+    ('t', "ambiguous command `t', could be `task', `test', `todo'"),
+    ('task i m', "ambiguous command `m', could be `mark', `move'"),
+])
+def test_ambiguous(capsys, cmdargs, message):
+    with pytest.raises(SystemExit) as excinfo:
+        App().invoke(_split_cmd_args(cmdargs))
+
+    assert excinfo.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_ambiguous_error():
+    app = App()
+    with pytest.raises(CommandAmbiguous) as excinfo:
+        app.find_subcmd_cls('t')
+    assert excinfo.value.candidates == ['task', 'test', 'todo']
+
+
+def test_registered_after_lookup():
+    app = App()
+    assert app.find_subcmd_cls('te')[0] == 'test'
+
+    app.register(Leaf, name='tea')
+    assert app.find_subcmd_cls('tea')[0] == 'tea'
+    with pytest.raises(CommandAmbiguous):
+        app.find_subcmd_cls('te')
+
+
+class Single(smclip.CommandGroup):
+    abbreviate_subcommands = True
+
+    def __init__(self, *args, **kwargs):
+        super(Single, self).__init__(*args, **kwargs)
+        self.register(Leaf, name='only')
+
+
+def test_empty_name(capsys):
+    assert Single('single').find_subcmd_cls('') == ('', None)
+    with pytest.raises(SystemExit):
+        App().invoke([''])
+    assert "unknown command `'" in capsys.readouterr().err
+
+
+def test_not_abbreviated(myapp, capsys):
+    with pytest.raises(SystemExit):
+        myapp.invoke(_split_cmd_args('gro'))
+    assert "unknown command `gro'" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('cmdargs,expected', [
+    ('ta', ['create', 'items', 'list']),
+    ('ta i', ['change', 'mark', 'move']),
+    ('t', None),
+])
+def test_possible_command_names(cmdargs, expected):
+    assert App().possible_command_names(_split_cmd_args(cmdargs)) == expected
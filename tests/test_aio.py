@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+import smclip
+
+from integration_classes import *
+from integration_classes import _split_cmd_args
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize('cmdargs', [
+    '--appopt A group --groupopt G create --createopt S',
+    'listdefault 1234 change move here',
+    'listdefault --listopt value',
+    'help --helpopt value',
+])
+def test_sync_callbacks(cmdargs):
+    sync_app = MyApplication()
+    sync_app.invoke(_split_cmd_args(cmdargs))
+
+    async_app = MyApplication()
+    _run(async_app.ainvoke(_split_cmd_args(cmdargs)))
+
+    _assert_same_calls(sync_app, async_app)
+
+
+def _assert_same_calls(sync_cmd, async_cmd):
+    for callback in ('preprocess', 'this_action'):
+        sync_mock = getattr(sync_cmd, callback)
+        if hasattr(sync_mock, 'call_args_list'):
+            assert getattr(async_cmd, callback).call_args_list == sync_mock.call_args_list
+    if hasattr(getattr(sync_cmd, 'results_callback', None), 'call_count'):
+        assert async_cmd.results_callback.call_count == sync_cmd.results_callback.call_count
+
+    if getattr(sync_cmd, 'invoked_subcommands', None):
+        for sync_sub, async_sub in zip(sync_cmd.invoked_subcommands,
+                                       async_cmd.invoked_subcommands):
+            _assert_same_calls(sync_sub, async_sub)
+    elif isinstance(getattr(sync_cmd, 'invoked_subcommand', None), smclip.Command):
+        _assert_same_calls(sync_cmd.invoked_subcommand, async_cmd.invoked_subcommand)
+
+
+def test_bad_arguments():
+    with pytest.raises(SystemExit) as excinfo:
+        _run(MyApplication().ainvoke(['unknowncmd']))
+    assert excinfo.value.code == 2
+
+
+class Fetch(smclip.ChainedCommand):
+    default_name = 'fetch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('item')
+
+    async def this_action(self, item):
+        self.app.started.append(item)
+        await self.app.event.wait()
+        return item.upper()
+
+
+class Mark(smclip.ChainedCommand):
+    default_name = 'mark'
+    chain_serial = True
+
+    async def preprocess(self):
+        return {'started': list(self.app.started)}
+
+    def this_action(self, started):
+        return started
+
+
+class AsyncChained(smclip.ChainedCommandGroup):
+    default_name = 'items'
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncChained, self).__init__(*args, **kwargs)
+        self.register(Fetch)
+        self.register(Mark)
+
+    async def results_callback(self, rv):
+        self.app.results = [subrv for _, subrv in rv]
+
+
+class AsyncApp(smclip.CommandGroup):
+
+    def __init__(self):
+        super(AsyncApp, self).__init__(app=self)
+        self.name = 'asyncapp'
+        self.register(AsyncChained)
+        self.started = []
+        self.results = None
+
+    async def this_action(self):
+        return 'root'
+
+
+def test_coroutine_callbacks():
+    app = AsyncApp()
+
+    async def main():
+        app.event = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        loop.call_later(0.01, app.event.set)
+        return await app.ainvoke('items fetch a fetch b mark fetch c'.split(' '))
+
+    rv = _run(main())
+
+    # fetches before the serial command ran concurrently
+    assert app.results == ['A', 'B', ['a', 'b'], 'C']
+    assert [subrv for _, subrv in rv] == app.results
+
+
+def test_coroutine_action():
+    assert _run(AsyncApp().ainvoke([])) == 'root'
+
+
+def test_stream_result():
+    from smclip.stream import ResultStream
+
+    class Rows(smclip.Command):
+        async def this_action(self):
+            return (row for row in [1, 2])
+
+    class Group(smclip.CommandGroup):
+        def __init__(self):
+            super(Group, self).__init__('group')
+            self.register(Rows, name='rows')
+
+        async def results_callback(self, rv):
+            return rv.map(str)
+
+    rv = _run(Group().ainvoke(['rows']))
+    assert isinstance(rv, ResultStream)
+    assert list(rv) == ['1', '2']
+
+
+def test_pass_context():
+    from smclip.context import InvocationContext
+
+    class Show(smclip.Command):
+        pass_context = True
+
+        async def this_action(self, context):
+            await asyncio.sleep(0)
+            return context.path
+
+    class Group(smclip.CommandGroup):
+        pass_context = True
+
+        def __init__(self):
+            super(Group, self).__init__('group')
+            self.register(Show, name='show')
+
+        async def results_callback(self, context, rv):
+            context.obj.append(context.invoked_subcommand.name)
+
+    group = Group()
+    contexts = [InvocationContext(group, obj=[]) for _ in range(3)]
+
+    async def main():
+        return await asyncio.gather(*(group.ainvoke(['show'], context) for context in contexts))
+
+    assert _run(main()) == [('group', 'show')] * 3
+    assert [context.obj for context in contexts] == [['show']] * 3
@@ -0,0 +1,144 @@
+import pytest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import smclip
+from smclip import Argument
+from smclip.arguments import ScanError, ScanMiss, scan_options
+from smclip.completion import CompletionResolver
+
+
+class DeclaredCommand(smclip.Command):
+    default_name = 'declared'
+
+    arguments = (
+        Argument('--state', choices=['open', 'closed']),
+        Argument('-v', '--verbose', action='count', default=0),
+        Argument('item'),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(DeclaredCommand, self).__init__(*args, **kwargs)
+        self.this_action = mock.Mock()
+
+
+class MixedCommand(DeclaredCommand):
+    default_name = 'mixed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--extra')
+
+
+class DeclaredGroup(smclip.CommandGroup):
+    default_name = 'items'
+
+    arguments = (
+        Argument('--groupopt'),
+        Argument('--flag', action='store_true'),
+        Argument('--pair', nargs=2),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(DeclaredGroup, self).__init__(*args, **kwargs)
+        self.register(DeclaredCommand)
+        self.register(MixedCommand)
+
+
+class App(smclip.CommandGroup):
+
+    def __init__(self):
+        super(App, self).__init__('app', app=self)
+        self.register(DeclaredGroup)
+
+
+def test_declared_arguments_parsed():
+    app = App()
+    app.invoke('items --flag declared --state open -vv x'.split(' '))
+
+    command = app.invoked_subcommand.invoked_subcommand
+    command.this_action.assert_called_once_with(state='open', verbose=2, item='x')
+
+
+def test_declared_and_added_arguments():
+    app = App()
+    app.invoke('items mixed --extra e x'.split(' '))
+
+    command = app.invoked_subcommand.invoked_subcommand
+    command.this_action.assert_called_once_with(state=None, verbose=0, item='x', extra='e')
+
+
+def test_declared_arguments():
+    assert DeclaredCommand.declared_arguments() == DeclaredCommand.arguments
+    assert MixedCommand.declared_arguments() is None
+    assert smclip.CommandGroup.declared_arguments() == ()
+
+
+def test_argument_spec():
+    state, verbose, item = DeclaredCommand.arguments
+
+    assert state.option_strings == ('--state',)
+    assert state.arity == 1
+    assert verbose.option_strings == ('-v', '--verbose')
+    assert verbose.arity == 0
+    assert item.option_strings == ()
+    assert Argument('--many', nargs='+').arity is None
+    assert Argument('--custom', action=object).arity is None
+    assert repr(verbose) == "Argument('-v', '--verbose', action='count', default=0)"
+
+
+@pytest.mark.parametrize('cmdargs,expected', [
+    ('items', ['declared', 'mixed']),
+    ('items --groupopt value --flag', ['declared', 'mixed']),
+    ('items --unknown', None),
+    ('items --groupopt', None),
+    ('items declared', []),
+])
+def test_completion_without_parser(cmdargs, expected):
+    resolver = CompletionResolver(App())
+
+    with mock.patch.object(smclip.Command, 'get_parser') as get_parser:
+        assert resolver.possible_command_names(cmdargs.split(' ')) == expected
+    assert get_parser.call_count == 0
+
+
+@pytest.mark.parametrize('cmdargs,expected', [
+    ('items --pair a b', ['declared', 'mixed']),
+    ('items --groupopt=value declared', []),
+    ('items -x', None),
+])
+def test_completion_falls_back_to_parser(cmdargs, expected):
+    assert CompletionResolver(App()).possible_command_names(cmdargs.split(' ')) == expected
+
+
+SCAN_OPTIONS = {'--opt': 1, '--flag': 0, '--pair': 2, '--many': None}
+
+
+@pytest.mark.parametrize('cmdargs,expected', [
+    ('--opt a --flag item', (3, [], False)),
+    ('--opt=a --pair a - item', (4, [], False)),
+    ('--flag', (1, [], False)),
+    ('--unknown --opt a item', (3, ['--unknown'], False)),
+    ('--fl --help item', (1, [], True)),
+])
+def test_scan_options(cmdargs, expected):
+    args = cmdargs.split(' ')
+    assert scan_options(SCAN_OPTIONS, args, help_options=['--help'],
+                        skipped=(), abbrev=True) == expected
+
+
+@pytest.mark.parametrize('cmdargs,error', [
+    ('--unknown item', ScanMiss),
+    ('--many a item', ScanMiss),
+    ('--opt -a item', ScanMiss),
+    ('--pair=a item', ScanMiss),
+    ('-- item', ScanMiss),
+    ('--fl item', ScanMiss),
+    ('--flag=x item', ScanError),
+    ('--pair a', ScanError),
+])
+def test_scan_options_failure(cmdargs, error):
+    with pytest.raises(error):
+        scan_options(SCAN_OPTIONS, cmdargs.split(' '), start=0)
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+from smclip.batch import read_records, split_record
+
+from integration_classes import *
+
+
+def test_read_records():
+    data = 'group create\n\n  # comment\n--appopt "A B" help --helpopt issue#12\nunknown\r\n'
+    records = list(read_records(io.StringIO(data)))
+
+    assert records == ['group create', '--appopt "A B" help --helpopt issue#12', 'unknown']
+    assert [split_record(record) for record in records] == [
+        ['group', 'create'],
+        ['--appopt', 'A B', 'help', '--helpopt', 'issue#12'],
+        ['unknown'],
+    ]
+
+
+def test_read_null_separated_records():
+    data = '2\0group\0create\0' '0\0' '4\0--appopt\0"A B"\0help\0line\nbreak\0' '2\0help\0\0'
+    records = list(read_records(io.StringIO(data), null_separated=True, chunk_size=7))
+
+    assert records == [
+        ['group', 'create'],
+        [],
+        ['--appopt', '"A B"', 'help', 'line\nbreak'],
+        ['help', ''],
+    ]
+
+
+@pytest.mark.parametrize('data', ['x\0help\0', '2\0help\0', '2\0help'])
+def test_read_bad_null_separated_records(data):
+    with pytest.raises(ValueError):
+        list(read_records(io.StringIO(data), null_separated=True))
+
+
+def test_invoke_batch(myapp):
+    records = [['group', 'create'], ['unknown'], ['override'], ['badoverride'], ['help']]
+
+    results = myapp.invoke_batch(records)
+
+    assert [result.exit_status for result in results] == [0, 2, 0, 1, 0]
+    assert [result.index for result in results] == list(range(5))
+    assert isinstance(results[1].error, SystemExit)
+    assert isinstance(results[3].error, AssertionError)
+    assert myapp.preprocess.call_count == 4
+    assert isinstance(myapp.invoked_subcommand, SimpleCommand)
+
+
+def test_invoke_batch_stop_on_error(myapp):
+    records = [['group', 'create'], ['unknown'], ['help']]
+
+    results = myapp.invoke_batch(records, stop_on_error=True)
+
+    assert [result.ok for result in results] == [True, False]
+
+
+def test_invoke_batch_bad_record(myapp):
+    records = read_records(io.StringIO('help --helpopt "unclosed\nhelp\n'))
+
+    results = myapp.invoke_batch(records)
+
+    assert [result.exit_status for result in results] == [2, 0]
+    assert isinstance(results[0].error, ValueError)
+    assert results[0].argv == 'help --helpopt "unclosed'
+    assert results[1].argv == ['help']
+
+    results = myapp.invoke_batch(['help "unclosed', ['help']], stop_on_error=True)
+    assert [result.ok for result in results] == [False]
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, 'benchmarks'))
+
+bench = pytest.importorskip('bench')
+
+
+def test_run():
+    names = ['invoke_wide_10', 'invoke_deep_10', 'invoke_deep_default_10',
+             'invoke_deep_repeated_10', 'invoke_deep_frozen_10',
+             'invoke_chain_10',
+             'possible_command_names_wide_10', 'format_help_wide_10',
+             'memory_leaf_instances', 'memory_group_instances_declared_wide_10']
+    report = bench.run(names, quick=True, repeat=1)
+
+    assert sorted(report['results']) == sorted(names)
+    for result in report['results'].values():
+        assert result['time'] > 0
+
+
+def test_compare():
+    baseline = {'results': {
+        'fast': {'time': 1.0, 'peak_memory': 100},
+        'slow': {'time': 1.0, 'peak_memory': 100},
+        'big': {'time': 1.0, 'peak_memory': 100},
+    }}
+    report = {'results': {
+        'fast': {'time': 1.1, 'peak_memory': 100},
+        'slow': {'time': 2.0, 'peak_memory': 100},
+        'big': {'time': 1.0, 'peak_memory': 200},
+        'new': {'time': 5.0, 'peak_memory': None},
+    }}
+
+    regressions = bench.compare(report, baseline, threshold=1.25)
+    assert [regression.split(' ')[:2] for regression in regressions] == \
+        [['big', 'peak_memory:'], ['slow', 'time:']]
+    assert bench.compare(report, baseline, threshold=1.25, memory_threshold=3) == \
+        regressions[1:]
@@ -0,0 +1,108 @@
+import os
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import smclip
+from smclip.cache import ParserCache
+
+
+class CachedCommand(smclip.Command):
+    """Cached command"""
+
+    default_name = 'cached'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--opt', choices=['a', 'b'])
+        parser.add_argument('--flag', action='store_true')
+        parser.add_argument('--num', type=int, default='1')
+
+
+class UnpicklableCommand(smclip.Command):
+
+    default_name = 'unpicklable'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--opt', type=lambda value: value.upper())
+
+
+def _cached_command(cache, command_cls=CachedCommand):
+    command = command_cls()
+    command.parser_cache = cache
+    return command
+
+
+def test_memory_cache():
+    cache = ParserCache()
+
+    with mock.patch.object(CachedCommand, 'add_arguments',
+                           wraps=CachedCommand.add_arguments, autospec=True) as add_arguments:
+        first = _cached_command(cache)
+        second = _cached_command(cache)
+        assert first.parser is second.parser
+        assert add_arguments.call_count == 1
+
+        assert first.get_parser(add_help=False) is not first.parser
+        assert add_arguments.call_count == 2
+
+
+def test_snapshot(tmp_path):
+    directory = str(tmp_path.joinpath('parsers'))
+    parser = _cached_command(ParserCache(directory)).parser
+
+    with mock.patch.object(CachedCommand, 'add_arguments') as add_arguments:
+        loaded = _cached_command(ParserCache(directory)).parser
+
+    assert add_arguments.call_count == 0
+    assert loaded is not parser
+    assert loaded.format_help() == parser.format_help()
+    args = ['--opt', 'a', '--flag']
+    assert vars(loaded.parse_args(args)) == vars(parser.parse_args(args)) == \
+        {'opt': 'a', 'flag': True, 'num': 1}
+
+
+def test_snapshot_invalidated(tmp_path):
+    directory = str(tmp_path.joinpath('parsers'))
+    _cached_command(ParserCache(directory)).parser
+
+    source = os.path.abspath(__file__)
+    if source.endswith('.pyc'):
+        source = source[:-1]
+    stat = os.stat(source)
+    try:
+        os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+        with mock.patch.object(CachedCommand, 'add_arguments') as add_arguments:
+            _cached_command(ParserCache(directory)).parser
+    finally:
+        os.utime(source, (stat.st_atime, stat.st_mtime))
+
+    assert add_arguments.call_count == 1
+
+
+def test_snapshot_not_private(tmp_path):
+    directory = str(tmp_path.joinpath('parsers'))
+    _cached_command(ParserCache(directory)).parser
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+    os.chmod(directory, 0o770)
+    with mock.patch.object(CachedCommand, 'add_arguments') as add_arguments:
+        _cached_command(ParserCache(directory)).parser
+    assert add_arguments.call_count == 1
+
+
+def test_unpicklable_parser(tmp_path):
+    directory = str(tmp_path.joinpath('parsers'))
+
+    parser = _cached_command(ParserCache(directory), UnpicklableCommand).parser
+
+    assert parser.parse_args(['--opt', 'x']).opt == 'X'
+    assert not os.path.exists(directory) or not os.listdir(directory)
+
+
+def test_group_parser(myapp):
+    myapp.parser_cache = ParserCache()
+
+    assert myapp.possible_command_names(['group']) == ['ID', 'create', 'list']
+    assert myapp.get_parser(add_help=False) is myapp.get_parser(add_help=False)
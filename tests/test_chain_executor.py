@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+
+import pytest
+import smclip
+
+futures = pytest.importorskip('concurrent.futures')
+pytestmark = pytest.mark.skipif(not hasattr(threading, 'Barrier'), reason='threading.Barrier required')
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.events = []
+
+    def enter(self, name):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.events.append(('start', name))
+
+    def leave(self, name):
+        with self.lock:
+            self.running -= 1
+            self.events.append(('end', name))
+
+
+class SlowCommand(smclip.ChainedCommand):
+    default_name = 'slow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('value')
+
+    def this_action(self, value):
+        self.app.enter(value)
+        self.app.barrier.wait(timeout=5)
+        self.app.leave(value)
+        return value
+
+
+class SerialCommand(smclip.ChainedCommand):
+    default_name = 'serial'
+    chain_serial = True
+
+    def this_action(self):
+        self.app.enter('serial')
+        self.app.leave('serial')
+        return 'serial'
+
+
+class FailingCommand(smclip.ChainedCommand):
+    default_name = 'fail'
+
+    def this_action(self):
+        raise ValueError('failed')
+
+
+class ParallelGroup(smclip.ChainedCommandGroup):
+    chain_workers = 4
+
+    def __init__(self, *args, **kwargs):
+        super(ParallelGroup, self).__init__(*args, **kwargs)
+        self.register(SlowCommand)
+        self.register(SerialCommand)
+        self.register(FailingCommand)
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+def _invoke(recorder, args, parties):
+    recorder.barrier = threading.Barrier(parties)
+    group = ParallelGroup('parallel', app=recorder)
+    return group.invoke(args.split(' '))
+
+
+def test_parallel_results_in_order(recorder):
+    rv = _invoke(recorder, 'slow a slow b slow c', parties=3)
+
+    assert [subrv for _, subrv in rv] == ['a', 'b', 'c']
+    assert [cmd.name for cmd, _ in rv] == ['slow'] * 3
+    assert recorder.max_running == 3
+
+
+def test_serial_command_is_barrier(recorder):
+    rv = _invoke(recorder, 'slow a slow b serial slow c slow d', parties=2)
+
+    assert [subrv for _, subrv in rv] == ['a', 'b', 'serial', 'c', 'd']
+    serial_start = recorder.events.index(('start', 'serial'))
+    assert set(recorder.events[:serial_start]) == set([
+        ('start', 'a'), ('start', 'b'), ('end', 'a'), ('end', 'b')])
+    assert recorder.events[serial_start + 1] == ('end', 'serial')
+
+
+def test_error_propagates(recorder):
+    with pytest.raises(ValueError):
+        _invoke(recorder, 'fail slow a', parties=1)
+
+
+def test_missing_futures(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'concurrent.futures', None)
+
+    with pytest.raises(RuntimeError) as excinfo:
+        ParallelGroup('parallel').create_chain_executor()
+    assert 'futures backport' in str(excinfo.value)
+
+
+def test_shared_executor(recorder):
+    recorder.barrier = threading.Barrier(2)
+    group = ParallelGroup('parallel', app=recorder)
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+        group.chain_executor = executor
+        rv = group.invoke('slow a slow b'.split(' '))
+        assert [subrv for _, subrv in rv] == ['a', 'b']
+        assert executor.submit(lambda: 'still running').result() == 'still running'
+
+
+class ProcessCommand(smclip.ChainedCommand):
+    default_name = 'process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('value')
+
+    def this_action(self, value):
+        return os.getpid(), self.name, self.alias, value, self.parent
+
+
+class RowsCommand(smclip.ChainedCommand):
+    default_name = 'rows'
+
+    def this_action(self):
+        for row in range(3):
+            yield row
+
+
+class ProcessGroup(smclip.ChainedCommandGroup):
+    chain_workers = 2
+
+    def __init__(self, *args, **kwargs):
+        super(ProcessGroup, self).__init__(*args, **kwargs)
+        self.register(ProcessCommand, aliases=['proc'])
+        self.register(RowsCommand)
+
+
+def test_process_pool():
+    group = ProcessGroup('processes')
+    group.chain_executor_cls = futures.ProcessPoolExecutor
+    rv = group.invoke('process a proc b rows'.split(' '))
+
+    results = [subrv for _, subrv in rv]
+    assert [result[1:] for result in results[:2]] == [('process', 'process', 'a', None),
+                                                     ('process', 'proc', 'b', None)]
+    assert all(result[0] != os.getpid() for result in results[:2])
+    assert results[2] == [0, 1, 2]
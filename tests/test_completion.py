@@ -0,0 +1,70 @@
+import pytest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import smclip
+from smclip.completion import CompletionResolver
+
+from integration_classes import *
+from integration_classes import _split_cmd_args
+from test_possible_commands import POSSIBLE_COMMANDS, BAD_ARGUMENTS
+
+
+@pytest.fixture
+def resolver(myapp):
+    return CompletionResolver(myapp)
+
+
+@pytest.mark.parametrize('cmdargs,current_command_name,subcommand_names', POSSIBLE_COMMANDS)
+def test_possible_commands(resolver, cmdargs, current_command_name, subcommand_names):
+    cmd_names = resolver.possible_command_names(_split_cmd_args(cmdargs))
+
+    assert cmd_names is not None
+    assert set(cmd_names) == set(subcommand_names)
+
+
+@pytest.mark.parametrize('cmdargs', BAD_ARGUMENTS)
+def test_bad_arguments_for_command_names(resolver, cmdargs):
+    assert resolver.possible_command_names(_split_cmd_args(cmdargs)) is None
+
+
+def test_final_commands_not_instantiated(resolver):
+    with mock.patch.object(smclip.Command, '__init__', autospec=True,
+                           side_effect=smclip.Command.__init__) as init:
+        assert resolver.possible_command_names(['group', 'create']) == []
+        assert resolver.possible_command_names(['listdefault', '1', 'change']) == ['change', 'move']
+
+    created = set(call[0][0].__class__ for call in init.call_args_list)
+    assert created == set([ItemGroupCommand, ItemGroupCommandDefault, ViewEditCommand])
+
+
+def test_cached_prefix(resolver):
+    resolver.possible_command_names(['listdefault', '1234'])
+
+    with mock.patch.object(ItemGroupCommandDefault, 'create_parser') as create_parser:
+        with mock.patch.object(ItemGroupCommandDefault, '__init__') as init:
+            names = resolver.possible_command_names(['listdefault', '1234', 'change'])
+
+    assert names == ['change', 'move']
+    assert init.call_count == 0
+    assert create_parser.call_count == 0
+
+
+def test_cache_bounded(myapp):
+    resolver = CompletionResolver(myapp, max_states=2)
+
+    for i in range(5):
+        resolver.possible_command_names(['listdefault', str(i)])
+
+    assert len(resolver._states) <= 2
+
+
+def test_parser_not_replaced(myapp):
+    parser = myapp.parser
+    myapp.commands_for_args(['group'])
+    myapp.possible_command_names(['group'])
+
+    assert myapp.parser is parser
@@ -0,0 +1,225 @@
+import contextlib
+import sys
+import time
+
+import pytest
+import smclip
+from smclip.context import InvocationContext
+
+from integration_classes import _split_cmd_args
+
+
+class Show(smclip.Command):
+    pass_context = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('item')
+        parser.add_argument('--delay', type=float, default=0)
+
+    def preprocess(self, context, item, delay):
+        time.sleep(delay)
+        return {'item': item.upper()}
+
+    def this_action(self, context, item):
+        time.sleep(0)
+        return context.path, context.args, item
+
+
+class List(smclip.Command):
+    pass_context = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', default='all')
+
+    def this_action(self, context, state):
+        return context.path, state
+
+
+class Step(smclip.ChainedCommand):
+    pass_context = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('value')
+
+    def this_action(self, context, value):
+        time.sleep(0)
+        return context.command.name, value, context.upstream
+
+
+class Chain(smclip.ChainedCommandGroup):
+    pass_context = True
+
+    def __init__(self, *args, **kwargs):
+        super(Chain, self).__init__(*args, **kwargs)
+        self.register(Step, name='step')
+
+
+class Item(smclip.CommandGroup):
+    pass_context = True
+
+    def __init__(self, *args, **kwargs):
+        super(Item, self).__init__(*args, **kwargs)
+        self.register(Show, name='show')
+        self.register(List, name='list', is_default=True)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project')
+
+    def preprocess(self, context, project):
+        assert context.invoked_subcommand.parent is self
+
+
+class App(smclip.CommandGroup):
+    pass_context = True
+
+    def __init__(self):
+        super(App, self).__init__('app')
+        self.register(Item, name='item')
+        self.register(Chain, name='chain')
+
+    def results_callback(self, context, rv):
+        if context.obj is not None:
+            context.obj['subcommand'] = context.invoked_subcommand.name
+
+
+def test_context():
+    root = InvocationContext(App(), obj={})
+    item = root.child(Item('item'))
+    show = item.child(Show('show'))
+
+    assert root.children == [item]
+    assert show.path == ('app', 'item', 'show')
+    assert show.root is root
+    assert show.obj is root.obj
+    assert repr(show) == '<InvocationContext app item show>'
+
+
+def test_pass_context():
+    app = App()
+    context = InvocationContext(app, obj={})
+    rv = app.invoke(_split_cmd_args('item --project P show abc'), context)
+
+    assert rv == (('app', 'item', 'show'), {'item': 'abc', 'delay': 0}, 'ABC')
+    assert context.obj == {'subcommand': 'item'}
+    item_context, = context.children
+    assert context.invoked_subcommand is item_context.command
+    assert item_context.args == {'project': 'P'}
+    assert item_context.invoked_subcommand is item_context.children[0].command
+
+
+def test_default_context():
+    assert App().invoke(_split_cmd_args('item --state open')) == (('app', 'item', 'list'), 'open')
+
+
+def test_chain_context():
+    app = App()
+    context = InvocationContext(app)
+    rv = app.invoke(_split_cmd_args('chain step a step b'), context)
+
+    assert [subrv for _, subrv in rv] == [('step', 'a', None), ('step', 'b', None)]
+    chain_context, = context.children
+    assert [child.command for child in chain_context.children] == \
+        chain_context.invoked_subcommands
+
+
+def test_pipeline_context():
+    class Stage(Step):
+
+        def this_action(self, context, value):
+            assert context.upstream is self.upstream
+            return [value] + list(context.upstream)
+
+    class Pipeline(smclip.ChainedCommandGroup):
+        pipeline = True
+
+        def __init__(self, *args, **kwargs):
+            super(Pipeline, self).__init__(*args, **kwargs)
+            self.register(Stage, name='stage')
+
+    rv = Pipeline('pipeline').invoke(_split_cmd_args('stage a stage b stage c'))
+    assert list(rv) == ['c', 'b', 'a']
+
+
+def test_compatibility_attributes(myapp):
+    myapp.invoke(_split_cmd_args('group create'))
+    assert myapp.invoked_subcommand.name == 'group'
+
+
+def _expected(index):
+    kind = index % 3
+    if kind == 0:
+        item = 'item{}'.format(index)
+        args = 'item --project P{} show {} --delay 0.001'.format(index, item)
+        expected = (('app', 'item', 'show'), {'item': item, 'delay': 0.001}, item.upper())
+    elif kind == 1:
+        args = 'item --state s{}'.format(index)
+        expected = (('app', 'item', 'list'), 's{}'.format(index))
+    else:
+        args = 'chain step {0} step x{0}'.format(index)
+        expected = [('step', str(index), None), ('step', 'x{}'.format(index), None)]
+    return _split_cmd_args(args), expected
+
+
+def _subcommand(index):
+    return {0: 'item', 1: 'item', 2: 'chain'}[index % 3]
+
+
+@contextlib.contextmanager
+def _switch_often():
+    if not hasattr(sys, 'setswitchinterval'):
+        yield
+        return
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        yield
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_concurrent_invoke():
+    futures = pytest.importorskip('concurrent.futures')
+
+    app = App()
+
+    def invoke(index):
+        context = InvocationContext(app, obj={})
+        rv = app.invoke(_expected(index)[0], context)
+        if isinstance(rv, smclip.ChainedOutputResults):
+            rv = [subrv for _, subrv in rv]
+        return rv, context.obj
+
+    with _switch_often(), futures.ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(invoke, range(600)))
+
+    for index, (rv, obj) in enumerate(results):
+        assert rv == _expected(index)[1]
+        assert obj == {'subcommand': _subcommand(index)}
+
+
+def test_concurrent_chained_root():
+    futures = pytest.importorskip('concurrent.futures')
+
+    chain = Chain('chain')
+    steps = []
+    for index in range(20):
+        steps.extend(['step', str(index)])
+
+    def invoke(index):
+        context = InvocationContext(chain)
+        rv = chain.invoke(list(steps) if index % 2 else [], context)
+        if rv is not None:
+            rv = [subrv for _, subrv in rv]
+        return rv, context.invoked_subcommands
+
+    with _switch_often(), futures.ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(invoke, range(400)))
+
+    expected = [('step', str(index), None) for index in range(20)]
+    for index, (rv, invoked) in enumerate(results):
+        if index % 2:
+            assert rv == expected
+            assert [command.name for command in invoked] == ['step'] * 20
+        else:
+            assert rv is None
+            assert not invoked
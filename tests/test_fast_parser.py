@@ -0,0 +1,141 @@
+import argparse
+
+import pytest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+from smclip.parsers import FastArgparserSub, FastArgumentParser
+
+from integration_classes import *
+from integration_classes import _split_cmd_args
+from test_possible_commands import BAD_ARGUMENTS, POSSIBLE_COMMANDS
+
+
+def _add_arguments(parser):
+    parser.add_argument('-v', '--verbose', action='count', default=0)
+    parser.add_argument('-q', '--quiet', action='store_true')
+    parser.add_argument('--no-color', dest='color', action='store_false')
+    parser.add_argument('--state', choices=['open', 'closed'])
+    parser.add_argument('--tag', action='append')
+    parser.add_argument('--limit', type=int, default='10')
+    parser.add_argument('--mode', action='store_const', const='fast')
+    parser.add_argument('item')
+
+
+def _parsers(remainder=False):
+    parsers = []
+    for parser_cls in (argparse.ArgumentParser, FastArgumentParser):
+        parser = parser_cls(prog='prog')
+        _add_arguments(parser)
+        if remainder:
+            parser.add_argument('rest', nargs=argparse.REMAINDER)
+        parsers.append(parser)
+    return parsers
+
+
+def _outcome(parser, args, capsys):
+    try:
+        rv = parser.parse_known_args(args)
+        rv = vars(rv[0]), rv[1]
+    except SystemExit as e:
+        rv = 'exit', e.code
+    return rv, capsys.readouterr()
+
+
+COMMON_ARGS = [
+    '',
+    'x',
+    'x y z',
+    '-v x -vv --verbose',
+    'x -q --no-color',
+    '--state open x',
+    '--tag a --tag b x --tag c',
+    '--limit 5 x',
+    '--mode x',
+    'x -',
+    '-- x',
+]
+
+FALLBACK_ARGS = [
+    '--state=open x',
+    '--stat open x',
+    '-vvq x',
+    '--limit -5 x',
+    '--state invalid x',
+    '--limit five x',
+    '--state',
+    '--unknown x',
+    '--unknown value x',
+    '-h',
+    'x -1',
+]
+
+
+@pytest.mark.parametrize('remainder', [False, True])
+@pytest.mark.parametrize('cmdargs', COMMON_ARGS + FALLBACK_ARGS + [
+    'x rest --state open',
+    'x --state open rest --tag a',
+    'x -- rest',
+    'x rest -- --state open',
+    'x --state open -- rest --',
+])
+def test_same_as_argparse(cmdargs, remainder, capsys):
+    parser, fast_parser = _parsers(remainder)
+    args = _split_cmd_args(cmdargs)
+
+    assert _outcome(fast_parser, args, capsys) == _outcome(parser, args, capsys)
+
+
+@pytest.mark.parametrize('cmdargs', [args for args in COMMON_ARGS if args not in ('', '-- x')])
+def test_fast_path(cmdargs):
+    _, fast_parser = _parsers(remainder=True)
+
+    with mock.patch.object(argparse.ArgumentParser, '_parse_known_args') as parse_known_args:
+        fast_parser.parse_known_args(_split_cmd_args(cmdargs))
+    assert parse_known_args.call_count == 0
+
+
+def test_arguments_added_later():
+    _, fast_parser = _parsers()
+    assert fast_parser.parse_args(['x']).item == 'x'
+
+    fast_parser.add_argument('--late')
+    assert fast_parser.parse_args(['--late', 'value', 'x']).late == 'value'
+
+
+def test_unsupported_parser():
+    parser = FastArgumentParser()
+    parser.add_argument('values', nargs='+')
+
+    with mock.patch.object(argparse.ArgumentParser, '_parse_known_args', autospec=True,
+                           side_effect=argparse.ArgumentParser._parse_known_args) \
+            as parse_known_args:
+        assert parser.parse_args(['a', 'b']).values == ['a', 'b']
+    assert parse_known_args.call_count == 1
+
+
+class FastApplication(MyApplication):
+    default_parser_cls = 'smclip.parsers:FastArgparserSub'
+
+
+@pytest.mark.parametrize('cmdargs', [args for args, _, _ in POSSIBLE_COMMANDS] + BAD_ARGUMENTS + [
+    'listdefault 1234 change move here',
+    'listdefault --unkarg',
+    'group --groupopt G create --createopt S',
+    'group -h',
+])
+def test_application(cmdargs, capsys):
+    def outcome(app):
+        try:
+            app.invoke(_split_cmd_args(cmdargs))
+            rv = [call for call in app.preprocess.call_args_list]
+        except SystemExit as e:
+            rv = e.code
+        return rv, capsys.readouterr()
+
+    fast_app = FastApplication()
+    assert outcome(fast_app) == outcome(MyApplication())
+    assert isinstance(fast_app.parser, FastArgparserSub)
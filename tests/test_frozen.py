@@ -0,0 +1,216 @@
+import pytest
+import smclip
+from smclip.context import InvocationContext
+
+from integration_classes import *
+from integration_classes import _split_cmd_args
+
+
+def _trace(context):
+    """Return paths and parsed arguments of an invocation context tree"""
+    trace = [(context.path, context.args)]
+    for child in context.children:
+        trace.extend(_trace(child))
+    return trace
+
+
+def _invoke(app, cmdargs, capsys):
+    context = InvocationContext(app)
+    code = None
+    try:
+        app.invoke(_split_cmd_args(cmdargs), context)
+    except SystemExit as e:
+        code = e.code
+    out, err = capsys.readouterr()
+    return code, _trace(context), out, err
+
+
+@pytest.mark.parametrize('cmdargs', [
+    '',
+    '--appopt A',
+    'help',
+    '--appopt A docs --helpopt H',
+    '--appopt=A help',
+    'group',
+    'task --groupopt G',
+    '--appopt A group --groupopt G list --listopt L',
+    'task --groupopt=G table',
+    'group new --createopt C',
+    'group create --help',
+    'group --help',
+    'group ID --vieweditopt V change move here',
+    'listdefault',
+    'listdefault --listopt L',
+    'listdefault --groupopt G create',
+    'listdefault 42 edit',
+    'group unknown',
+    'group --badopt list',
+    'group --groupopt',
+    'group --groupopt -- list',
+    'gro list',
+    'empty',
+    'override --toreplace R',
+])
+def test_same_as_unfrozen(capsys, cmdargs):
+    expected = _invoke(MyApplication(), cmdargs, capsys)
+
+    app = MyApplication()
+    app.freeze()
+    assert _invoke(app, cmdargs, capsys) == expected
+    # repeated invocation of the same instance
+    assert _invoke(app, cmdargs, capsys) == expected
+
+
+def test_callbacks(myapp):
+    myapp.freeze()
+    myapp.invoke(_split_cmd_args('--appopt A task --groupopt G table --listopt L'))
+
+    myapp.preprocess.assert_called_once_with(appopt='A')
+    group = myapp.invoked_subcommand
+    assert isinstance(group, ItemGroupCommand)
+    assert (group.name, group.alias, group.parent) == ('group', 'task', myapp)
+    group.preprocess.assert_called_once_with(groupopt='G')
+    assert group.results_callback.call_count == 1
+
+    listcmd = group.invoked_subcommand
+    assert (listcmd.name, listcmd.alias, listcmd.parent) == ('list', 'table', group)
+    listcmd.this_action.assert_called_once_with(listopt='L')
+
+
+def test_defaults_without_parser(myapp):
+    myapp.freeze()
+    myapp.invoke(_split_cmd_args('group list'))
+
+    group = myapp.invoked_subcommand
+    group.preprocess.assert_called_once_with(groupopt=None)
+    assert group._parser is None
+
+
+def test_paths(myapp):
+    table = myapp.freeze()
+    assert myapp.freeze() is table
+    assert myapp.frozen
+
+    assert table.paths[('task', 'table')] is table.paths[('group', 'list')]
+    assert table.paths[('group', 'list')].command_cls is ListCommand
+    assert table.paths[('docs',)].name == 'help'
+    # chained groups are not split
+    assert ('group', 'ID', 'change') not in table.paths
+    assert table.paths[('group', 'ID')].options is None
+    assert table.root.options['--appopt'] == 1
+    assert table.root.options['--help'] == 0
+
+
+@pytest.mark.parametrize('cmdargs,slices,target_start', [
+    ('help', [[]], 1),
+    ('--appopt A group --groupopt G list --listopt L', [['--appopt', 'A'], ['--groupopt', 'G']], 6),
+    ('--appopt=A task table', [['--appopt=A'], []], 3),
+    ('group unknown list', [[]], 1),
+    ('group --unknown list', [[]], 1),
+    ('group --groupopt -x list', [[]], 1),
+    ('--appopt', [], 0),
+    ('gro list', [], 0),
+    ('-- group list', [], 0),
+])
+def test_route(myapp, cmdargs, slices, target_start):
+    args = _split_cmd_args(cmdargs)
+    steps, start = myapp.freeze().route(args)
+
+    assert [args[step_start:end] for _, step_start, end, _ in steps] == slices
+    assert start == target_start
+
+
+def test_register_after_freeze(myapp):
+    myapp.freeze()
+
+    with pytest.raises(RuntimeError):
+        myapp.register(CreateCommand, name='new-create')
+    assert 'new-create' not in myapp.subcmds_cls
+
+
+def test_not_frozen(myapp):
+    assert not myapp.frozen
+    myapp.register(CreateCommand, name='new-create')
+
+
+class Positional(smclip.CommandGroup):
+
+    def __init__(self, *args, **kwargs):
+        super(Positional, self).__init__(*args, **kwargs)
+        self.register(ListCommand)
+
+    def add_arguments(self, parser):
+        parser.add_argument('item')
+
+
+class Recursive(smclip.CommandGroup):
+
+    def __init__(self, *args, **kwargs):
+        super(Recursive, self).__init__(*args, **kwargs)
+        self.register(Recursive, name='again')
+        self.register(Positional, name='positional')
+
+
+def test_not_split():
+    app = Recursive('app')
+    table = app.freeze()
+
+    assert sorted(table.paths) == [('again',), ('positional',)]
+    assert table.paths[('again',)].options is None
+    assert table.paths[('positional',)].options is None
+
+    app.invoke(_split_cmd_args('again again positional X list'))
+    command = app
+    for name in ('again', 'again', 'positional', 'list'):
+        command = command.invoked_subcommand
+        assert command.name == name
+
+
+class Dispatching(smclip.CommandGroup):
+
+    def __init__(self, *args, **kwargs):
+        super(Dispatching, self).__init__(*args, **kwargs)
+        self.register(ListCommand)
+        self.dispatched = mock.Mock()
+
+    def parse_and_get_command(self, raw_args, namespace, unknown_args):
+        self.dispatched(raw_args)
+        return super(Dispatching, self).parse_and_get_command(raw_args, namespace, unknown_args)
+
+
+class Conditional(smclip.CommandGroup):
+    use_create = False
+
+    def __init__(self, *args, **kwargs):
+        super(Conditional, self).__init__(*args, **kwargs)
+        self.register(CreateCommand if self.use_create else ListCommand, name='list')
+
+
+class DispatchApp(smclip.CommandGroup):
+
+    def __init__(self, *args, **kwargs):
+        super(DispatchApp, self).__init__(*args, **kwargs)
+        self.register(Dispatching, name='dispatching')
+        self.register(Conditional, name='conditional')
+
+
+def test_overridden_dispatch():
+    app = DispatchApp('app')
+    table = app.freeze()
+    assert table.paths[('dispatching',)].options is None
+    assert ('dispatching', 'list') not in table.paths
+
+    app.invoke(_split_cmd_args('dispatching list'))
+    app.invoked_subcommand.dispatched.assert_called_once_with(['list'])
+
+
+def test_stale_subgroup(monkeypatch):
+    app = DispatchApp('app')
+    app.freeze()
+    assert app.freeze().paths[('conditional', 'list')].command_cls is ListCommand
+
+    monkeypatch.setattr(Conditional, 'use_create', True)
+    app.invoke(_split_cmd_args('conditional list --createopt C'))
+    command = app.invoked_subcommand.invoked_subcommand
+    assert isinstance(command, CreateCommand)
+    command.this_action.assert_called_once_with(createopt='C')
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# seconds, cumulative import time of smclip package
+IMPORT_TIME_BUDGET = float(os.environ.get('SMCLIP_IMPORT_TIME_BUDGET', '0.025'))
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def _python(*args, **env_overrides):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT, env.get('PYTHONPATH', '')])
+    env.update(env_overrides)
+    # subprocess.run is not available on all supported interpreters
+    process = subprocess.Popen([sys.executable] + list(args), env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    stdout, stderr = process.communicate()
+    assert process.returncode == 0, stderr
+    return stdout, stderr
+
+
+def _loaded_modules(code):
+    code = ('import sys\n' + code + '\n'
+            'print("\\n".join(sys.modules))')
+    return set(_python('-c', code)[0].splitlines())
+
+
+def test_import_defers_argparse():
+    modules = _loaded_modules('import smclip\n'
+                              'class App(smclip.CommandGroup):\n'
+                              '    pass\n'
+                              'App()')
+
+    assert not modules & {'argparse', 're', 'inspect', 'smclip.parsers'}
+
+
+def test_parser_imports_argparse():
+    modules = _loaded_modules('import smclip\n'
+                              'smclip.CommandGroup("app").parser')
+
+    assert {'argparse', 'smclip.parsers'} <= modules
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason='requires -X importtime and pycache prefix')
+def test_import_time_budget(tmp_path):
+    # measure imports from bytecode, as of an installed package,
+    # without writing it to the source tree
+    env = {'PYTHONDONTWRITEBYTECODE': '', 'PYTHONPYCACHEPREFIX': str(tmp_path)}
+    _python('-c', 'import smclip', **env)
+
+    def import_time():
+        _, stderr = _python('-X', 'importtime', '-c', 'import smclip', **env)
+        for line in stderr.splitlines():
+            fields = [field.strip() for field in line.split('|')]
+            if fields[-1] == 'smclip':
+                return int(fields[1]) / 1e6
+        raise AssertionError('smclip import time not found')
+
+    best = min(import_time() for _ in range(3))
+    assert best < IMPORT_TIME_BUDGET
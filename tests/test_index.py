@@ -0,0 +1,66 @@
+import pytest
+
+from smclip import CommandNotFound
+from smclip.index import SimilarityIndex, edit_distance
+
+from integration_classes import _split_cmd_args
+
+
+def test_similar():
+    index = SimilarityIndex()
+    for name in ('list', 'create', 'delete', 'lists', 'move', 'remove'):
+        index.add(name)
+
+    assert index.similar('lsit') == ['list']
+    assert index.similar('lsit', max_distance=2) == ['list', 'lists']
+    assert index.similar('delte') == ['delete']
+    assert index.similar('rmove') == ['move', 'remove']
+    assert index.similar('xyz') == []
+    assert index.similar('list') == ['lists']
+    assert index.similar('remov', limit=1) == ['remove']
+    assert 'list' in index
+    assert len(index) == 6
+
+
+@pytest.mark.parametrize('first,second,distance', [
+    ('', '', 0),
+    ('list', '', 4),
+    ('list', 'list', 0),
+    ('list', 'lsit', 1),
+    ('list', 'lost', 1),
+    ('list', 'lis', 1),
+    ('change', 'chnage', 1),
+    ('create', 'delete', 4),
+])
+def test_edit_distance(first, second, distance):
+    assert edit_distance(first, second) == distance
+    assert edit_distance(second, first) == distance
+
+
+@pytest.mark.parametrize('suggestions,message', [
+    ((), "unknown command `x'"),
+    (('y',), "unknown command `x', did you mean `y'?"),
+    (('y', 'z'), "unknown command `x', did you mean one of `y', `z'?"),
+])
+def test_message(suggestions, message):
+    assert str(CommandNotFound('x', suggestions=suggestions)) == message
+
+
+@pytest.mark.parametrize('cmdargs,suggestion', [
+    ('gruop', "did you mean `group'?"),
+    ('dosc', "did you mean `docs'?"),
+    ('listdefault 1234 chnage', "did you mean `change'?"),
+])
+def test_error(myapp, capsys, cmdargs, suggestion):
+    with pytest.raises(SystemExit) as excinfo:
+        myapp.invoke(_split_cmd_args(cmdargs))
+
+    assert excinfo.value.code == 2
+    assert suggestion in capsys.readouterr().err
+
+
+def test_suggestions_attached(myapp):
+    with pytest.raises(CommandNotFound) as excinfo:
+        myapp.parse_and_get_command(['grop'], *myapp.parser.parse_known_args(['grop']))
+
+    assert excinfo.value.suggestions == ['group']
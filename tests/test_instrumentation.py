@@ -0,0 +1,111 @@
+import pytest
+
+from smclip import CommandUnrecognizedArgs, instrumentation
+from smclip.instrumentation import Hook, TimingHook
+
+from integration_classes import _split_cmd_args
+
+
+class RecordingHook(Hook):
+
+    def __init__(self):
+        self.events = []
+
+    def phase_start(self, event):
+        self.events.append(('start', event.phase, event.path, event.alias))
+
+    def phase_end(self, event):
+        assert event.duration >= 0
+        self.events.append(('end', event.phase, event.path, event.alias))
+
+
+@pytest.fixture
+def hook():
+    hook = RecordingHook()
+    instrumentation.add_hook(hook)
+    yield hook
+    instrumentation.remove_hook(hook)
+
+
+def _phases(hook):
+    return [(phase, path, alias) for kind, phase, path, alias in hook.events if kind == 'end']
+
+
+def test_group_phases(myapp, hook):
+    myapp.invoke(_split_cmd_args('task new'))
+
+    app, group = ('myapp',), ('myapp', 'group')
+    assert _phases(hook) == [
+        ('create_parser', app, None),
+        ('parse_args', app, None),
+        ('new_subcommand', app, None),
+        ('parse_and_get_command', app, None),
+        ('preprocess', app, None),
+        ('create_parser', group, 'task'),
+        ('parse_args', group, 'task'),
+        ('new_subcommand', group, 'task'),
+        ('parse_and_get_command', group, 'task'),
+        ('preprocess', group, 'task'),
+        ('create_parser', group + ('create',), 'new'),
+        ('parse_args', group + ('create',), 'new'),
+        ('preprocess', group + ('create',), 'new'),
+        ('this_action', group + ('create',), 'new'),
+        ('results_callback', group, 'task'),
+        ('results_callback', app, None),
+    ]
+    assert hook.events[4] == ('start', 'parse_and_get_command', app, None)
+
+
+def test_chained_phases(myapp, hook):
+    myapp.invoke(_split_cmd_args('listdefault 1234 change move here'))
+
+    chained = ('myapp', 'listdefault', 'ID')
+    phases = [(phase, path) for phase, path, _ in _phases(hook) if path[:3] == chained]
+    assert phases == [
+        ('create_parser', chained),
+        ('parse_args', chained),
+        ('new_subcommand', chained),
+        ('create_parser', chained + ('change',)),
+        ('new_subcommand', chained),
+        ('create_parser', chained + ('move',)),
+        ('parse_and_get_chain', chained),
+        ('preprocess', chained),
+        ('preprocess', chained + ('change',)),
+        ('this_action', chained + ('change',)),
+        ('preprocess', chained + ('move',)),
+        ('this_action', chained + ('move',)),
+        ('results_callback', chained),
+    ]
+
+
+def test_error_phase(myapp):
+    errors = []
+
+    class ErrorHook(Hook):
+        def phase_end(self, event):
+            errors.append((event.phase, type(event.error)))
+
+    hook = ErrorHook()
+    instrumentation.add_hook(hook)
+    try:
+        with pytest.raises(SystemExit):
+            myapp.invoke(_split_cmd_args('--badopt value'))
+    finally:
+        instrumentation.remove_hook(hook)
+
+    assert errors[-1] == ('parse_and_get_command', CommandUnrecognizedArgs)
+
+
+def test_timing_hook(myapp):
+    with TimingHook() as timing:
+        myapp.invoke(_split_cmd_args('help'))
+        myapp.invoke(_split_cmd_args('help'))
+
+    assert not instrumentation.hooks
+    count, total = timing.timings[(('myapp', 'help'), 'this_action')]
+    assert count == 2
+    assert total >= 0
+
+
+def test_no_hooks(myapp):
+    assert instrumentation.phase('parse_args', myapp) is instrumentation.phase('preprocess', myapp)
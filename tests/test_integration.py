@@ -126,6 +126,19 @@ class TestCommandGroup:
         defaultgrpcmd.preprocess.assert_called_once_with(listopt=x_sub_opt)
         defaultgrpcmd.this_action.assert_called_once_with(listopt=x_sub_opt)
 
+    @pytest.mark.parametrize('cmdargs', [
+        'listdefault',
+        'listdefault --listopt value',
+    ])
+    def test_group_default_single_instance(self, myapp, cmdargs):
+        new_subcommand = smclip.CommandGroup.new_subcommand
+        with mock.patch.object(smclip.CommandGroup, 'new_subcommand', autospec=True,
+                               side_effect=new_subcommand) as mocked:
+            myapp.invoke(_split_cmd_args(cmdargs))
+
+        created = [call[0][1] for call in mocked.call_args_list]
+        assert created == [ItemGroupCommandDefault, ListCommand]
+
     @pytest.mark.parametrize('cmdargs,x_app_opt,x_grp_opt,x_sub_opt', [
         ('group create',
             None, None, None),
@@ -0,0 +1,112 @@
+import sys
+import textwrap
+
+import pytest
+import smclip
+
+from integration_classes import _split_cmd_args
+
+
+@pytest.fixture
+def lazymodule(tmp_path, monkeypatch):
+    """Create importable module with commands and forget it afterwards"""
+    module_name = 'smclip_lazy_commands'
+    source = textwrap.dedent('''
+        import smclip
+
+        class TaskGroup(smclip.CommandGroup):
+            """Real title of tasks"""
+
+            def __init__(self, *args, **kwargs):
+                super(TaskGroup, self).__init__(*args, **kwargs)
+                self.register(ListCommand)
+
+        class ListCommand(smclip.Command):
+            default_name = 'list'
+
+            def add_arguments(self, parser):
+                parser.add_argument('--listopt')
+
+            def this_action(self, **args):
+                return 'listed', args
+
+        class Change(smclip.ChainedCommand):
+            default_name = 'change'
+
+            def this_action(self, **args):
+                return 'changed'
+    ''')
+    tmp_path.joinpath(module_name + '.py').write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield module_name
+    sys.modules.pop(module_name, None)
+
+
+class LazyApp(smclip.CommandGroup):
+
+    def __init__(self, module_name):
+        super(LazyApp, self).__init__()
+        self.name = 'lazyapp'
+        self.register(module_name + ':TaskGroup', name='task', aliases=['t'],
+                      title='Manage tasks')
+        self.register(module_name + ':ListCommand', name='ls', is_fallback=True)
+
+
+def test_register_does_not_import(lazymodule):
+    app = LazyApp(lazymodule)
+
+    assert lazymodule not in sys.modules
+    assert sorted(app.subcmds_cls) == ['ls', 'task']
+    assert app.subcmd_aliases['t'] is app.subcmds_cls['task']
+
+
+@pytest.mark.parametrize('cmdargs', ['task list --listopt val', 't list --listopt val'])
+def test_invoke_imports_on_resolve(lazymodule, cmdargs):
+    app = LazyApp(lazymodule)
+
+    rv = app.invoke(_split_cmd_args(cmdargs))
+
+    assert lazymodule in sys.modules
+    assert rv == ('listed', {'listopt': 'val'})
+    assert app.invoked_subcommand.name == 'task'
+    assert app.invoked_subcommand.__class__.__name__ == 'TaskGroup'
+
+
+def test_lazy_fallback(lazymodule):
+    app = LazyApp(lazymodule)
+
+    rv = app.invoke(_split_cmd_args('anything --listopt val'))
+
+    assert rv == ('listed', {'listopt': 'val'})
+    assert app.invoked_subcommand.name == 'ls'
+    assert app.invoked_subcommand.alias == 'anything'
+
+
+def test_help_uses_given_title(lazymodule):
+    app = LazyApp(lazymodule)
+
+    formatted_help = app.parser.format_help()
+
+    assert 'Manage tasks' in formatted_help
+    assert lazymodule not in sys.modules
+
+
+def test_lazy_requires_name(lazymodule):
+    app = smclip.CommandGroup()
+
+    with pytest.raises(RuntimeError) as excinfo:
+        app.register(lazymodule + ':ListCommand')
+
+    assert 'No name' in str(excinfo.value)
+
+
+def test_lazy_chained(lazymodule):
+    group = smclip.ChainedCommandGroup('chained')
+    group.register(lazymodule + ':Change', name='change')
+    group.register(lazymodule + ':ListCommand', name='list')
+
+    rv = group.invoke(['change'])
+    assert [subrv for _, subrv in rv] == ['changed']
+
+    with pytest.raises(AssertionError):
+        group.invoke(['list'])
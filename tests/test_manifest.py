@@ -0,0 +1,168 @@
+import os
+
+import integration_classes
+import pytest
+import smclip
+from smclip.manifest import load_manifest, write_manifest, ManifestMiss
+
+from integration_classes import *
+from integration_classes import _split_cmd_args
+from test_possible_commands import POSSIBLE_COMMANDS, BAD_ARGUMENTS
+
+
+@pytest.fixture
+def manifest_file(myapp, tmp_path):
+    filename = str(tmp_path.joinpath('commands.manifest'))
+    write_manifest(myapp, filename, package_version='1.0')
+    return filename
+
+
+@pytest.fixture
+def manifest(manifest_file):
+    return load_manifest(manifest_file, package_version='1.0')
+
+
+@pytest.mark.parametrize('cmdargs,current_command_name,subcommand_names', POSSIBLE_COMMANDS)
+def test_possible_commands(manifest, cmdargs, current_command_name, subcommand_names):
+    cmd_names = manifest.possible_command_names(_split_cmd_args(cmdargs))
+
+    assert cmd_names is not None
+    assert set(cmd_names) == set(subcommand_names)
+
+
+@pytest.mark.parametrize('cmdargs', BAD_ARGUMENTS)
+def test_bad_arguments_for_command_names(manifest, cmdargs):
+    assert manifest.possible_command_names(_split_cmd_args(cmdargs)) is None
+
+
+@pytest.mark.parametrize('cmdargs,x_path', [
+    ('--help', []),
+    ('--appopt A -h', []),
+    ('listdefault --unkarg -h', ['listdefault']),
+    ('task -h', ['group']),
+    ('listdefault --groupopt G new --help', ['listdefault', 'create']),
+    ('listdefault 1234 change --help', ['listdefault', 'ID', 'change']),
+])
+def test_help(myapp, manifest, cmdargs, x_path):
+    command = myapp
+    for name in x_path:
+        subcmd = command.new_subcommand(command.subcmds_cls[name], name)
+        subcmd.parent = command
+        command = subcmd
+
+    assert manifest.format_help(_split_cmd_args(cmdargs)) == command.parser.format_help()
+
+
+@pytest.mark.parametrize('cmdargs', ['group', 'group list --listopt'])
+def test_no_help(manifest, cmdargs):
+    assert manifest.format_help(_split_cmd_args(cmdargs)) is None
+
+
+@pytest.mark.parametrize('cmdargs', ['help --helpopt -h', 'help -x -h', 'group list listarg -h'])
+def test_help_miss(manifest, cmdargs):
+    with pytest.raises(ManifestMiss):
+        manifest.format_help(_split_cmd_args(cmdargs))
+
+
+def test_stale_manifest(manifest_file):
+    assert load_manifest(manifest_file, package_version='1.0')
+    assert load_manifest(manifest_file, package_version='2.0') is None
+    assert load_manifest(manifest_file + '.missing') is None
+
+    source = os.path.abspath(integration_classes.__file__)
+    stat = os.stat(source)
+    try:
+        os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+        assert load_manifest(manifest_file, package_version='1.0') is None
+    finally:
+        os.utime(source, (stat.st_atime, stat.st_mtime))
+
+
+def test_failed_write(myapp, tmp_path):
+    target = tmp_path.joinpath('commands.manifest')
+    target.mkdir()
+
+    with pytest.raises(OSError):
+        write_manifest(myapp, str(target))
+    assert [path.name for path in tmp_path.iterdir()] == ['commands.manifest']
+
+
+def test_base_class_sources(manifest):
+    assert os.path.abspath(smclip.commands.__file__) in manifest.sources
+
+
+def test_close(manifest_file):
+    with load_manifest(manifest_file, package_version='1.0') as manifest:
+        assert manifest.possible_command_names([]) == sorted(MyApplication().subcmds_cls)
+    assert manifest._data.closed
+
+
+class RecursiveGroup(smclip.CommandGroup):
+
+    def __init__(self, *args, **kwargs):
+        super(RecursiveGroup, self).__init__(*args, **kwargs)
+        self.register(RecursiveGroup, name='again')
+        self.register(ListCommand)
+
+
+def test_recursive_tree(tmp_path):
+    filename = str(tmp_path.joinpath('recursive.manifest'))
+    write_manifest(RecursiveGroup('app'), filename)
+
+    with load_manifest(filename) as manifest:
+        assert manifest.possible_command_names([]) == ['again', 'list']
+        with pytest.raises(ManifestMiss):
+            manifest.possible_command_names(['again'])
+
+
+class AbbreviatedApp(smclip.CommandGroup):
+    abbreviate_subcommands = True
+
+    def __init__(self, manifest=None):
+        super(AbbreviatedApp, self).__init__('app')
+        if manifest is None:
+            self.register(ItemGroupCommand, name='group', aliases=['task'])
+            self.register(SimpleCommand)
+        else:
+            self.use_manifest(manifest)
+
+
+@pytest.mark.parametrize('cmdargs', ['gr', 'ta', 'gr list', 'ta --groupopt G', 'help'])
+def test_abbreviated_subcommands(tmp_path, cmdargs):
+    filename = str(tmp_path.joinpath('abbreviated.manifest'))
+    write_manifest(AbbreviatedApp(), filename)
+    args = _split_cmd_args(cmdargs)
+
+    with load_manifest(filename) as manifest:
+        app = AbbreviatedApp(manifest)
+        assert app.possible_command_names(args) == AbbreviatedApp().possible_command_names(args)
+        if args[0] != 'help':
+            with pytest.raises(ManifestMiss):
+                manifest.possible_command_names(args)
+
+
+class ManifestApp(smclip.CommandGroup):
+
+    def __init__(self, manifest):
+        super(ManifestApp, self).__init__(app=self)
+        self.name = 'myapp'
+        self.use_manifest(manifest)
+
+
+def test_use_manifest(manifest, capsys):
+    app = ManifestApp(manifest)
+
+    assert sorted(app.subcmds_cls) == sorted(MyApplication().subcmds_cls)
+    assert app.subcmd_aliases['task'] is app.subcmds_cls['group']
+    assert not app.subcmds_cls['group'].is_loaded
+    assert app.possible_command_names(['group']) == ['ID', 'create', 'list']
+
+    with pytest.raises(SystemExit) as excinfo:
+        app.invoke(['--help'])
+    assert excinfo.value.code == 0
+    assert 'Print help' in capsys.readouterr().out
+    assert not app.subcmds_cls['group'].is_loaded
+
+    app.invoke(['task', 'create'])
+    assert isinstance(app.invoked_subcommand, ItemGroupCommand)
+    assert app.subcmds_cls['group'].is_loaded
@@ -1,7 +1,14 @@
 import argparse
 import pytest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
 import smclip
-from smclip.parsers import ArgparserSub, split_docstring
+from smclip.parsers import (HELP_CACHE_SIZE, ArgparserSub, GroupHelpFormatter, SubcommandsOrder,
+                            split_docstring)
 
 
 class TestArgparseSub():
@@ -40,6 +47,86 @@ class TestArgparseSub():
         assert 'subcmd_name' in formatted_help, 'Subcommand not found in help'
         assert 'Subcommand help' in formatted_help, "Subcommand's help not found in common help"
 
+    def test_subcommands_order(self):
+        order = SubcommandsOrder()
+        for name in ['beta', 'Alpha', 'gamma', 'alpha2']:
+            order.add(name)
+
+        assert list(order) == ['Alpha', 'alpha2', 'beta', 'gamma']
+
+    def test_help_cache(self):
+
+        class Group(smclip.CommandGroup):
+            """Group help"""
+
+        class First(smclip.Command):
+            """First help"""
+
+        class Second(smclip.Command):
+            """Second help"""
+
+        group = Group('group')
+        group.register(First, name='first')
+
+        with mock.patch.object(ArgparserSub, '_format_help', autospec=True,
+                               side_effect=ArgparserSub._format_help) as format_help:
+            formatted_help = group.parser.format_help()
+            assert 'First help' in formatted_help
+            assert Group('group').get_parser().format_help() != formatted_help
+            assert group.get_parser().format_help() == formatted_help
+            assert format_help.call_count == 2
+
+            group.register(Second, name='second')
+            formatted_help = group.parser.format_help()
+            assert 'Second help' in formatted_help
+            assert format_help.call_count == 3
+
+            with mock.patch.object(GroupHelpFormatter, '__init__', autospec=True,
+                                   side_effect=_narrow_formatter_init):
+                assert group.parser.format_help() != formatted_help
+                assert format_help.call_count == 4
+
+    def test_help_cache_per_registry(self):
+
+        class First(smclip.Command):
+            """First help"""
+
+        class Second(smclip.Command):
+            """Second help"""
+
+        first, second = smclip.CommandGroup('app'), smclip.CommandGroup('app')
+        first.register(First, name='x')
+        second.register(Second, name='x')
+
+        assert 'First help' in first.parser.format_help()
+        assert 'Second help' in second.parser.format_help()
+
+    def test_help_cache_arguments(self):
+
+        class Group(smclip.CommandGroup):
+            """Group help"""
+
+            def __init__(self, debug=False):
+                super(Group, self).__init__('group')
+                self.debug = debug
+
+            def add_arguments(self, parser):
+                if self.debug:
+                    parser.add_argument('--debug', action='store_true')
+
+        assert '--debug' not in Group().parser.format_help()
+        assert '--debug' in Group(debug=True).parser.format_help()
+
+    def test_help_cache_size(self):
+        group = smclip.CommandGroup('group')
+        for index in range(HELP_CACHE_SIZE * 2):
+            group.get_parser(prog='prog{}'.format(index)).format_help()
+            assert len(group._registry.help_cache) <= HELP_CACHE_SIZE
+
+
+def _narrow_formatter_init(formatter, prog):
+    argparse.RawDescriptionHelpFormatter.__init__(formatter, prog, width=40)
+
 
 @pytest.mark.parametrize('docstring', (
         """Title""",
@@ -74,3 +161,28 @@ def test_split_docstring_description(docstring):
     title, description = split_docstring(docstring)
     assert title == 'Title'
     assert description == 'Some Description'
+
+
+def test_docstring_parsed_once_per_class():
+
+    class Documented(smclip.Command):
+        """Title
+
+        Some Description
+        """
+
+    class Subclass(Documented):
+        pass
+
+    with mock.patch('smclip.helpers.split_docstring', wraps=split_docstring) as split:
+        commands = [Documented() for _ in range(3)]
+        assert [cmd.title for cmd in commands] == ['Title'] * 3
+        assert commands[0].description == 'Some Description'
+        assert Documented.title == 'Title'
+        assert split.call_count == 1
+
+        assert Subclass().title is None
+
+    commands[0].title = 'Overridden'
+    assert commands[0].title == 'Overridden'
+    assert commands[1].title == 'Title'
@@ -0,0 +1,115 @@
+import itertools
+
+import smclip
+from smclip.stream import ResultStream
+
+
+class ListItems(smclip.ChainedCommand):
+    default_name = 'list'
+
+    def this_action(self):
+        try:
+            for number in itertools.count():
+                self.app.produced += 1
+                yield {'id': number, 'state': 'open' if number % 2 else 'closed',
+                       'prio': number % 3}
+        finally:
+            self.app.closed = True
+
+
+class Items(smclip.ChainedCommand):
+    default_name = 'items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+
+    def this_action(self, count):
+        return [{'id': number, 'state': 'open', 'prio': -number} for number in range(count)]
+
+
+class Filter(smclip.ChainedCommand):
+    default_name = 'filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state')
+
+    def this_action(self, state):
+        for item in self.upstream:
+            if item['state'] == state:
+                yield item
+
+
+class Sort(smclip.ChainedCommand):
+    default_name = 'sort'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by')
+
+    def this_action(self, by):
+        return sorted(self.upstream, key=lambda item: item[by])
+
+
+class Head(smclip.ChainedCommand):
+    default_name = 'head'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+
+    def this_action(self, count):
+        return itertools.islice(self.upstream, count)
+
+
+class Pipeline(smclip.ChainedCommandGroup):
+    default_name = 'pipe'
+    pipeline = True
+
+    def __init__(self, *args, **kwargs):
+        super(Pipeline, self).__init__(*args, **kwargs)
+        for command_cls in (ListItems, Items, Filter, Sort, Head):
+            self.register(command_cls)
+
+
+class App(object):
+    produced = 0
+    closed = False
+
+
+def _invoke(cmdargs):
+    app = App()
+    pipe = Pipeline(app=app)
+    return app, pipe, pipe.invoke(cmdargs.split(' '))
+
+
+def test_lazy_stages():
+    app, _, rv = _invoke('list filter --state open head 3')
+
+    assert isinstance(rv, ResultStream)
+    assert app.produced == 0
+    assert [item['id'] for item in rv] == [1, 3, 5]
+    assert app.produced == 6
+    assert app.closed
+
+
+def test_upstream():
+    _, pipe, rv = _invoke('items 3 sort --by prio')
+
+    first, second = pipe.invoked_subcommands
+    assert list(first.upstream) == []
+    assert first.upstream.command is None
+    assert second.upstream.command is first
+    assert rv.command is second
+    assert [item['id'] for item in rv] == [2, 1, 0]
+
+
+def test_materializing_stage():
+    _, _, rv = _invoke('items 5 head 2 sort --by prio')
+    assert [item['id'] for item in rv] == [1, 0]
+
+
+def test_closed_output_stops_stages():
+    app, _, rv = _invoke('list filter --state open')
+
+    assert next(rv)['id'] == 1
+    rv.close()
+    assert app.closed
+    assert app.produced == 2
@@ -0,0 +1,126 @@
+import json
+import os
+import sys
+import textwrap
+
+import pytest
+import smclip
+from smclip import plugins
+from smclip.plugins import PluginIndex, fingerprint
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+pytest.importorskip('importlib.metadata')
+
+GROUP = 'smclip_tests.commands'
+
+
+def _install(site, dist, module, entry_points):
+    """Create a module and metadata of a distribution in the site directory"""
+    site.join(module + '.py').write(textwrap.dedent('''
+        import smclip
+
+        class ReportCommand(smclip.Command):
+            """Report"""
+
+            def this_action(self):
+                return '{module}'
+    ''').format(module=module))
+
+    info = site.mkdir('{}-1.0.dist-info'.format(dist))
+    info.join('METADATA').write('Metadata-Version: 2.1\nName: {}\nVersion: 1.0\n'.format(dist))
+    lines = ['[{}]'.format(GROUP)]
+    lines.extend('{} = {}'.format(name, value) for name, value in entry_points)
+    info.join('entry_points.txt').write('\n'.join(lines) + '\n')
+    # installation changes the directory, as seen by the fingerprint
+    stat = os.stat(str(site))
+    os.utime(str(site), (stat.st_atime, stat.st_mtime + 10))
+
+
+@pytest.fixture
+def site(tmpdir, monkeypatch):
+    site = tmpdir.mkdir('site')
+    monkeypatch.syspath_prepend(str(site))
+    _install(site, 'plugin_a', 'smclip_plugin_a', [('report', 'smclip_plugin_a:ReportCommand')])
+    yield site
+    for module in ('smclip_plugin_a', 'smclip_plugin_b'):
+        sys.modules.pop(module, None)
+
+
+def test_scan(site):
+    assert plugins.scan_entry_points(GROUP) == [('report', 'smclip_plugin_a:ReportCommand')]
+    assert plugins.scan_entry_points('smclip_tests.missing') == []
+
+
+def test_register_lazily(site):
+    app = smclip.CommandGroup('app')
+    assert app.register_plugins(GROUP) == ['report']
+
+    assert 'smclip_plugin_a' not in sys.modules
+    assert app.invoke(['report']) == 'smclip_plugin_a'
+    assert 'smclip_plugin_a' in sys.modules
+
+
+def test_registered_name_kept(site):
+    class Report(smclip.Command):
+        def this_action(self):
+            return 'builtin'
+
+    app = smclip.CommandGroup('app')
+    app.register(Report, name='report')
+    with pytest.warns(RuntimeWarning):
+        assert app.register_plugins(GROUP) == []
+    assert app.invoke(['report']) == 'builtin'
+
+
+def test_index(site, tmpdir):
+    filename = str(tmpdir.join('cache', 'plugins.json'))
+    PluginIndex(filename).entry_points(GROUP)
+    with open(filename) as f:
+        assert json.load(f)['groups'] == {GROUP: [['report', 'smclip_plugin_a:ReportCommand']]}
+
+    with mock.patch('smclip.plugins.scan_entry_points') as scan:
+        app = smclip.CommandGroup('app')
+        assert app.register_plugins(GROUP, index=PluginIndex(filename)) == ['report']
+    assert not scan.called
+
+
+def test_index_invalidated(site, tmpdir):
+    filename = str(tmpdir.join('plugins.json'))
+    index = PluginIndex(filename)
+    assert index.entry_points(GROUP) == [('report', 'smclip_plugin_a:ReportCommand')]
+
+    _install(site, 'plugin_b', 'smclip_plugin_b', [('stats', 'smclip_plugin_b:ReportCommand')])
+    assert PluginIndex(filename).entry_points(GROUP) == [
+        ('report', 'smclip_plugin_a:ReportCommand'), ('stats', 'smclip_plugin_b:ReportCommand')]
+    assert index.entry_points(GROUP) == PluginIndex(filename).entry_points(GROUP)
+
+
+@pytest.mark.parametrize('content', ['', 'not json', '[]', '{"version": 1}'])
+def test_broken_index(site, tmpdir, content):
+    filename = tmpdir.join('plugins.json')
+    filename.write(content)
+    assert PluginIndex(str(filename)).entry_points(GROUP) == [
+        ('report', 'smclip_plugin_a:ReportCommand')]
+
+
+def test_refresh(site, tmpdir):
+    filename = str(tmpdir.join('plugins.json'))
+    index = PluginIndex(filename)
+    index.entry_points(GROUP)
+    index.refresh()
+    assert not os.path.exists(filename)
+
+
+def test_fingerprint(tmpdir):
+    directory = tmpdir.mkdir('dir')
+    path = [str(directory), str(tmpdir.join('missing')), '']
+    stamp = fingerprint(path)
+    assert fingerprint(path) == stamp
+
+    stat = os.stat(str(directory))
+    os.utime(str(directory), (stat.st_atime, stat.st_mtime + 10))
+    assert fingerprint(path) != stamp
@@ -0,0 +1,165 @@
+import smclip
+from smclip.pool import CommandPool
+
+from integration_classes import _split_cmd_args
+
+
+class Leaf(smclip.Command):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--opt')
+
+    def this_action(self, opt):
+        return self.alias, opt
+
+
+class DefaultLeaf(Leaf):
+    pass
+
+
+class Change(smclip.ChainedCommand):
+
+    def this_action(self):
+        return 'change', self.upstream
+
+
+class Move(Change):
+
+    def this_action(self):
+        return 'move', self.upstream
+
+
+class PooledGroup(smclip.CommandGroup):
+    pool_subcommands = True
+
+
+class Items(smclip.ChainedCommandGroup):
+    pool_subcommands = True
+
+    def __init__(self, *args, **kwargs):
+        super(Items, self).__init__(*args, **kwargs)
+        self.register(Change, name='change')
+        self.register(Move, name='move')
+
+
+class Group(PooledGroup):
+
+    def __init__(self, *args, **kwargs):
+        super(Group, self).__init__(*args, **kwargs)
+        self.register(Leaf, name='list', aliases=['ls'])
+        self.register(DefaultLeaf, name='default', is_default=True)
+
+
+class App(PooledGroup):
+
+    def __init__(self):
+        super(App, self).__init__('app')
+        self.register(Group, name='group')
+        self.register(Items, name='items')
+
+
+def test_checkout_checkin():
+    pool = CommandPool()
+    assert pool.checkout(Leaf, 'list') is None
+    assert (pool.hits, pool.misses) == (0, 1)
+
+    command = Leaf('list', 'ls')
+    pool.checkin(command)
+    assert command.alias is None
+    assert len(pool) == 1
+
+    assert pool.checkout(Leaf, 'other') is None
+    assert pool.checkout(Leaf, 'list', 'l') is command
+    assert command.alias == 'l'
+    assert (pool.hits, pool.misses) == (1, 2)
+    assert len(pool) == 0
+
+
+def test_max_idle():
+    pool = CommandPool(max_idle=2)
+    for _ in range(3):
+        pool.checkin(Leaf('list'))
+    assert len(pool) == 2
+
+    pool.clear()
+    assert len(pool) == 0
+    assert (pool.hits, pool.misses) == (0, 0)
+
+
+def test_disabled(myapp):
+    assert myapp.subcommand_pool is None
+    myapp.invoke(_split_cmd_args('group list'))
+    first = myapp.invoked_subcommand
+    myapp.invoke(_split_cmd_args('group list'))
+    assert myapp.invoked_subcommand is not first
+
+
+def test_reused(monkeypatch):
+    app = App()
+    assert app.invoke(_split_cmd_args('group list --opt 1')) == ('list', '1')
+    group = app.invoked_subcommand
+    leaf = group.invoked_subcommand
+    parser = leaf.parser
+
+    def new_subcommand(*args, **kwargs):
+        raise AssertionError('new instance created')
+    monkeypatch.setattr(App, 'new_subcommand', new_subcommand)
+    monkeypatch.setattr(Group, 'new_subcommand', new_subcommand)
+
+    assert app.invoke(_split_cmd_args('group ls --opt 2')) == ('ls', '2')
+
+    assert app.invoked_subcommand is group
+    assert group.invoked_subcommand is leaf
+    assert leaf.parser is parser
+    assert (app.subcommand_pool.hits, app.subcommand_pool.misses) == (1, 1)
+    assert (group.subcommand_pool.hits, group.subcommand_pool.misses) == (1, 1)
+
+
+def test_default_reused():
+    app = App()
+    assert app.invoke(_split_cmd_args('group --opt 1')) == (None, '1')
+    default = app.invoked_subcommand.invoked_subcommand
+    assert isinstance(default, DefaultLeaf)
+
+    assert app.invoke(_split_cmd_args('group --opt 2')) == (None, '2')
+    assert app.invoked_subcommand.invoked_subcommand is default
+
+
+def test_released_on_next_invocation():
+    app = App()
+    app.invoke(_split_cmd_args('group list'))
+    group = app.invoked_subcommand
+    leaf = group.invoked_subcommand
+
+    app.invoke([])
+    assert app.invoked_subcommand is None
+    assert group.invoked_subcommand is None
+    assert leaf.alias is None
+    assert len(app.subcommand_pool) == 1
+    assert len(group.subcommand_pool) == 1
+
+
+def test_chain_reused():
+    app = App()
+    app.invoke(_split_cmd_args('items change move change'))
+    items = app.invoked_subcommand
+    first = list(items.invoked_subcommands)
+    assert (items.subcommand_pool.hits, items.subcommand_pool.misses) == (0, 3)
+
+    app.invoke(_split_cmd_args('items change move change'))
+    assert sorted(map(id, items.invoked_subcommands)) == sorted(map(id, first))
+    assert (items.subcommand_pool.hits, items.subcommand_pool.misses) == (3, 3)
+
+
+def test_pipeline_upstream_reset():
+    class Pipeline(Items):
+        pipeline = True
+
+    pipeline = Pipeline('items')
+    list(pipeline.invoke(_split_cmd_args('change move')))
+    move = pipeline.invoked_subcommands[1]
+    assert move.upstream is not None
+
+    pipeline.release_subcommands()
+    assert move.upstream is None
+    assert pipeline.invoked_subcommands is None
@@ -4,7 +4,7 @@ from integration_classes import *
 from integration_classes import _split_cmd_args
 
 
-@pytest.mark.parametrize('cmdargs,current_command_name,subcommand_names', [
+POSSIBLE_COMMANDS = [
     ('', None, ['help', 'group', 'listdefault', 'empty', 'override', 'badoverride']),
     ('help', 'help', []),
     ('docs', 'help', []),  # aliased
@@ -25,7 +25,20 @@ from integration_classes import _split_cmd_args
     ('listdefault anyvalue', 'ID', ['change', 'move']),  # chained command
     ('listdefault anyvalue change', 'change', ['change', 'move']),  # chained command
     ('empty', 'empty', []),
-])
+]
+
+BAD_ARGUMENTS = [
+    'nonexisting',  # unknown command
+    '--unkarg',
+    '--appopt',  # missing value for argument
+    'group --unkarg',  # unknown argument
+    'group nonexisting',  # unknown command
+    'group --unkarg list',   # unknown argument
+    'listdefault anyvalue nonexisting',  # unknown command
+]
+
+
+@pytest.mark.parametrize('cmdargs,current_command_name,subcommand_names', POSSIBLE_COMMANDS)
 def test_possible_commands(myapp, cmdargs, current_command_name, subcommand_names):
     args = _split_cmd_args(cmdargs)
     cmd_names = myapp.possible_command_names(args)
@@ -39,15 +52,7 @@ def test_possible_commands(myapp, cmdargs, current_command_name, subcommand_name
         'Current command was not included'
 
 
-@pytest.mark.parametrize('cmdargs', [
-    'nonexisting',  # unknown command
-    '--unkarg',
-    '--appopt',  # missing value for argument
-    'group --unkarg',  # unknown argument
-    'group nonexisting',  # unknown command
-    'group --unkarg list',   # unknown argument
-    'listdefault anyvalue nonexisting',  # unknown command
-])
+@pytest.mark.parametrize('cmdargs', BAD_ARGUMENTS)
 def test_bad_arguments_for_command_names(myapp, cmdargs):
     cmd_names = myapp.possible_command_names(_split_cmd_args(cmdargs))
 
@@ -0,0 +1,186 @@
+import sys
+
+import pytest
+import smclip
+from smclip import Subcommand
+
+from integration_classes import CreateCommand, ListCommand, _split_cmd_args
+
+try:
+    intern = sys.intern
+except AttributeError:
+    intern = intern
+
+
+class Leaf(smclip.Command):
+    __slots__ = ()
+
+    def this_action(self):
+        return self.name
+
+
+class DeclaredGroup(smclip.CommandGroup):
+    """Declared group"""
+
+    __slots__ = ()
+
+    subcommands = (
+        Subcommand(ListCommand, aliases=['ls'], is_default=True),
+        Subcommand(CreateCommand),
+        Subcommand('test_registry:Leaf', name='leaf', title='Lazy leaf'),
+    )
+
+
+def test_declared():
+    group = DeclaredGroup('group')
+    assert sorted(group.subcmds_cls) == ['create', 'leaf', 'list']
+    assert group.subcmd_aliases['ls'] is ListCommand
+    assert group._default_subcmd_cls is ListCommand
+    assert group.invoke(['leaf']) == 'leaf'
+    assert isinstance(group.invoked_subcommand, Leaf)
+
+
+def test_declared_help(capsys):
+    with pytest.raises(SystemExit):
+        DeclaredGroup('group').invoke(['--help'])
+    out = capsys.readouterr().out
+    assert 'Lazy leaf' in out
+    assert 'create' in out
+
+
+def test_shared_registry():
+    first, second = DeclaredGroup(), DeclaredGroup()
+    assert first._registry is second._registry is DeclaredGroup.class_registry()
+
+
+def test_copy_on_write():
+    first, second = DeclaredGroup(), DeclaredGroup()
+    first.register(Leaf, name='extra', aliases=['ex'])
+
+    assert 'extra' in first.subcmds_cls
+    assert first.similar_command_names('extr') == ['extra']
+    assert first.find_subcmd_cls('ex')[1] is Leaf
+    assert 'extra' not in second.subcmds_cls
+    assert 'extra' not in DeclaredGroup.class_registry().subcmds_cls
+    assert first._default_subcmd_cls is ListCommand
+
+
+def test_registered_after_parser():
+    group = DeclaredGroup('group')
+    group.parser
+    group.register(Leaf, name='extra')
+    assert group.invoke(['extra']) == 'extra'
+
+
+def test_registry_per_class():
+    class Subclass(DeclaredGroup):
+        subcommands = (Subcommand(Leaf, name='only'),)
+
+    assert sorted(Subclass().subcmds_cls) == ['only']
+    assert sorted(DeclaredGroup().subcmds_cls) == ['create', 'leaf', 'list']
+
+
+def test_slots():
+    assert not hasattr(Leaf(), '__dict__')
+    assert not hasattr(DeclaredGroup(), '__dict__')
+    with pytest.raises(AttributeError):
+        Leaf().custom = 1
+
+
+def test_subclass_attributes(myapp):
+    class WithAttributes(smclip.ChainedCommand):
+        def __init__(self, *args, **kwargs):
+            super(WithAttributes, self).__init__(*args, **kwargs)
+            self.custom = 'value'
+
+    command = WithAttributes('attrs')
+    command.title = 'Overridden'
+    assert command.custom == 'value'
+    assert command.title == 'Overridden'
+    assert command.upstream is None
+
+    myapp.invoke(_split_cmd_args('group create'))
+    assert myapp.invoked_subcommand.invoked_subcommand.name == 'create'
+
+
+def test_interned_names():
+    name = ''.join(['le', 'af'])
+    alias = ''.join(['l', 'f'])
+    group = smclip.CommandGroup('group')
+    group.register(Leaf, name=name, aliases=[alias])
+
+    registered_name, = group.subcmds_cls
+    registered_alias, = group.subcmd_aliases
+    assert registered_name is intern(name)
+    assert registered_alias is intern(alias)
+    assert Leaf(''.join(['le', 'af'])).name is registered_name
+
+
+class Name(str):
+    """Name of other type than str, as unicode names on Python 2"""
+
+
+def test_names_not_interned():
+    group = smclip.CommandGroup('group')
+    group.register(Leaf, name=Name('leaf'), aliases=[Name('lf')])
+    group.subcmds_cls = {Name('other'): Leaf}
+
+    assert sorted(group.subcmds_cls) == ['other']
+    assert group.invoke(['lf']) == 'other'
+    assert Leaf(Name('leaf')).name == 'leaf'
+
+
+def test_mappings_copied_on_access():
+    first, second = DeclaredGroup('first'), DeclaredGroup('second')
+    assert first.similar_command_names('lef') == ['leaf']
+    first.parser
+
+    first.subcmds_cls['extra'] = Leaf
+    first.subcmd_aliases['ex'] = Leaf
+    del first.subcmds_cls['create']
+
+    assert first.invoke(['ex']) == 'extra'
+    assert first.get_subcmd_real_name(Leaf) == 'extra'
+    assert first.similar_command_names('extr') == ['extra']
+    assert 'extra' in first.parser.format_help()
+    assert 'create' not in first.parser.format_help()
+    assert sorted(second.subcmds_cls) == ['create', 'leaf', 'list']
+    assert 'extra' not in DeclaredGroup.class_registry().subcmds_cls
+
+
+def test_frozen_mappings():
+    group = DeclaredGroup('group')
+    group.freeze()
+
+    with pytest.raises(RuntimeError):
+        group.subcmds_cls['extra'] = Leaf
+    with pytest.raises(RuntimeError):
+        group.subcmd_aliases.pop('ls')
+    assert 'extra' not in group.subcmds_cls
+    assert group.subcmd_aliases['ls'] is ListCommand
+    assert group._registry is not DeclaredGroup.class_registry()
+
+
+def test_assigned_mappings():
+    first, second = DeclaredGroup('first'), DeclaredGroup('second')
+    first.subcmds_cls = {'leaf': Leaf}
+    first.subcmd_aliases = {'lf': Leaf}
+
+    assert sorted(first.subcmds_cls) == ['leaf']
+    assert first.invoke(['lf']) == 'leaf'
+    assert first.similar_command_names('lef') == ['leaf', 'lf']
+    assert second._registry is DeclaredGroup.class_registry()
+    assert sorted(second.subcmds_cls) == ['create', 'leaf', 'list']
+
+
+def test_title_per_instance():
+    command = smclip.Command('plain')
+    command.title = 'Overridden'
+    assert command.title == 'Overridden'
+    assert smclip.Command('other').title == 'Command with action'
+
+    leaf = Leaf('leaf')
+    leaf.description = 'Slotted'
+    assert leaf.description == 'Slotted'
+    del leaf.description
+    assert leaf.description is None
@@ -0,0 +1,145 @@
+import array
+import os
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+import pytest
+import smclip
+from smclip import server as server_module
+from smclip.server import CommandServer, call, peer_uid
+
+pytestmark = pytest.mark.skipif(not server_module.SUPPORTED,
+                                reason='Python 3.3+ with Unix sockets required')
+
+
+class EchoCommand(smclip.Command):
+    default_name = 'echo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('words', nargs='*')
+
+    def this_action(self, words):
+        sys.stdout.write('{} {} {}\n'.format(' '.join(words), os.environ.get('ECHO_VAR'), os.getcwd()))
+
+
+class FailCommand(smclip.Command):
+    default_name = 'fail'
+
+    def this_action(self):
+        raise ValueError('failed')
+
+
+class ServedApp(smclip.CommandGroup):
+
+    def __init__(self):
+        super(ServedApp, self).__init__(app=self)
+        self.name = 'served'
+        self.register(EchoCommand)
+        self.register(FailCommand)
+
+
+@pytest.fixture(params=[True, False], ids=['fork', 'nofork'])
+def server(request, tmp_path):
+    address = str(tmp_path.joinpath('server.sock'))
+    code = ('import sys; sys.path.insert(0, {!r}); import test_server; '
+            'test_server.ServedApp().serve({!r}, fork={!r})').format(
+        os.path.dirname(__file__), address, request.param)
+    process = subprocess.Popen([sys.executable, '-c', code])
+
+    for _ in range(500):
+        if os.path.exists(address):
+            break
+        time.sleep(0.01)
+    yield address
+
+    process.kill()
+    process.wait()
+
+
+def _call(address, tmp_path, argv, env=None):
+    out_path = tmp_path.joinpath('out')
+    err_path = tmp_path.joinpath('err')
+    with open(os.devnull) as stdin, open(str(out_path), 'w') as stdout, \
+            open(str(err_path), 'w') as stderr:
+        status = call(address, argv, env=env, cwd=str(tmp_path),
+                      fds=(stdin.fileno(), stdout.fileno(), stderr.fileno()))
+    return status, out_path.read_text(), err_path.read_text()
+
+
+def test_invocation(server, tmp_path):
+    status, out, _ = _call(server, tmp_path, ['echo', 'hello', 'world'], env={'ECHO_VAR': 'value'})
+
+    assert status == 0
+    assert out == 'hello world value {}\n'.format(tmp_path)
+
+    # environment of previous request does not leak
+    status, out, _ = _call(server, tmp_path, ['echo'], env={})
+    assert out == ' None {}\n'.format(tmp_path)
+
+
+def test_exit_status(server, tmp_path):
+    status, _, err = _call(server, tmp_path, ['unknown'])
+    assert status == 2
+    assert 'unknown command' in err
+
+    status, _, err = _call(server, tmp_path, ['fail'])
+    assert status == 1
+    assert 'ValueError: failed' in err
+
+
+def test_bad_requests(server, tmp_path):
+    # connection closed right away
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server)
+    sock.close()
+
+    # malformed JSON with file descriptors
+    with open(os.devnull) as devnull:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(server)
+        payload = b'{garbage'
+        _send_raw(sock, struct.pack('!I', len(payload)) + payload, [devnull.fileno()] * 3)
+        assert sock.recv(4) == b''
+        sock.close()
+
+    # a wrong number of file descriptors
+    with open(os.devnull) as devnull:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(server)
+        payload = b'{"argv": [], "env": {}, "cwd": "/"}'
+        _send_raw(sock, struct.pack('!I', len(payload)) + payload, [devnull.fileno()])
+        assert sock.recv(4) == b''
+        sock.close()
+
+    status, out, _ = _call(server, tmp_path, ['echo', 'still', 'serving'], env={})
+    assert status == 0
+    assert out.startswith('still serving')
+
+
+def _send_raw(sock, data, fds):
+    ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds).tobytes())]
+    sock.sendmsg([data], ancillary)
+
+
+def test_unsupported(monkeypatch, tmp_path):
+    monkeypatch.setattr(server_module, 'SUPPORTED', False)
+    address = str(tmp_path.joinpath('server.sock'))
+
+    with pytest.raises(RuntimeError):
+        CommandServer(ServedApp(), address)
+    with pytest.raises(RuntimeError):
+        call(address, ['echo'])
+
+
+def test_private_socket(server, tmp_path):
+    assert os.stat(server).st_mode & 0o777 == 0o600
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(server)
+        assert peer_uid(sock) in (None, os.getuid())
+    finally:
+        sock.close()
@@ -0,0 +1,149 @@
+import pytest
+import smclip
+from smclip.stream import ResultStream
+
+
+class Rows(smclip.Command):
+    default_name = 'rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+
+    def this_action(self, count):
+        for row in range(count):
+            if self.app.events is not None:
+                self.app.events.append(('produce', row))
+            yield row
+
+
+class Listing(smclip.Command):
+    default_name = 'listing'
+
+    def this_action(self):
+        return [1, 2, 3]
+
+
+class Items(smclip.CommandGroup):
+    default_name = 'items'
+
+    def __init__(self, *args, **kwargs):
+        super(Items, self).__init__(*args, **kwargs)
+        self.register(Rows)
+        self.register(Listing)
+
+    def results_callback(self, rv):
+        if isinstance(rv, ResultStream):
+            return rv.map(lambda row: row * 10)
+
+
+class Chained(smclip.ChainedCommandGroup):
+    default_name = 'chained'
+
+    def __init__(self, *args, **kwargs):
+        super(Chained, self).__init__(*args, **kwargs)
+        self.register(ChainedRows)
+
+
+class ChainedRows(smclip.ChainedCommand):
+    default_name = 'rows'
+
+    def this_action(self):
+        return (row for row in 'abc')
+
+
+class App(smclip.CommandGroup):
+
+    def __init__(self):
+        super(App, self).__init__('app', app=self)
+        self.register(Items)
+        self.register(Chained)
+        self.events = []
+        self.printed = None
+
+    def results_callback(self, rv):
+        if isinstance(rv, ResultStream):
+            self.printed = rv.drain(lambda row: self.events.append(('print', row)))
+
+
+def test_results_flow_lazily():
+    app = App()
+    rv = app.invoke(['items', 'rows', '3'])
+
+    assert isinstance(rv, ResultStream)
+    assert isinstance(rv.command, Rows)
+    assert app.printed == 3
+    assert app.events == [('produce', 0), ('print', 0),
+                          ('produce', 1), ('print', 10),
+                          ('produce', 2), ('print', 20)]
+
+
+def test_constant_memory():
+    app = App()
+    app.events = None
+    app.results_callback = lambda rv: rv.drain()
+
+    rv = app.invoke(['items', 'rows', '1000000'])
+    assert rv.count == 1000000
+
+
+def test_container_not_wrapped():
+    app = App()
+    assert app.invoke(['items', 'listing']) == [1, 2, 3]
+    assert app.printed is None
+
+
+def test_chained_streams():
+    app = App()
+    rv = app.invoke(['chained', 'rows', 'rows'])
+
+    streams = [subrv for _, subrv in rv]
+    assert all(isinstance(stream, ResultStream) for stream in streams)
+    assert [list(stream) for stream in streams] == [['a', 'b', 'c']] * 2
+
+
+def test_stream():
+    def numbers():
+        yield 1
+        yield 2
+        yield 3
+
+    seen = []
+    stream = ResultStream(numbers()).each(seen.append)
+    assert next(stream) == 1
+    assert seen == [1]
+    assert stream.drain() == 3
+    assert seen == [1, 2, 3]
+
+    stream = ResultStream(numbers())
+    next(stream)
+    stream.close()
+    with pytest.raises(StopIteration):
+        next(stream)
+
+
+class OpenCommand(smclip.Command):
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+
+    def this_action(self, path):
+        return open(path)
+
+
+class MapCommand(smclip.Command):
+
+    def this_action(self):
+        return map(str, [1, 2])
+
+
+def test_other_iterators_kept(tmp_path):
+    path = tmp_path.joinpath('rows')
+    path.write_text(u'row\n')
+
+    with OpenCommand('open').invoke([str(path)]) as rv:
+        assert not isinstance(rv, ResultStream)
+        assert rv.read() == 'row\n'
+
+    rv = MapCommand('map').invoke([])
+    assert not isinstance(rv, ResultStream)
+    assert list(rv) == ['1', '2']